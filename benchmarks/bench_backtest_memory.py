@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+run_backtest 内存/耗时基准：tracemalloc 峰值（不含指标计算，指标预先进缓存）与耗时，按引擎与执行分支分别统计。
+从项目根运行: python benchmarks/bench_backtest_memory.py [--sizes 5000 20000] [--strategy EMA_trend_v2] [--no-series]
+--no-series 时不返回按日序列，绩效只由在线累加器给出（不随 Bar 数增长的记账内存）。
+逐 Bar 引擎每根 K 线都调用 generate_signal，20k 根约需 10 秒以上。
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from ndx_rsi.backtest import run_backtest  # noqa: E402
+
+# (引擎, next_day_execution)
+CASES = [("loop", True), ("loop", False), ("vectorized", True)]
+
+
+def _ohlcv(n: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    open_ = np.r_[close[0], close[:-1]]
+    volume = rng.uniform(5e6, 2e7, n)
+    idx = pd.bdate_range("2000-01-03", periods=n)
+    return pd.DataFrame({"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=idx)
+
+
+def run(sizes, strategy_name: str, return_series: bool = True) -> None:
+    print(f"{'bars':>10} {'engine':<11} {'next_day':>8} {'peak (MB)':>10} {'time (s)':>9} {'trades':>7}")
+    for n in sizes:
+        raw = _ohlcv(n)
+        for engine, next_day in CASES:
+            kwargs = dict(
+                data=raw,
+                engine=engine,
+                return_series=return_series,
+                use_store=False,
+                backtest_config={"next_day_execution": next_day, "use_stop_loss_take_profit": True},
+            )
+            run_backtest(strategy_name, **kwargs)  # 预热指标缓存
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            out = run_backtest(strategy_name, **kwargs)
+            elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result = out[0] if return_series else out
+            print(
+                f"{n:>10} {engine:<11} {str(next_day):>8} {peak / 1e6:>10.2f} {elapsed:>9.3f} {result['total_trades']:>7}"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark run_backtest peak memory and time per engine.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 20_000], help="Bar counts")
+    parser.add_argument("--strategy", default="EMA_trend_v2")
+    parser.add_argument("--no-series", action="store_true", help="Do not build the per-bar series")
+    args = parser.parse_args()
+    run(args.sizes, args.strategy, return_series=not args.no_series)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
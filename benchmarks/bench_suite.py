@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+规模基准：合成行情（GBM + 状态切换，ndx_rsi.data.synthetic）经文件数据源读入，分规模计时
+- data.load                   文件数据源读取（Parquet；无 pyarrow 时为 CSV）
+- indicator.<列名>            各策略声明的每个指标（不经指标缓存，含依赖）
+- signals.<策略>              各策略整段 generate_signals
+- backtest.<策略>.<模式>      run_backtest：vectorized（次日执行数组化）、loop.next_day、loop.same_day
+策略缺省为 strategy.yaml 中全部，加上无配置段的 NDX_short_term、EMA_cross_v1（默认参数见 DEFAULT_CONFIGS）。
+逐 Bar 引擎每根 K 线都调用 generate_signal，只在不超过 --loop-max-bars 的规模上计时。
+每项取 --repeat 次中的最小值。--save-baseline 把结果写入基线 JSON；默认与基线比较，
+任一项慢于 基线 × (1 + tolerance) 且差值超过 --min-delta 秒即判为回退，退出码 1。
+基线与机器相关，换机器后请先在同一机器上 --save-baseline。
+从项目根运行: python benchmarks/bench_suite.py [--sizes 1000 10000 100000 1000000] [--save-baseline]
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from ndx_rsi.backtest import run_backtest  # noqa: E402
+from ndx_rsi.config_loader import get_strategy_config  # noqa: E402
+from ndx_rsi.data import create_data_source, generate_ohlcv, preprocess_ohlcv  # noqa: E402
+from ndx_rsi.indicators import IndicatorPipeline  # noqa: E402
+from ndx_rsi.strategy.factory import create_strategy  # noqa: E402
+
+DEFAULT_BASELINE = _ROOT / "benchmarks" / "baseline.json"
+# strategy.yaml 中没有配置段、按默认参数运行的策略（create_strategy 不接受空配置，这里写出默认值）
+DEFAULT_CONFIGS: Dict[str, dict] = {
+    "NDX_short_term": {"rsi_params": {"short_period": 9, "long_period": 24}},
+    "EMA_cross_v1": {"short_ema": 50, "long_ema": 200},
+}
+# (用例后缀, engine, next_day_execution)
+BACKTEST_MODES = [("vectorized", "vectorized", True), ("loop.next_day", "loop", True), ("loop.same_day", "loop", False)]
+# 超过该规模用分钟线时间戳（日线时间戳在纳秒精度下放不下百万根）
+DAILY_MAX_BARS = 50_000
+
+
+def _best_of(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _strategy_config(name: str) -> dict:
+    return get_strategy_config(name) or DEFAULT_CONFIGS.get(name, {})
+
+
+def _all_strategies() -> List[str]:
+    configured = list(get_strategy_config())
+    return configured + [name for name in DEFAULT_CONFIGS if name not in configured]
+
+
+def _write_data(n: int, seed: int, tmp: Path) -> Path:
+    """合成行情落盘，返回文件路径（供 data_source: file 读取）。"""
+    raw = generate_ohlcv(n, freq="B" if n <= DAILY_MAX_BARS else "min", seed=seed)
+    try:
+        path = tmp / f"synthetic_{n}.parquet"
+        raw.to_parquet(path)
+    except ImportError:
+        path = tmp / f"synthetic_{n}.csv"
+        raw.to_csv(path)
+    return path
+
+
+def run_size(n: int, strategies: List[str], repeat: int, loop_max_bars: int, seed: int, tmp: Path) -> Dict[str, float]:
+    results: Dict[str, float] = {}
+    path = _write_data(n, seed, tmp)
+    config = {"code": "SYNTH", "data_source": "file", "path": str(path)}
+    source = create_data_source("SYNTH", config)
+    mtimes = itertools.count(path.stat().st_mtime_ns + 1)
+
+    def load() -> pd.DataFrame:
+        # 文件源按 (路径, mtime) 缓存解析结果：每次推后 mtime，计的是冷读
+        mtime = next(mtimes)
+        os.utime(path, ns=(mtime, mtime))
+        return source.load()
+
+    results["data.load"] = _best_of(load, repeat)
+    raw = source.load()
+    df, _ = preprocess_ohlcv(raw)
+    end_date = df.index[-1].date().isoformat()
+
+    specs = {}
+    for name in strategies:
+        for spec in create_strategy(name, _strategy_config(name)).required_indicators():
+            specs.setdefault(spec.column, spec)
+    for column, spec in sorted(specs.items()):
+        results[f"indicator.{column}"] = _best_of(lambda: IndicatorPipeline([spec]).run(df), repeat)
+
+    for name in strategies:
+        strategy = create_strategy(name, _strategy_config(name))
+        full = IndicatorPipeline(strategy.required_indicators()).run(df)
+        if len(full) <= strategy.min_bars:
+            continue
+        results[f"signals.{name}"] = _best_of(lambda: strategy.generate_signals(full, start=strategy.min_bars), repeat)
+        for label, engine, next_day in BACKTEST_MODES:
+            if engine == "loop" and n > loop_max_bars:
+                continue
+
+            def backtest() -> None:
+                run_backtest(
+                    name, "SYNTH", start_date=df.index[0].date().isoformat(), end_date=end_date, data=raw,
+                    engine=engine, use_store=False, strategy_config=_strategy_config(name),
+                    backtest_config={"next_day_execution": next_day},
+                )
+
+            backtest()  # 预热指标缓存，只计记账与信号
+            results[f"backtest.{name}.{label}"] = _best_of(backtest, 1 if engine == "loop" else repeat)
+    return {f"{case}@{n}": round(t, 6) for case, t in results.items()}
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float], tolerance: float, min_delta: float) -> List[str]:
+    """返回回退项描述；基线中没有的用例不比较。"""
+    regressions = []
+    for key, t in sorted(results.items()):
+        base = baseline.get(key)
+        if base is not None and t > base * (1 + tolerance) and t - base > min_delta:
+            regressions.append(f"{key}: {t:.4f}s vs baseline {base:.4f}s ({t / base - 1:+.0%})")
+    return regressions
+
+
+def _load_baseline(path: Path) -> Optional[dict]:
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Scaling benchmarks on synthetic OHLCV with a regression baseline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000], help="Bar counts")
+    parser.add_argument("--strategies", nargs="+", default=None, help="Strategy names (default: strategy.yaml plus NDX_short_term, EMA_cross_v1)")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeats per case (best of)")
+    parser.add_argument("--loop-max-bars", type=int, default=5_000, help="Largest size timed with the loop engine")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results into the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=None, help="Allowed slowdown, e.g. 0.3 = 30%% (default: baseline's)")
+    parser.add_argument("--min-delta", type=float, default=0.005, help="Ignore slowdowns smaller than this many seconds")
+    parser.add_argument("--output", "-o", type=Path, default=None, help="Also write this run's results to JSON")
+    args = parser.parse_args()
+
+    strategies = args.strategies or _all_strategies()
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            size_results = run_size(n, strategies, args.repeat, args.loop_max_bars, args.seed, Path(tmp))
+            for key, t in size_results.items():
+                print(f"  {key:<55} {t:>10.5f}s")
+            results.update(size_results)
+
+    meta = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, indent=2)
+
+    baseline = _load_baseline(args.baseline)
+    if args.save_baseline:
+        merged = dict(baseline["results"]) if baseline else {}
+        merged.update(results)
+        tolerance = args.tolerance if args.tolerance is not None else (baseline or {}).get("tolerance", 0.3)
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "tolerance": tolerance, "results": dict(sorted(merged.items()))}, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline first.")
+        return 0
+    tolerance = args.tolerance if args.tolerance is not None else baseline.get("tolerance", 0.3)
+    regressions = compare(results, baseline["results"], tolerance, args.min_delta)
+    if regressions:
+        print(f"Regressions beyond {tolerance:.0%}:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"No regressions beyond {tolerance:.0%} against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
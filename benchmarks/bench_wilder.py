@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Wilder 平滑微基准：原逐元素循环 vs 向量化内核（wilder_smooth），以及整条 calculate_adx。
+从项目根运行: python benchmarks/bench_wilder.py [--sizes 10000 1000000] [--repeat 5]
+原循环实现在 1M 根 K 线上需数十秒，只计时一次。
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_ROOT = Path(__file__).resolve().parent.parent
+if str(_ROOT) not in sys.path:
+    sys.path.insert(0, str(_ROOT))
+
+from ndx_rsi.indicators import calculate_adx, wilder_smooth  # noqa: E402
+from ndx_rsi.indicators import adx as adx_mod  # noqa: E402
+from tests.helpers import wilder_smooth_loop  # noqa: E402
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _ohlc(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 + np.cumsum(rng.normal(size=n)))
+    high = close + rng.uniform(0, 2, size=n)
+    low = close - rng.uniform(0, 2, size=n)
+    return high, low, close
+
+
+def run(sizes, repeat: int, period: int = 14) -> None:
+    print(f"{'bars':>10} {'case':<14} {'loop (s)':>10} {'vector (s)':>11} {'speedup':>9} {'max |diff|':>11}")
+    for n in sizes:
+        high, low, close = _ohlc(n)
+        tr = (high - low).abs()
+
+        t0 = time.perf_counter()
+        ref = wilder_smooth_loop(tr, period)
+        t_loop = time.perf_counter() - t0
+        t_vec = _best_of(lambda: wilder_smooth(tr, period), repeat)
+        diff = np.nanmax(np.abs(wilder_smooth(tr, period).to_numpy() - ref.to_numpy()))
+        print(f"{n:>10} {'wilder_smooth':<14} {t_loop:>10.4f} {t_vec:>11.5f} {t_loop / t_vec:>8.0f}x {diff:>11.2e}")
+
+        # calculate_adx：4 次平滑（TR、+DM、-DM、DX）
+        adx_mod.wilder_smooth = wilder_smooth_loop
+        try:
+            t0 = time.perf_counter()
+            ref = calculate_adx(high, low, close, period)
+            t_loop = time.perf_counter() - t0
+        finally:
+            adx_mod.wilder_smooth = wilder_smooth
+        t_vec = _best_of(lambda: calculate_adx(high, low, close, period), repeat)
+        diff = np.nanmax(np.abs(calculate_adx(high, low, close, period).to_numpy() - ref.to_numpy()))
+        print(f"{n:>10} {'calculate_adx':<14} {t_loop:>10.4f} {t_vec:>11.5f} {t_loop / t_vec:>8.0f}x {diff:>11.2e}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Wilder smoothing: loop vs vectorized.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000], help="Bar counts")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats for the vectorized timing (best of)")
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
 from ndx_rsi.backtest.runner import run_backtest
+from ndx_rsi.backtest.montecarlo import bootstrap_metrics, run_monte_carlo
+from ndx_rsi.backtest.portfolio import run_portfolio_backtest
+from ndx_rsi.backtest.walk_forward import run_walk_forward
 
-__all__ = ["run_backtest"]
+__all__ = ["bootstrap_metrics", "run_backtest", "run_monte_carlo", "run_portfolio_backtest", "run_walk_forward"]
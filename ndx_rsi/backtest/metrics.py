@@ -0,0 +1,134 @@
+"""
+常数内存的在线绩效累加器：随 Bar 推进逐步更新，不保留逐 Bar 列表，适用于无界或日内长序列。
+- 收益：Welford 均值/方差（夏普），下行平方和（索提诺，目标收益 0）
+- 权益：运行峰值与最大回撤（每个检查点调用 update_equity，与引擎的回撤口径一致）
+- 交易：毛盈利/毛亏损、盈亏笔数（profit_factor、win_rate）
+- 持仓：有仓 Bar 占比（exposure）、仓位变化绝对值之和（turnover，按年化）
+批量接口（update_bars / update_equity_many / add_trades）用 Chan 合并公式并入，供数组化引擎使用。
+"""
+import math
+from typing import Any, Dict, Sequence
+
+import numpy as np
+
+
+class OnlineMetrics:
+    """在线绩效累加器；summary(years, risk_free_rate) 输出与 run_backtest 的 result["strategy"] 同口径的指标。"""
+
+    def __init__(self, periods_per_year: int = 252) -> None:
+        self.periods_per_year = periods_per_year
+        # Welford：收益个数、均值、离差平方和；下行平方和
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.downside_sq = 0.0
+        # 权益、峰值与最大回撤
+        self.equity = 1.0
+        self.peak = 1.0
+        self.max_dd = 0.0
+        # 交易
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        # 持仓
+        self.exposed = 0
+        self.turnover = 0.0
+        self.position = 0.0
+
+    def update_equity(self, equity: float) -> None:
+        """权益检查点：更新峰值与最大回撤。"""
+        self.equity = equity
+        if equity > self.peak:
+            self.peak = equity
+        dd = (self.peak - equity) / self.peak if self.peak > 0 else 0
+        if dd > self.max_dd:
+            self.max_dd = dd
+
+    def update_bar(self, ret: float, position: float) -> None:
+        """一根 Bar 结束：本 Bar 权益变化率与本 Bar 持仓。"""
+        self.n += 1
+        delta = ret - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (ret - self.mean)
+        if ret < 0:
+            self.downside_sq += ret * ret
+        if position != 0:
+            self.exposed += 1
+        self.turnover += abs(position - self.position)
+        self.position = position
+
+    def add_trade(self, pnl: float) -> None:
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+        else:
+            self.losses += 1
+            self.gross_loss -= pnl
+
+    def update_equity_many(self, values: np.ndarray) -> None:
+        """按顺序并入一批权益检查点。"""
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return
+        peak = np.maximum.accumulate(np.concatenate(([self.peak], values)))[1:]
+        dd = np.where(peak > 0, (peak - values) / np.where(peak > 0, peak, 1.0), 0.0)
+        self.max_dd = max(self.max_dd, float(dd.max()))
+        self.peak = float(peak[-1])
+        self.equity = float(values[-1])
+
+    def update_bars(self, returns: np.ndarray, positions: np.ndarray) -> None:
+        """按顺序并入一批 Bar（收益与持仓），均值/方差按 Chan 合并公式累加。"""
+        returns = np.asarray(returns, dtype=float)
+        positions = np.asarray(positions, dtype=float)
+        k = len(returns)
+        if not k:
+            return
+        mean_b = float(returns.mean())
+        m2_b = float(((returns - mean_b) ** 2).sum())
+        n = self.n + k
+        delta = mean_b - self.mean
+        self.m2 += m2_b + delta * delta * self.n * k / n
+        self.mean += delta * k / n
+        self.n = n
+        self.downside_sq += float((np.minimum(returns, 0.0) ** 2).sum())
+        self.exposed += int((positions != 0).sum())
+        self.turnover += float(np.abs(np.diff(positions, prepend=self.position)).sum())
+        self.position = float(positions[-1])
+
+    def add_trades(self, pnls: Sequence[float]) -> None:
+        pnls = np.asarray(pnls, dtype=float)
+        win = pnls > 0
+        self.wins += int(win.sum())
+        self.losses += int((~win).sum())
+        self.gross_profit += float(pnls[win].sum())
+        self.gross_loss -= float(pnls[pnls < 0].sum())
+
+    def summary(self, years: float, risk_free_rate: float = 0.0) -> Dict[str, Any]:
+        """
+        绩效（四舍五入到 4 位）：total_return, max_drawdown, sharpe_ratio, sortino_ratio, calmar_ratio, win_rate,
+        total_trades, profit_factor, exposure, turnover。
+        sharpe = (年化收益 - 无风险)/收益年化标准差；sortino 分母为年化下行偏差；calmar = 年化收益/最大回撤；
+        profit_factor = 总盈利/总亏损（无亏损时为 99）；turnover 为每年仓位变化绝对值之和。
+        """
+        total_trades = self.wins + self.losses
+        total_return = self.equity - 1.0
+        ann_return = (1 + total_return) ** (1 / years) - 1 if years > 0 else total_return
+        sharpe = sortino = 0.0
+        if self.n:
+            ann_vol = math.sqrt(self.m2 / (self.n - 1) * self.periods_per_year) if self.n > 1 else 1e-8
+            sharpe = (ann_return - risk_free_rate) / (ann_vol + 1e-8) if ann_vol else 0.0
+            downside = math.sqrt(self.downside_sq / self.n * self.periods_per_year)
+            sortino = (ann_return - risk_free_rate) / (downside + 1e-8) if downside else 0.0
+        return {
+            "total_return": round(total_return, 4),
+            "max_drawdown": round(self.max_dd, 4),
+            "sharpe_ratio": round(sharpe, 4),
+            "sortino_ratio": round(sortino, 4),
+            "calmar_ratio": round(ann_return / self.max_dd, 4) if self.max_dd > 0 else 0.0,
+            "win_rate": round(self.wins / total_trades, 4) if total_trades else 0,
+            "total_trades": total_trades,
+            "profit_factor": round(self.gross_profit / self.gross_loss, 4) if self.gross_loss > 0 else 99.0,
+            "exposure": round(self.exposed / self.n, 4) if self.n else 0.0,
+            "turnover": round(self.turnover / years, 4) if years > 0 else 0.0,
+        }
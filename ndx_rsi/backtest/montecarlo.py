@@ -0,0 +1,193 @@
+"""
+蒙特卡洛稳健性分析：对回测的逐 Bar 收益（bar_return）与逐笔平仓 PnL（trade_pnl）做平稳块自助抽样（stationary block
+bootstrap，Politis & Romano 1994），得到各绩效指标的分布与置信区间。
+- 块长服从均值为 mean_block 的几何分布、循环取数，保留收益的短期自相关与波动聚集
+- 全部重抽样在一个 NumPy 批次中向量化完成：下标矩阵 → 收益矩阵 → 按行 cumprod/累计峰值算权益与回撤；
+  按 max_bytes 分块，单块临时数组不超过预算
+- 指标口径与 run_backtest 一致：sharpe = (年化收益 - 无风险)/收益年化标准差，max_drawdown 为正值
+"""
+import datetime as dt
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi.backtest.runner import run_backtest
+from ndx_rsi.config_loader import get_backtest_config, merge_config
+
+BAR_METRICS = ("total_return", "annual_return", "max_drawdown", "sharpe_ratio")
+TRADE_METRICS = ("profit_factor", "win_rate", "expectancy")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def stationary_bootstrap_indices(
+    n: int, n_samples: int, mean_block: float, rng: np.random.Generator
+) -> np.ndarray:
+    """
+    平稳块自助抽样的下标矩阵 (n_samples, n)：每一步以 1/mean_block 概率开新块（起点均匀随机），否则沿上一下标 +1（循环）。
+    """
+    if mean_block < 1:
+        raise ValueError("mean_block must be >= 1")
+    new_block = rng.random((n_samples, n)) < 1.0 / mean_block
+    new_block[:, 0] = True
+    starts = rng.integers(0, n, size=(n_samples, n))
+    steps = np.arange(n)
+    # 每个位置所在块的起始位置
+    block_at = np.maximum.accumulate(np.where(new_block, steps, 0), axis=1)
+    return (np.take_along_axis(starts, block_at, axis=1) + (steps - block_at)) % n
+
+
+def _bar_metrics(returns: np.ndarray, years: float, risk_free_rate: float, periods_per_year: int) -> Dict[str, np.ndarray]:
+    """收益矩阵 (k, n) 按行计算 total_return / annual_return / max_drawdown / sharpe_ratio。"""
+    equity = np.cumprod(1.0 + returns, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), 1.0)
+    max_dd = np.maximum(((peak - equity) / peak).max(axis=1), 0.0)
+    total = equity[:, -1] - 1.0
+    annual = np.maximum(1.0 + total, 0.0) ** (1.0 / years) - 1.0
+    if returns.shape[1] > 1:
+        vol = returns.std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+    else:
+        vol = np.full(len(returns), 1e-8)
+    sharpe = np.where(vol != 0, (annual - risk_free_rate) / (vol + 1e-8), 0.0)
+    return {"total_return": total, "annual_return": annual, "max_drawdown": max_dd, "sharpe_ratio": sharpe}
+
+
+def _trade_metrics(pnls: np.ndarray) -> Dict[str, np.ndarray]:
+    """逐笔 PnL 矩阵 (k, m) 按行计算 profit_factor（无亏损时为 99，同 run_backtest）/ win_rate / expectancy。"""
+    gross_profit = np.where(pnls > 0, pnls, 0.0).sum(axis=1)
+    gross_loss = -np.where(pnls < 0, pnls, 0.0).sum(axis=1)
+    pf = np.where(gross_loss > 0, gross_profit / np.where(gross_loss > 0, gross_loss, 1.0), 99.0)
+    return {"profit_factor": pf, "win_rate": (pnls > 0).mean(axis=1), "expectancy": pnls.mean(axis=1)}
+
+
+def _resample(
+    values: np.ndarray,
+    n_samples: int,
+    mean_block: float,
+    rng: np.random.Generator,
+    max_bytes: int,
+    metrics_fn,
+) -> Dict[str, np.ndarray]:
+    """分块重抽样并计算指标；每块的下标/收益/权益等临时矩阵合计约 8 × rows × n × 8 字节。"""
+    n = len(values)
+    rows = max(1, min(n_samples, max_bytes // max(8 * 8 * n, 1)))
+    parts: Dict[str, list] = {}
+    for lo in range(0, n_samples, rows):
+        k = min(rows, n_samples - lo)
+        idx = stationary_bootstrap_indices(n, k, mean_block, rng)
+        for key, arr in metrics_fn(values[idx]).items():
+            parts.setdefault(key, []).append(arr)
+    return {key: np.concatenate(arrs) for key, arrs in parts.items()}
+
+
+def _summary(point: float, dist: np.ndarray, confidence: float) -> Dict[str, float]:
+    lo, hi = np.quantile(dist, [(1.0 - confidence) / 2.0, (1.0 + confidence) / 2.0])
+    return {
+        "point": round(float(point), 4),
+        "mean": round(float(dist.mean()), 4),
+        "median": round(float(np.median(dist)), 4),
+        "std": round(float(dist.std(ddof=1)) if len(dist) > 1 else 0.0, 4),
+        "ci_low": round(float(lo), 4),
+        "ci_high": round(float(hi), 4),
+    }
+
+
+def bootstrap_metrics(
+    bar_returns: Sequence[float],
+    closed_pnls: Optional[Sequence[float]] = None,
+    n_samples: int = 5000,
+    mean_block: float = 20.0,
+    trade_block: float = 3.0,
+    confidence: float = 0.95,
+    years: Optional[float] = None,
+    risk_free_rate: float = 0.0,
+    periods_per_year: int = 252,
+    seed: Optional[int] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    return_samples: bool = False,
+) -> Union[Dict[str, Any], Tuple[Dict[str, Any], pd.DataFrame]]:
+    """
+    对逐 Bar 收益（块均长 mean_block）与逐笔 PnL（块均长 trade_block）分别做平稳块自助抽样，
+    返回 {"metrics": {指标: {point, mean, median, std, ci_low, ci_high}}, "n_samples", "confidence", ...}。
+    years 缺省为 Bar 数 / periods_per_year；point 为原序列上的指标。
+    return_samples=True 时另返回每次重抽样的指标表（每行一次）。
+    """
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be in (0, 1)")
+    returns = np.asarray(bar_returns, dtype=float)
+    if len(returns) == 0 or n_samples < 1:
+        return {"error": "insufficient_data"}
+    years = max(years if years is not None else len(returns) / periods_per_year, 0.1)
+    rng = np.random.default_rng(seed)
+
+    def bar_fn(mat: np.ndarray) -> Dict[str, np.ndarray]:
+        return _bar_metrics(mat, years, risk_free_rate, periods_per_year)
+
+    points = {key: float(v[0]) for key, v in bar_fn(returns[None, :]).items()}
+    dists = _resample(returns, n_samples, mean_block, rng, max_bytes, bar_fn)
+    pnls = np.asarray(closed_pnls if closed_pnls is not None else [], dtype=float)
+    pnls = pnls[~np.isnan(pnls)]
+    if len(pnls):
+        points.update({key: float(v[0]) for key, v in _trade_metrics(pnls[None, :]).items()})
+        dists.update(_resample(pnls, n_samples, trade_block, rng, max_bytes, _trade_metrics))
+
+    result: Dict[str, Any] = {
+        "n_samples": n_samples,
+        "mean_block": mean_block,
+        "trade_block": trade_block,
+        "confidence": confidence,
+        "bars": len(returns),
+        "trades": len(pnls),
+        "metrics": {key: _summary(points[key], dists[key], confidence) for key in BAR_METRICS + TRADE_METRICS if key in dists},
+    }
+    if return_samples:
+        return result, pd.DataFrame(dists)
+    return result
+
+
+def run_monte_carlo(
+    strategy_name: str = "EMA_trend_v2",
+    symbol: str = "QQQ",
+    start_date: str = "2003-01-01",
+    end_date: Optional[str] = None,
+    n_samples: int = 5000,
+    mean_block: float = 20.0,
+    trade_block: float = 3.0,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+    engine: str = "vectorized",
+    **backtest_kwargs: Any,
+) -> Dict[str, Any]:
+    """
+    回测一次（return_series=True），再对 series_df 的 bar_return / trade_pnl 做自助抽样。
+    返回 {"backtest": run_backtest 结果, **bootstrap_metrics 结果}；无风险利率取回测配置的 metrics.risk_free_rate。
+    backtest_kwargs 透传给 run_backtest（如 data、strategy_config、backtest_config）。
+    """
+    if end_date is None:
+        end_date = dt.date.today().isoformat()
+    out = run_backtest(
+        strategy_name=strategy_name,
+        symbol=symbol,
+        start_date=start_date,
+        end_date=end_date,
+        engine=engine,
+        return_series=True,
+        **backtest_kwargs,
+    )
+    if not isinstance(out, tuple):
+        return out
+    result, series = out
+    bt_cfg = merge_config(get_backtest_config(), backtest_kwargs.get("backtest_config"))
+    years = max((pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.0, 0.1)
+    mc = bootstrap_metrics(
+        series["bar_return"].to_numpy(),
+        series["trade_pnl"].to_numpy(),
+        n_samples=n_samples,
+        mean_block=mean_block,
+        trade_block=trade_block,
+        confidence=confidence,
+        years=years,
+        risk_free_rate=bt_cfg.get("metrics", {}).get("risk_free_rate", 0.0),
+        seed=seed,
+    )
+    return {"backtest": result, **mc}
@@ -0,0 +1,273 @@
+"""
+组合回测：多个 (标的, 策略, 权重) 腿在同一交易日历上合成组合权益。
+- 行情：各标的并发拉取（线程池，I/O 为主），同一标的只拉一次
+- 单腿：与 run_backtest(engine="vectorized", next_day_execution) 相同的记账（_run_next_day_vectorized），
+  即 T 日信号 T+1 执行、调仓手续费、空仓计息；不含 Bar 内止损止盈与熔断
+- 日历：各腿权益按日期对齐到共同日历（intersection 只保留全部腿都有行情的日期，union 取并集），
+  缺失日期权益前值填充，跨过的收益并入下一个日历日
+- 再平衡：none / daily / weekly / monthly / quarterly；每个周期开始时按目标权重重置，
+  周期内各腿按自身净值漂移；再平衡换手按 commission 扣费。权重和小于 1 时余下部分为现金（收益 0）
+- 评估区间：从各腿预热期（min_bars）结束的最晚一天起，与 run_backtest 同一区间；绩效用 OnlineMetrics、
+  年数按 start_date ~ end_date 计，单腿权重 1 时与 run_backtest(engine="vectorized") 结果一致。
+  组合持仓为各腿持仓按市值加权，交易为各腿在区间内平仓的交易
+组合权益为各周期内「期初权益 × Σ 权重 × 腿净值相对期初的增长」，整段数组化计算。
+"""
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi.backtest.metrics import OnlineMetrics
+from ndx_rsi.backtest.runner import _run_next_day_vectorized
+from ndx_rsi.config_loader import get_backtest_config, get_datasource_config, get_strategy_config, merge_config
+from ndx_rsi.data import create_data_source, preprocess_ohlcv
+from ndx_rsi.indicators import IndicatorPipeline, get_indicator_cache
+from ndx_rsi.strategy.factory import create_strategy
+
+REBALANCE_FREQS = {"none": None, "daily": "D", "weekly": "W", "monthly": "M", "quarterly": "Q"}
+CALENDARS = ("intersection", "union")
+
+
+def parse_leg(text: str) -> Dict[str, Any]:
+    """CLI 的腿描述 "SYMBOL:STRATEGY:WEIGHT" → {"symbol", "strategy", "weight"}。"""
+    parts = [p.strip() for p in text.split(":")]
+    if len(parts) != 3 or not all(parts):
+        raise ValueError(f"Invalid leg {text!r}, expected SYMBOL:STRATEGY:WEIGHT")
+    return {"symbol": parts[0], "strategy": parts[1], "weight": float(parts[2])}
+
+
+def fetch_ohlcv_concurrently(
+    symbols: Iterable[str], start_date: str, end_date: str, max_workers: Optional[int] = None
+) -> Dict[str, pd.DataFrame]:
+    """并发拉取多个标的的日线，返回 {symbol: DataFrame}。"""
+
+    def fetch(symbol: str) -> pd.DataFrame:
+        config = get_datasource_config(symbol) or {"code": symbol, "data_source": "yfinance"}
+        return create_data_source(symbol, config).get_historical_data(start_date, end_date, "1d")
+
+    unique = list(dict.fromkeys(symbols))
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(unique)) as pool:
+        return dict(zip(unique, pool.map(fetch, unique)))
+
+
+def _date_index(index: pd.Index) -> pd.DatetimeIndex:
+    """对齐用的日期键：去掉时区与时刻，只保留交易日。"""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None)
+    return idx.normalize()
+
+
+def _leg_equity(
+    raw: pd.DataFrame,
+    strategy_name: str,
+    strategy_config: Optional[Dict[str, Any]],
+    commission: float,
+    rfr_daily: float,
+    accrue_risk_free_when_flat: bool,
+) -> Optional[pd.DataFrame]:
+    """
+    单腿按日记账：equity（预热期为 NaN）、checkpoint（调仓手续费后、计息前的权益，回撤检查点）、position（本 Bar 持仓）、
+    trade_pnl（本 Bar 平仓那笔的 PnL，无平仓为 NaN）；数据不足时返回 None。
+    """
+    df, _ = preprocess_ohlcv(raw)
+    sc = merge_config(get_strategy_config(strategy_name) or {}, strategy_config)
+    strategy = create_strategy(strategy_name, sc)
+    loop_start = strategy.min_bars
+    if df.empty or len(df) < max(loop_start, 60):
+        return None
+    df = IndicatorPipeline(strategy.required_indicators()).run(df, get_indicator_cache())
+    close = df["close"].to_numpy(dtype=float)[loop_start:]
+    pos_new = strategy.generate_signals(df, start=loop_start)["position"].to_numpy(dtype=float)
+    vec = _run_next_day_vectorized(close, pos_new, commission, rfr_daily, accrue_risk_free_when_flat)
+    n = len(df)
+    equity = np.full(n, np.nan)
+    checkpoint = np.full(n, np.nan)
+    held = np.zeros(n)
+    trade_pnl = np.full(n, np.nan)
+    equity[loop_start:] = vec["equity"]
+    checkpoint[loop_start:] = vec["checkpoints"][0::2]
+    held[loop_start:] = vec["held"]
+    trade_pnl[loop_start + vec["exit_idx"]] = vec["closed_pnls"]
+    out = pd.DataFrame(
+        {"equity": equity, "checkpoint": checkpoint, "position": held, "trade_pnl": trade_pnl},
+        index=_date_index(df.index),
+    )
+    return out[~out.index.duplicated(keep="last")]
+
+
+def _period_starts(calendar: pd.DatetimeIndex, rebalance: str) -> np.ndarray:
+    """每个日历日所在再平衡周期的首日下标。"""
+    freq = REBALANCE_FREQS[rebalance]
+    n = len(calendar)
+    if freq is None:
+        return np.zeros(n, dtype=np.int64)
+    if freq == "D":
+        return np.arange(n)
+    codes = calendar.to_period(freq).asi8
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    return np.maximum.accumulate(np.where(is_start, np.arange(n), 0))
+
+
+def portfolio_equity(
+    leg_equity: np.ndarray,
+    weights: np.ndarray,
+    period_start: np.ndarray,
+    commission: float = 0.0,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    由各腿净值 (T, L) 与目标权重合成组合权益，返回 (equity, 各腿市值 (T, L))。
+    period_start[t] 为 t 所在再平衡周期的首日下标；周期首日按目标权重重置，换手 Σ|w - 漂移后权重| 按 commission 扣费。
+    """
+    T = len(leg_equity)
+    weights = np.asarray(weights, dtype=float)
+    cash = 1.0 - weights.sum()
+    prev = np.vstack((np.ones((1, leg_equity.shape[1])), leg_equity[:-1]))
+    base = prev[period_start]  # 各腿在本周期期初（上一日）的净值
+    sleeves = weights * leg_equity / base  # 期初权益为 1 时各腿市值
+    growth = sleeves.sum(axis=1) + cash
+
+    starts = np.flatnonzero(np.r_[True, period_start[1:] != period_start[:-1]]) if T else np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:] - 1, T - 1] if T else starts
+    period_growth = growth[ends]
+    # 周期 p（p ≥ 1）期初换手：上一周期末的漂移权重调回目标权重
+    drifted = sleeves[ends] / period_growth[:, None]
+    turnover = np.r_[0.0, np.abs(weights - drifted[:-1]).sum(axis=1)] if len(starts) else np.zeros(0)
+    cost = 1.0 - commission * turnover
+    period_base = np.cumprod(np.r_[1.0, period_growth[:-1]]) * np.cumprod(cost)
+
+    period_of = np.searchsorted(starts, np.arange(T), side="right") - 1
+    scale = period_base[period_of]
+    return growth * scale, sleeves * scale[:, None]
+
+
+def _equity_metrics(
+    equity: np.ndarray,
+    checkpoints: np.ndarray,
+    positions: np.ndarray,
+    trade_pnls: np.ndarray,
+    years: float,
+    risk_free_rate: float,
+) -> Dict[str, Any]:
+    """
+    区间绩效（OnlineMetrics，口径同 run_backtest）：equity 为期初 1 起的逐 Bar 权益，checkpoints 为各 Bar 计息前的回撤检查点；
+    另加 annual_return。
+    """
+    acc = OnlineMetrics()
+    acc.update_equity_many(np.column_stack((checkpoints, equity)).ravel())
+    prev = np.r_[1.0, equity[:-1]]
+    acc.update_bars(np.where(prev > 0, (equity - prev) / np.where(prev > 0, prev, 1.0), 0.0), positions)
+    acc.add_trades(trade_pnls)
+    metrics = acc.summary(years, risk_free_rate)
+    total_return = acc.equity - 1.0
+    metrics["annual_return"] = round((1.0 + total_return) ** (1.0 / years) - 1.0 if years > 0 else total_return, 4)
+    return metrics
+
+
+def run_portfolio_backtest(
+    legs: List[Dict[str, Any]],
+    start_date: str = "2003-01-01",
+    end_date: Optional[str] = None,
+    rebalance: str = "monthly",
+    calendar: str = "intersection",
+    commission: Optional[float] = None,
+    backtest_config: Optional[Dict[str, Any]] = None,
+    data: Optional[Dict[str, pd.DataFrame]] = None,
+    max_workers: Optional[int] = None,
+    return_series: bool = False,
+) -> Union[Dict[str, Any], Tuple[Dict[str, Any], pd.DataFrame]]:
+    """
+    legs: [{"symbol": "QQQ", "strategy": "EMA_trend_v2", "weight": 0.6, "strategy_config": {...}}, ...]，权重和不超过 1。
+    data: {symbol: 原始 OHLCV}，提供时不再访问数据源。
+    返回 {"portfolio": 组合绩效, "legs": {腿名: 绩效与权重}, ...}；return_series=True 时另返回按日序列
+    （equity 与各腿市值 <腿名>_value、持仓 <腿名>_position）。
+    """
+    if rebalance not in REBALANCE_FREQS:
+        raise ValueError(f"Unknown rebalance: {rebalance}. Available: {list(REBALANCE_FREQS)}")
+    if calendar not in CALENDARS:
+        raise ValueError(f"Unknown calendar: {calendar}. Available: {list(CALENDARS)}")
+    if not legs:
+        raise ValueError("Portfolio needs at least one leg")
+    weights = np.array([float(leg["weight"]) for leg in legs])
+    if (weights < 0).any() or weights.sum() > 1.0 + 1e-9:
+        raise ValueError("Leg weights must be non-negative and sum to at most 1")
+    if end_date is None:
+        end_date = dt.date.today().isoformat()
+
+    bt_cfg = merge_config(get_backtest_config(), backtest_config)
+    if commission is None:
+        commission = bt_cfg.get("commission", 0.0005)
+    metrics_cfg = bt_cfg.get("metrics", {})
+    risk_free_rate = metrics_cfg.get("risk_free_rate", 0.0)
+    accrue = metrics_cfg.get("accrue_risk_free_when_flat", True)
+    rfr_daily = (1.0 + float(risk_free_rate)) ** (1.0 / 252) - 1.0
+
+    symbols = [leg["symbol"] for leg in legs]
+    raw = dict(data) if data is not None else {}
+    missing = [s for s in dict.fromkeys(symbols) if s not in raw]
+    raw.update(fetch_ohlcv_concurrently(missing, start_date, end_date, max_workers))
+
+    names: List[str] = []
+    frames: List[pd.DataFrame] = []
+    for k, leg in enumerate(legs):
+        name = f"{leg['symbol']}:{leg['strategy']}"
+        if name in names:
+            name = f"{name}#{k}"
+        leg_df = _leg_equity(
+            raw[leg["symbol"]], leg["strategy"], leg.get("strategy_config"), commission, rfr_daily, accrue
+        )
+        if leg_df is None:
+            return {"error": "insufficient_data", "leg": name}
+        names.append(name)
+        frames.append(leg_df)
+
+    cal = frames[0].index
+    for f in frames[1:]:
+        cal = cal.intersection(f.index) if calendar == "intersection" else cal.union(f.index)
+    cal = cal.sort_values()
+    # 评估区间从最晚结束预热的一腿起；各腿以区间前一个日历日的净值为基数（尚在预热为 1）
+    first = max(f["equity"].first_valid_index() for f in frames)
+    lo = int(cal.searchsorted(first))
+    if len(cal) - lo < 2:
+        return {"error": "insufficient_data", "leg": None}
+    # 对齐：缺失日前值填充，跨过的收益自然并入下一个日历日；缺失日没有调仓，检查点即权益
+    aligned = [f[["equity", "position"]].reindex(f.index.union(cal)).ffill().reindex(cal) for f in frames]
+    leg_eq = np.column_stack([a["equity"].to_numpy() for a in aligned])
+    base = np.nan_to_num(leg_eq[lo - 1], nan=1.0) if lo > 0 else np.ones(len(frames))
+    leg_eq = leg_eq[lo:] / base
+    ratio = np.column_stack([(f["checkpoint"] / f["equity"]).reindex(cal).fillna(1.0).to_numpy()[lo:] for f in frames])
+    held = np.column_stack([a["position"].fillna(0.0).to_numpy()[lo:] for a in aligned])
+    pnls = [f["trade_pnl"][(f.index >= cal[lo]) & (f.index <= cal[-1])].dropna().to_numpy() for f in frames]
+    cal = cal[lo:]
+    equity, sleeves = portfolio_equity(leg_eq, weights, _period_starts(cal, rebalance), commission)
+    checkpoints = equity + (sleeves * (ratio - 1.0)).sum(axis=1)
+    positions = (sleeves * held).sum(axis=1) / np.where(equity > 0, equity, 1.0)
+
+    years = max((pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.0, 0.1)
+    result: Dict[str, Any] = {
+        "portfolio": _equity_metrics(equity, checkpoints, positions, np.concatenate(pnls), years, risk_free_rate),
+        "legs": {
+            name: {
+                "weight": float(w),
+                **_equity_metrics(
+                    leg_eq[:, j], leg_eq[:, j] * ratio[:, j], held[:, j], pnls[j], years, risk_free_rate
+                ),
+            }
+            for j, (name, w) in enumerate(zip(names, weights))
+        },
+        "rebalance": rebalance,
+        "calendar": calendar,
+        "bars": len(cal),
+    }
+    if not return_series:
+        return result
+    series = {"equity": equity}
+    for j, name in enumerate(names):
+        series[f"{name}_value"] = sleeves[:, j]
+        series[f"{name}_position"] = held[:, j]
+    return result, pd.DataFrame(series, index=cal.rename("date"))
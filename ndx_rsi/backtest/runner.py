@@ -1,5 +1,5 @@
 """
-回测：拉取历史数据 → 预计算指标 → 按日推进，调用策略生成信号并模拟成交，统计绩效。
+回测：拉取历史数据 → 指标管线预计算策略声明的指标 → 按日推进，调用策略生成信号并模拟成交，统计绩效。
 默认回测区间与 nasdaq_v1 一致：2003-01-01 至今日。
 v2: Bar 内止损/止盈、可选趋势破位、回撤熔断、标准绩效指标（profit_factor、sharpe）。
 
@@ -12,30 +12,132 @@ run_backtest 受 config/strategy.yaml 影响：
     - metrics.accrue_risk_free_when_flat  空仓时是否按无风险利率对权益计息（默认 true，见 docs/v4/06-backtest-cash-risk-free-accrual.md）
     - next_day_execution         T 日信号 T+1 日执行（true=次日执行，与 nasdaq_v1 一致）
     - commission                 手续费比例
+  【引擎】engine 参数：
+    - "loop"        逐 Bar 推进（默认，支持全部 backtest 配置）
+    - "vectorized"  仅作用于 next_day_execution 分支：strategy.generate_signals 整段仓位序列 → 平移一根 → 数组化计算权益/手续费/计息/回撤/交易，
+                    结果与 loop 一致；next_day_execution=false 时 Bar 内止损止盈与熔断依赖路径，自动回退 loop。
+                    记账为 O(n)；信号生成的开销取决于策略的 generate_signals：内置策略均为整段向量化实现（O(n)），
+                    未覆盖的策略走基类默认实现，逐 Bar 切片调用 generate_signal，仍为 O(n²)
   【间接】strategies.<strategy_name> 段（策略 generate_signal / calculate_risk）：
     - risk_control.stop_loss_ratio / take_profit_ratio  决定每笔开仓的止损/止盈价
     - risk_control.is_leverage_etf
     - rsi_params / use_divergence 等  决定信号与仓位，进而影响开平仓与 PnL
 """
-import math
 import datetime as dt
+import time
 
+import numpy as np
 import pandas as pd
-from typing import Any, Dict, List, Optional, Tuple, Union
-
-from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
-from ndx_rsi.config_loader import get_datasource_config, get_backtest_config, get_strategy_config
-from ndx_rsi.indicators import (
-    calculate_rsi_handwrite,
-    calculate_ma,
-    calculate_ma5,
-    calculate_ma20,
-    calculate_volume_ratio,
-    calculate_adx,
-    calculate_macd,
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ndx_rsi.data import create_data_source, preprocess_ohlcv
+from ndx_rsi.config_loader import (
+    get_datasource_config,
+    get_backtest_config,
+    get_strategy_config,
+    merge_config,
 )
+from ndx_rsi import profiling
+from ndx_rsi.backtest.metrics import OnlineMetrics
+from ndx_rsi.backtest.store import get_result_store, result_key
+from ndx_rsi.indicators import IndicatorPipeline, get_indicator_cache, hash_ohlcv
 from ndx_rsi.strategy.factory import create_strategy
 
+ENGINES = ("loop", "vectorized")
+# 基准（买入持有）输出的指标
+BENCHMARK_METRICS = ("total_return", "max_drawdown", "sharpe_ratio", "sortino_ratio", "calmar_ratio")
+
+# 交易台账：每笔平仓一行（平仓 Bar 序号（自 loop_start 起）、方向、仓位、开仓价、平仓价、PnL）
+TRADE_DTYPE = np.dtype([
+    ("bar", np.int64),
+    ("side", np.int8),
+    ("size", np.float64),
+    ("entry_price", np.float64),
+    ("exit_price", np.float64),
+    ("pnl", np.float64),
+])
+
+
+def _record_trade(
+    acc: OnlineMetrics,
+    ledger: Optional[np.ndarray],
+    k: int,
+    bar: int,
+    side: int,
+    size: float,
+    entry_price: float,
+    exit_price: float,
+    pnl: float,
+) -> int:
+    """计入绩效累加器并写入台账第 k 行（ledger 为 None 即不返回序列时只计数），返回新的笔数。"""
+    acc.add_trade(pnl)
+    if ledger is not None:
+        ledger[k] = (bar, side, size, entry_price, exit_price, pnl)
+    return k + 1
+
+
+def _run_next_day_vectorized(
+    close: np.ndarray,
+    pos_new: np.ndarray,
+    commission: float,
+    rfr_daily: float,
+    accrue_risk_free_when_flat: bool,
+) -> Dict[str, Any]:
+    """
+    次日执行的数组化记账，与 loop 引擎逐步运算顺序一致（结果逐位相同）。
+    close / pos_new 均从 loop_start 开始；本 Bar 持仓 held = pos_new 平移一根。
+    每根 Bar 依次乘以三个因子：持仓收益、调仓手续费、空仓计息，展平后一次 cumprod 即得权益路径。
+    """
+    n = len(close)
+    held = np.zeros(n, dtype=float)
+    held[1:] = pos_new[:-1]
+    daily_ret = np.zeros(n, dtype=float)
+    daily_ret[1:] = (close[1:] - close[:-1]) / close[:-1]
+    ret = np.where(held < 0, -daily_ret, daily_ret) * np.abs(held)
+    changed = pos_new != held
+    factors = np.ones((n, 3), dtype=float)
+    factors[:, 0] = np.where(held != 0, 1.0 + ret, 1.0)
+    factors[changed, 1] = 1.0 - 2.0 * commission
+    if accrue_risk_free_when_flat:
+        factors[held == 0, 2] = 1.0 + rfr_daily
+    path = np.cumprod(factors.ravel()).reshape(n, 3)
+    equity = path[:, 2]
+
+    prev_equity = np.concatenate(([1.0], equity[:-1]))
+    bar_returns = np.where(prev_equity > 0, (equity - prev_equity) / np.where(prev_equity > 0, prev_equity, 1.0), 0.0)
+
+    # 交易：每次仓位变化若原持仓非 0 则平掉一笔，入场价为上一次变化时的收盘价
+    change_idx = np.flatnonzero(changed)
+    closing = held[change_idx] != 0
+    exit_idx = change_idx[closing]
+    entry_idx = np.concatenate(([0], change_idx[:-1]))[closing] if len(change_idx) else change_idx
+    entry_price = close[entry_idx]
+    exit_price = close[exit_idx]
+    closed_pnls = np.where(
+        held[exit_idx] > 0,
+        (exit_price - entry_price) / entry_price,
+        (entry_price - exit_price) / entry_price,
+    )
+    return {
+        "equity": equity,
+        # 回撤检查点：手续费后、计息后（未计息时两者相等，不影响结果）
+        "checkpoints": path[:, 1:].ravel(),
+        "held": held,
+        "bar_returns": bar_returns,
+        "closed_pnls": closed_pnls,
+        "entry_idx": entry_idx,
+        "exit_idx": exit_idx,
+    }
+
+
+def _vectorized_metrics(vec: Dict[str, Any]) -> OnlineMetrics:
+    """_run_next_day_vectorized 结果批量并入绩效累加器（与逐 Bar 引擎同一口径）。"""
+    acc = OnlineMetrics()
+    acc.update_equity_many(vec["checkpoints"])
+    acc.update_bars(vec["bar_returns"], vec["held"])
+    acc.add_trades(vec["closed_pnls"])
+    return acc
+
 
 def run_backtest(
     strategy_name: str = "NDX_short_term",
@@ -44,15 +146,29 @@ def run_backtest(
     end_date: Optional[str] = None,
     commission: Optional[float] = None,
     return_series: bool = False,
+    engine: str = "loop",
+    data: Optional[pd.DataFrame] = None,
+    strategy_config: Optional[Dict[str, Any]] = None,
+    backtest_config: Optional[Dict[str, Any]] = None,
+    use_store: Optional[bool] = None,
 ) -> Union[Dict[str, Any], Tuple[Dict[str, Any], pd.DataFrame]]:
     """
     执行回测，返回绩效 dict：win_rate, profit_factor, max_drawdown, total_return, sharpe_ratio 等。
+    绩效由 OnlineMetrics 在线累加（另含 sortino_ratio, calmar_ratio, exposure, turnover）；return_series=False 时逐 Bar 引擎不保留逐 Bar 数组。
     v2: profit_factor = 总盈利/总亏损，sharpe = (年化收益 - 无风险)/收益标准差；支持 Bar 内止损止盈与回撤熔断。
-    v4: return_series=True 时返回 (result_dict, series_df)，series_df 含 equity, strategy_cum_return, benchmark_cum_return, position。
+    v4: return_series=True 时返回 (result_dict, series_df)，series_df 含 equity, strategy_cum_return, benchmark_cum_return, position，
+    以及 bar_return（本 Bar 权益变化率）与 trade_pnl（本 Bar 平仓的那笔 PnL，无平仓为 NaN），供蒙特卡洛重抽样。
+    engine="vectorized" 时次日执行分支走数组化记账，result 与 series_df 与 "loop" 一致。
+    data: 已拉取的原始 OHLCV（如参数扫描共享的一份数据），提供时不再访问数据源，start_date/end_date 仅用于年化。
+    strategy_config / backtest_config: 覆盖 YAML 中对应配置（递归合并），用于参数扫描。
+    use_store: None 时按 datasource.yaml 的 result_store.enabled（默认关闭）；True 时强制使用结果库，False 时不读写。
+    使用结果库时相同 (策略/回测配置, 标的, 区间, 引擎, 行情) 直接返回库中结果，否则计算后写入。
     """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine: {engine}")
     if end_date is None:
         end_date = dt.date.today().isoformat()
-    bt_cfg = get_backtest_config()
+    bt_cfg = merge_config(get_backtest_config(), backtest_config)
     if commission is None:
         commission = bt_cfg.get("commission", 0.0005)
     use_sl_tp = bt_cfg.get("use_stop_loss_take_profit", True)
@@ -69,101 +185,101 @@ def run_backtest(
     # 日化无风险利率（复利），空仓计息时使用
     rfr_daily = (1.0 + float(risk_free_rate)) ** (1.0 / 252) - 1.0
 
-    config = get_datasource_config(symbol) or get_datasource_config("QQQ")
-    if not config:
-        config = {"code": symbol, "data_source": "yfinance"}
-    ds = YFinanceDataSource(symbol, config)
-    raw = ds.get_historical_data(start_date, end_date, "1d")
+    profiling.count("backtest.runs")
+    if data is not None:
+        raw = data
+    else:
+        config = get_datasource_config(symbol) or get_datasource_config("QQQ")
+        if not config:
+            config = {"code": symbol, "data_source": "yfinance"}
+        ds = create_data_source(symbol, config)
+        with profiling.timer("data.fetch"):
+            raw = ds.get_historical_data(start_date, end_date, "1d")
     if raw.empty or len(raw) < 60:
         return {"error": "insufficient_data", "win_rate": 0, "max_drawdown": 0}
 
-    df, _ = preprocess_ohlcv(raw)
-    strategy = create_strategy(strategy_name)
-    loop_start = 50
-    if strategy_name == "EMA_cross_v1":
-        sc = get_strategy_config(strategy_name) or {}
-        short_ema = sc.get("short_ema", 50)
-        long_ema = sc.get("long_ema", 200)
-        df["ema_" + str(short_ema)] = df["close"].ewm(span=short_ema, adjust=False).mean()
-        df["ema_" + str(long_ema)] = df["close"].ewm(span=long_ema, adjust=False).mean()
-        loop_start = max(50, long_ema)
-        if len(df) < loop_start:
-            return {"error": "insufficient_data", "win_rate": 0, "max_drawdown": 0}
-    elif strategy_name == "EMA_trend_v2":
-        sc = get_strategy_config(strategy_name) or {}
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-        loop_start = max(50, ema_slow)
-        if len(df) < loop_start:
-            return {"error": "insufficient_data", "win_rate": 0, "max_drawdown": 0}
-    elif strategy_name == "EMA_trend_v3":
-        sc = get_strategy_config(strategy_name) or {}
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        adx_period = sc.get("adx_period", 14)
-        macd_fast = sc.get("macd_fast", 12)
-        macd_slow = sc.get("macd_slow", 26)
-        macd_signal = sc.get("macd_signal", 9)
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-        df["sma_200"] = calculate_ma(df["close"], 200)
-        df["adx_" + str(adx_period)] = calculate_adx(
-            df["high"], df["low"], df["close"], period=adx_period
-        )
-        macd_line, _, _ = calculate_macd(
-            df["close"], fast=macd_fast, slow=macd_slow, signal=macd_signal
+    sc = merge_config(get_strategy_config(strategy_name) or {}, strategy_config)
+    store = get_result_store(force=use_store is True) if use_store is not False else None
+    if store is not None:
+        store_meta = {
+            "strategy_name": strategy_name,
+            "symbol": symbol,
+            "start_date": start_date,
+            "end_date": end_date,
+            "engine": engine,
+            "data_hash": hash_ohlcv(raw),
+            "bars": len(raw),
+            "strategy_config": sc,
+            "backtest_config": dict(bt_cfg, commission=commission),
+        }
+        store_key = result_key(
+            strategy_name, symbol, start_date, end_date, engine, sc, store_meta["backtest_config"], store_meta["data_hash"]
         )
-        df["macd_line"] = macd_line
-        loop_start = 200
-        if len(df) < loop_start:
-            return {"error": "insufficient_data", "win_rate": 0, "max_drawdown": 0}
-    elif strategy_name == "NDX_MA50_Volume_RSI":
-        df["ma50"] = calculate_ma(df["close"], 50)
-        df["ma20"] = calculate_ma20(df["close"])
-        df["rsi_14"] = calculate_rsi_handwrite(df["close"], 14)
-        df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
-        loop_start = 60
-        if len(df) < loop_start:
-            return {"error": "insufficient_data", "win_rate": 0, "max_drawdown": 0}
-    else:
-        df["ma50"] = calculate_ma(df["close"], 50)
-        df["ma5"] = calculate_ma5(df["close"])
-        df["ma20"] = calculate_ma20(df["close"])
-        df["rsi_9"] = calculate_rsi_handwrite(df["close"], 9)
-        df["rsi_24"] = calculate_rsi_handwrite(df["close"], 24)
-        df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
+        with profiling.timer("backtest.store_get"):
+            hit = store.get(store_key, with_series=return_series)
+        if hit is not None:
+            profiling.count("backtest.store_hits")
+            return hit if return_series else hit[0]
+
+    with profiling.timer("data.preprocess"):
+        df, _ = preprocess_ohlcv(raw)
+    strategy = create_strategy(strategy_name, sc)
+    # 策略声明所需指标，由指标管线去重后一次算出；行情与参数不变时直接命中指标缓存
+    with profiling.timer("indicators"):
+        df = IndicatorPipeline(strategy.required_indicators()).run(df, get_indicator_cache())
+    loop_start = strategy.min_bars
+    if len(df) < loop_start:
+        return {"error": "insufficient_data", "win_rate": 0, "max_drawdown": 0}
 
     position = 0.0
     entries: list = []  # (date, price, side, size, stop_loss, take_profit) 开仓时保存 sl/tp
     equity = 1.0
-    peak = 1.0
-    max_dd = 0.0
-    wins = 0
-    losses = 0
-    closed_pnls: List[float] = []  # v2: 每笔平仓 PnL，用于 profit_factor
-    bar_returns: List[float] = []  # v2: 每 Bar 权益变化率，用于夏普
     circuit_breaker_cooldown = 0
     prev_equity = equity
-    series_rows: List[Dict[str, Any]] = []  # v4: 按日序列，return_series=True 时填充
+    series_df: Optional[pd.DataFrame] = None
     close_start = float(df["close"].iloc[loop_start]) if loop_start < len(df) else 1.0
+    close_arr = df["close"].to_numpy(dtype=float)[loop_start:]
+    n_bars = len(close_arr)
+    use_vectorized = next_day_execution and engine == "vectorized"
+    # 绩效由在线累加器逐 Bar 更新（常数内存）；逐 Bar 引擎仅在需要返回序列时按 Bar 预分配列式记录
+    acc = OnlineMetrics()
+    record = return_series and not use_vectorized
+    equity_arr = np.empty(n_bars) if record else None
+    position_arr = np.empty(n_bars) if record else None
+    bar_returns = np.empty(n_bars) if record else None  # 每 Bar 权益变化率
+    ledger = np.empty(n_bars, dtype=TRADE_DTYPE) if record else None  # 每根 Bar 至多平仓一笔
+    n_trades = 0
 
-    if next_day_execution:
+    t_engine = time.perf_counter()
+    if use_vectorized:
+        # 整段信号一次生成（策略覆盖了 generate_signals 时为 O(n)；基类默认逐 Bar 重放，O(n²)）
+        with profiling.timer("signals"):
+            pos_new_arr = strategy.generate_signals(df, start=loop_start)["position"].to_numpy(dtype=float)
+        vec = _run_next_day_vectorized(
+            close_arr, pos_new_arr, commission, rfr_daily, accrue_risk_free_when_flat
+        )
+        acc = _vectorized_metrics(vec)
+        equity_arr = vec["equity"]
+        position_arr = vec["held"]
+        bar_returns = vec["bar_returns"]
+        exit_idx = vec["exit_idx"]
+        n_trades = len(exit_idx)
+        ledger = np.empty(n_trades, dtype=TRADE_DTYPE)
+        ledger["bar"] = exit_idx
+        ledger["side"] = np.sign(position_arr[exit_idx])
+        ledger["size"] = np.abs(position_arr[exit_idx])
+        ledger["entry_price"] = close_arr[vec["entry_idx"]]
+        ledger["exit_price"] = close_arr[exit_idx]
+        ledger["pnl"] = vec["closed_pnls"]
+    elif next_day_execution:
         # T 日信号 → T+1 日执行：当日收益由「上一日信号」决定的仓位产生，无 Bar 内 SL/TP
         prev_pos_new = 0.0
         entry_price = 0.0
         for i in range(loop_start, len(df)):
+            j = i - loop_start
             window = df.iloc[: i + 1]
             row = df.iloc[i]
             price = float(row["close"])
-            date = df.index[i]
             position_held = prev_pos_new  # 本 Bar 持仓 = 上一 Bar 的信号
             current_position_info = None
             if position_held != 0:
@@ -188,39 +304,27 @@ def run_backtest(
                         trade_ret = (price - entry_price) / entry_price
                     else:
                         trade_ret = (entry_price - price) / entry_price
-                    closed_pnls.append(trade_ret)
-                    if trade_ret > 0:
-                        wins += 1
-                    else:
-                        losses += 1
+                    n_trades = _record_trade(
+                        acc, ledger, n_trades, j, 1 if position_held > 0 else -1, abs(position_held), entry_price, price, trade_ret
+                    )
                 if pos_new != 0:
                     entry_price = price
             prev_pos_new = pos_new
 
-            if equity > peak:
-                peak = equity
-            max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
+            acc.update_equity(equity)
             if position_held == 0 and accrue_risk_free_when_flat:
                 equity *= 1.0 + rfr_daily
-                if equity > peak:
-                    peak = equity
-                max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
-            if prev_equity > 0:
-                bar_returns.append((equity - prev_equity) / prev_equity)
-            else:
-                bar_returns.append(0.0)
+                acc.update_equity(equity)
+            bar_ret = (equity - prev_equity) / prev_equity if prev_equity > 0 else 0.0
             prev_equity = equity
-            if return_series:
-                bench_cum = price / close_start
-                series_rows.append({
-                    "date": date,
-                    "equity": equity,
-                    "strategy_cum_return": equity,
-                    "benchmark_cum_return": bench_cum,
-                    "position": position_held,
-                })
+            acc.update_bar(bar_ret, position_held)
+            if record:
+                bar_returns[j] = bar_ret
+                equity_arr[j] = equity
+                position_arr[j] = position_held
     else:
         for i in range(loop_start, len(df)):
+            j = i - loop_start
             window = df.iloc[: i + 1]
             row = df.iloc[i]
             # TASK-11：传入当前持仓信息以支持平仓信号
@@ -238,7 +342,7 @@ def run_backtest(
             date = df.index[i]
             pos_new = sig.get("position", 0.0)
 
-            dd = (peak - equity) / peak if peak > 0 else 0.0
+            dd = (acc.peak - equity) / acc.peak if acc.peak > 0 else 0.0
             allow_new_position = True
             if cb_enabled:
                 if dd >= cb_threshold and position != 0:
@@ -246,15 +350,9 @@ def run_backtest(
                     entry_price = entries[-1][1] if entries else price
                     side = 1 if position > 0 else -1
                     ret = (price - entry_price) / entry_price * side - commission * 2
-                    closed_pnls.append(ret)
-                    if ret > 0:
-                        wins += 1
-                    else:
-                        losses += 1
+                    n_trades = _record_trade(acc, ledger, n_trades, j, side, abs(position), entry_price, price, ret)
                     equity *= 1 + ret
-                    if equity > peak:
-                        peak = equity
-                    max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
+                    acc.update_equity(equity)
                     position = 0.0
                     entries.clear()
                     circuit_breaker_cooldown = cb_cooldown_bars
@@ -283,15 +381,9 @@ def run_backtest(
                         exit_price = tp
                 if exit_price is not None:
                     ret = (exit_price - entry_price) / entry_price * side - commission * 2
-                    closed_pnls.append(ret)
-                    if ret > 0:
-                        wins += 1
-                    else:
-                        losses += 1
+                    n_trades = _record_trade(acc, ledger, n_trades, j, side, abs(position), entry_price, exit_price, ret)
                     equity *= 1 + ret
-                    if equity > peak:
-                        peak = equity
-                    max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
+                    acc.update_equity(equity)
                     position = 0.0
                     entries.clear()
                     closed_by_sl_tp = True
@@ -307,15 +399,9 @@ def run_backtest(
                     exit_ma = True
                 if exit_ma:
                     ret = (price - entry_price) / entry_price * side - commission * 2
-                    closed_pnls.append(ret)
-                    if ret > 0:
-                        wins += 1
-                    else:
-                        losses += 1
+                    n_trades = _record_trade(acc, ledger, n_trades, j, side, abs(position), entry_price, price, ret)
                     equity *= 1 + ret
-                    if equity > peak:
-                        peak = equity
-                    max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
+                    acc.update_equity(equity)
                     position = 0.0
                     entries.clear()
                     closed_by_sl_tp = True
@@ -333,15 +419,9 @@ def run_backtest(
                 entry_price = entries[-1][1] if entries else price
                 side = 1 if position > 0 else -1
                 ret = (price - entry_price) / entry_price * side - commission * 2
-                closed_pnls.append(ret)
-                if ret > 0:
-                    wins += 1
-                else:
-                    losses += 1
+                n_trades = _record_trade(acc, ledger, n_trades, j, side, abs(position), entry_price, price, ret)
                 equity *= 1 + ret
-                if equity > peak:
-                    peak = equity
-                max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
+                acc.update_equity(equity)
                 position = pos_new
                 if position != 0:
                     sl = risk.get("stop_loss", price)
@@ -353,81 +433,61 @@ def run_backtest(
             # 空仓时按无风险利率对权益计息（日复利），更贴近实际资金机会成本
             if position == 0 and accrue_risk_free_when_flat:
                 equity *= 1.0 + rfr_daily
-                if equity > peak:
-                    peak = equity
-                max_dd = max(max_dd, (peak - equity) / peak if peak > 0 else 0)
+                acc.update_equity(equity)
 
             # v2: 本 Bar 权益变化率，用于夏普
-            if prev_equity > 0:
-                bar_returns.append((equity - prev_equity) / prev_equity)
-            else:
-                bar_returns.append(0.0)
+            bar_ret = (equity - prev_equity) / prev_equity if prev_equity > 0 else 0.0
             prev_equity = equity
+            acc.update_bar(bar_ret, position)
+            if record:
+                bar_returns[j] = bar_ret
+                equity_arr[j] = equity
+                position_arr[j] = position
 
-            # v4: 按日序列
-            if return_series:
-                bench_cum = float(df["close"].iloc[i]) / close_start
-                series_rows.append({
-                    "date": date,
-                    "equity": equity,
-                    "strategy_cum_return": equity,
-                    "benchmark_cum_return": bench_cum,
-                    "position": position,
-                })
-
-    total_trades = wins + losses
-    win_rate = wins / total_trades if total_trades else 0
-    total_return = equity - 1.0
-
-    # v2: 标准绩效指标
-    gross_profit = sum(p for p in closed_pnls if p > 0)
-    gross_loss = abs(sum(p for p in closed_pnls if p < 0))
-    profit_factor = (gross_profit / gross_loss) if gross_loss > 0 else 99.0
+    # 逐 Bar 引擎含每根 Bar 的 generate_signal；向量化引擎另有 signals 阶段
+    profiling.add_time(f"backtest.engine.{'vectorized' if use_vectorized else 'loop'}", time.perf_counter() - t_engine)
+    profiling.count("backtest.bars", n_bars)
+    profiling.count("backtest.trades", acc.wins + acc.losses)
 
     years = max((pd.to_datetime(end_date) - pd.to_datetime(start_date)).days / 365.0, 0.1)
-    if bar_returns:
-        returns_arr = pd.Series(bar_returns)
-        ann_return = (1 + total_return) ** (1 / years) - 1 if years > 0 else total_return
-        ann_vol = float(returns_arr.std() * math.sqrt(252)) if len(returns_arr) > 1 else 1e-8
-        sharpe = (ann_return - risk_free_rate) / (ann_vol + 1e-8) if ann_vol else 0.0
-    else:
-        sharpe = 0.0
+    t_metrics = time.perf_counter()
+    strategy_metrics = acc.summary(years, risk_free_rate)
 
     # 基准（买入持有）绩效：与策略同区间 loop_start ~ 结束
-    bench_cum_final = float(df["close"].iloc[-1]) / close_start
-    benchmark_total_return = bench_cum_final - 1.0
-    bench_cum_series = df["close"].iloc[loop_start:].astype(float) / close_start
-    bench_rolling_max = bench_cum_series.cummax()
-    bench_dd = (bench_cum_series - bench_rolling_max) / bench_rolling_max.replace(0, 1e-10)
-    benchmark_max_drawdown = float(abs(bench_dd.min()))  # 与策略一致，存为正值
-    bench_daily = df["close"].iloc[loop_start:].pct_change().dropna()
-    benchmark_ann_return = (1.0 + benchmark_total_return) ** (1.0 / years) - 1.0 if years > 0 else benchmark_total_return
-    benchmark_ann_vol = float(bench_daily.std() * math.sqrt(252)) if len(bench_daily) > 1 else 1e-8
-    benchmark_sharpe = (benchmark_ann_return - risk_free_rate) / (benchmark_ann_vol + 1e-8) if benchmark_ann_vol else 0.0
+    bench = OnlineMetrics()
+    bench.update_equity_many(close_arr / close_start)
+    bench.update_bars(close_arr[1:] / close_arr[:-1] - 1.0, np.ones(max(n_bars - 1, 0)))
+    benchmark_metrics = bench.summary(years, risk_free_rate)
+    profiling.add_time("backtest.metrics", time.perf_counter() - t_metrics)
 
     result = {
-        "strategy": {
-            "total_return": round(total_return, 4),
-            "max_drawdown": round(max_dd, 4),
-            "sharpe_ratio": round(sharpe, 4),
-            "win_rate": round(win_rate, 4),
-            "total_trades": total_trades,
-            "profit_factor": round(profit_factor, 4),
-        },
-        "benchmark": {
-            "total_return": round(benchmark_total_return, 4),
-            "max_drawdown": round(benchmark_max_drawdown, 4),
-            "sharpe_ratio": round(benchmark_sharpe, 4),
-        },
+        "strategy": strategy_metrics,
+        "benchmark": {key: benchmark_metrics[key] for key in BENCHMARK_METRICS},
         # 兼容旧代码：顶层保留 strategy 的 key，便于 result["total_return"] 等仍可用
-        "total_return": round(total_return, 4),
-        "max_drawdown": round(max_dd, 4),
-        "sharpe_ratio": round(sharpe, 4),
-        "win_rate": round(win_rate, 4),
-        "total_trades": total_trades,
-        "profit_factor": round(profit_factor, 4),
+        **strategy_metrics,
     }
-    if return_series and series_rows:
-        series_df = pd.DataFrame(series_rows).set_index("date")
+    if return_series and n_bars:
+        # v4: 按日序列，列直接引用上面的数组（copy=False，不再复制）
+        trade_pnl = np.full(n_bars, np.nan)  # 平仓 Bar 记该笔 PnL，其余为 NaN
+        trade_pnl[ledger["bar"][:n_trades]] = ledger["pnl"][:n_trades]
+        series_index = df.index[loop_start:]
+        if isinstance(series_index, pd.DatetimeIndex):
+            series_index = pd.DatetimeIndex(series_index, freq=None)
+        series_df = pd.DataFrame(
+            {
+                "equity": equity_arr,
+                "strategy_cum_return": equity_arr,
+                "benchmark_cum_return": close_arr / close_start,
+                "position": position_arr,
+                "bar_return": bar_returns,
+                "trade_pnl": trade_pnl,
+            },
+            index=series_index.rename("date"),
+            copy=False,
+        )
+    if store is not None:
+        with profiling.timer("backtest.store_put"):
+            store.put(store_key, store_meta, result, series_df if return_series else None)
+    if return_series and series_df is not None:
         return (result, series_df)
     return result
@@ -0,0 +1,245 @@
+"""
+回测结果库：每次 run_backtest 的结果与按日序列存入本地 SQLite，键为
+(结果格式版本, 策略名, 合并后的策略配置, 合并后的回测配置, 标的, 区间, 引擎, 行情内容哈希) 的 SHA1。
+- 默认关闭（datasource.yaml 的 result_store.enabled，或 CLI run_backtest --store 单次开启）
+- 相同键重跑直接从库中返回，不再计算指标与信号
+- list_runs / get_run / compare_runs 只读库，用于查看、对比历史回测（CLI：results list|show|compare）
+- 序列存为 Parquet 字节（未安装 pyarrow 时退化为 pickle）；多进程同时写入由 SQLite 锁串行化
+"""
+import datetime as dt
+import hashlib
+import io
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+# pyarrow 可选：未安装时序列用 pickle 存储
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PARQUET = True
+except ImportError:
+    _HAS_PARQUET = False
+
+# 结果格式版本：引擎记账或绩效口径/字段变化时加 1，旧版本存下的结果不再命中
+# 2：OnlineMetrics 绩效（新增 sortino_ratio、calmar_ratio、exposure、turnover）
+RESULT_SCHEMA_VERSION = 2
+
+# list_runs 输出及 compare_runs 对比的指标列
+RUN_COLUMNS = ["key", "created_at", "strategy_name", "symbol", "start_date", "end_date", "engine", "bars"]
+METRIC_COLUMNS = ["total_return", "max_drawdown", "sharpe_ratio", "win_rate", "total_trades", "profit_factor"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    key TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    strategy_name TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    data_hash TEXT NOT NULL,
+    bars INTEGER NOT NULL,
+    strategy_config TEXT NOT NULL,
+    backtest_config TEXT NOT NULL,
+    result TEXT NOT NULL,
+    total_return REAL,
+    max_drawdown REAL,
+    sharpe_ratio REAL,
+    win_rate REAL,
+    total_trades INTEGER,
+    profit_factor REAL,
+    series_format TEXT,
+    series BLOB
+);
+CREATE INDEX IF NOT EXISTS runs_strategy_symbol ON runs (strategy_name, symbol, created_at);
+"""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def result_key(
+    strategy_name: str,
+    symbol: str,
+    start_date: str,
+    end_date: str,
+    engine: str,
+    strategy_config: Dict[str, Any],
+    backtest_config: Dict[str, Any],
+    data_hash: str,
+) -> str:
+    """回测结果的稳定键：任一输入（含行情内容）或 RESULT_SCHEMA_VERSION 变化即换键。"""
+    payload = _dumps([RESULT_SCHEMA_VERSION, strategy_name, symbol, start_date, end_date, engine, strategy_config, backtest_config, data_hash])
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def _series_to_bytes(series: pd.DataFrame) -> Tuple[str, bytes]:
+    buf = io.BytesIO()
+    if _HAS_PARQUET:
+        series.to_parquet(buf)
+        return "parquet", buf.getvalue()
+    series.to_pickle(buf)
+    return "pickle", buf.getvalue()
+
+
+def _series_from_bytes(fmt: str, blob: bytes) -> pd.DataFrame:
+    buf = io.BytesIO(blob)
+    return pd.read_parquet(buf) if fmt == "parquet" else pd.read_pickle(buf)
+
+
+class ResultStore:
+    """SQLite 回测结果库。"""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """连接在退出时提交（异常则回滚）并关闭。"""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str, with_series: bool = False) -> Optional[Tuple[Dict[str, Any], Optional[pd.DataFrame]]]:
+        """命中返回 (result, series)；with_series=True 但库中未存序列时视为未命中。"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT result, series_format, series FROM runs WHERE key = ?", (key,)).fetchone()
+        if row is None or (with_series and row["series"] is None):
+            return None
+        series = _series_from_bytes(row["series_format"], row["series"]) if with_series else None
+        return json.loads(row["result"]), series
+
+    def put(
+        self,
+        key: str,
+        meta: Dict[str, Any],
+        result: Dict[str, Any],
+        series: Optional[pd.DataFrame] = None,
+    ) -> None:
+        """写入（同键覆盖）；meta 含 strategy_name, symbol, start_date, end_date, engine, data_hash, bars, strategy_config, backtest_config。"""
+        fmt, blob = _series_to_bytes(series) if series is not None else (None, None)
+        strategy = result.get("strategy", {})
+        values = {
+            "key": key,
+            "created_at": dt.datetime.now().isoformat(timespec="seconds"),
+            "strategy_name": meta["strategy_name"],
+            "symbol": meta["symbol"],
+            "start_date": meta["start_date"],
+            "end_date": meta["end_date"],
+            "engine": meta["engine"],
+            "data_hash": meta["data_hash"],
+            "bars": int(meta["bars"]),
+            "strategy_config": _dumps(meta["strategy_config"]),
+            "backtest_config": _dumps(meta["backtest_config"]),
+            "result": json.dumps(result, default=str),  # 保留 key 顺序，读回与原结果一致
+            **{col: strategy.get(col) for col in METRIC_COLUMNS},
+            "series_format": fmt,
+            "series": blob,
+        }
+        cols = ", ".join(values)
+        marks = ", ".join("?" for _ in values)
+        with self._connect() as conn:
+            conn.execute(f"INSERT OR REPLACE INTO runs ({cols}) VALUES ({marks})", tuple(values.values()))
+
+    def resolve(self, key_prefix: str) -> str:
+        """键前缀 → 完整键（须唯一）。"""
+        with self._connect() as conn:
+            keys = [r["key"] for r in conn.execute("SELECT key FROM runs WHERE key LIKE ? LIMIT 2", (key_prefix + "%",))]
+        if len(keys) != 1:
+            raise ValueError(f"Unknown or ambiguous run key: {key_prefix}")
+        return keys[0]
+
+    def list_runs(
+        self, strategy_name: Optional[str] = None, symbol: Optional[str] = None, limit: Optional[int] = 50
+    ) -> pd.DataFrame:
+        """按时间倒序列出历史回测（元数据 + 策略指标）。"""
+        where, params = [], []
+        if strategy_name:
+            where.append("strategy_name = ?")
+            params.append(strategy_name)
+        if symbol:
+            where.append("symbol = ?")
+            params.append(symbol)
+        sql = f"SELECT {', '.join(RUN_COLUMNS + METRIC_COLUMNS)} FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, rowid DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            rows = [dict(r) for r in conn.execute(sql, params)]
+        return pd.DataFrame(rows, columns=RUN_COLUMNS + METRIC_COLUMNS)
+
+    def get_run(self, key_prefix: str, with_series: bool = False) -> Dict[str, Any]:
+        """单次回测的完整记录：元数据、配置、result（with_series=True 时含 series）。"""
+        key = self.resolve(key_prefix)
+        with self._connect() as conn:
+            row = dict(conn.execute("SELECT * FROM runs WHERE key = ?", (key,)).fetchone())
+        run = {col: row[col] for col in RUN_COLUMNS + ["data_hash"]}
+        run["strategy_config"] = json.loads(row["strategy_config"])
+        run["backtest_config"] = json.loads(row["backtest_config"])
+        run["result"] = json.loads(row["result"])
+        if with_series:
+            run["series"] = _series_from_bytes(row["series_format"], row["series"]) if row["series"] is not None else None
+        return run
+
+    def compare_runs(self, key_prefixes: Iterable[str]) -> pd.DataFrame:
+        """多次回测并排对比：每列一次回测，行为元数据、策略指标、基准收益及取值不同的配置项。"""
+        runs = [self.get_run(k) for k in key_prefixes]
+        flat = [_flatten({"strategy": r["strategy_config"], "backtest": r["backtest_config"]}) for r in runs]
+        keys = sorted({k for f in flat for k in f})
+        differing = [k for k in keys if len({_dumps(f.get(k)) for f in flat}) > 1]
+        rows: Dict[str, List[Any]] = {}
+        for col in ["strategy_name", "symbol", "start_date", "end_date", "engine", "bars", "created_at"]:
+            rows[col] = [r[col] for r in runs]
+        for col in METRIC_COLUMNS:
+            rows[col] = [r["result"]["strategy"].get(col) for r in runs]
+        rows["benchmark_total_return"] = [r["result"].get("benchmark", {}).get("total_return") for r in runs]
+        for k in differing:
+            rows[k] = [f.get(k) for f in flat]
+        return pd.DataFrame(rows, index=[r["key"][:12] for r in runs]).T
+
+    def delete(self, key_prefix: str) -> None:
+        key = self.resolve(key_prefix)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM runs WHERE key = ?", (key,))
+
+
+def _flatten(d: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """嵌套配置展平为 a.b.c 键。"""
+    out: Dict[str, Any] = {}
+    for k, v in d.items():
+        name = f"{prefix}{k}"
+        if isinstance(v, dict):
+            out.update(_flatten(v, name + "."))
+        else:
+            out[name] = v
+    return out
+
+
+# 进程级默认结果库：按 config 的 result_store 段首次使用时创建
+_DEFAULT: Dict[str, Optional[ResultStore]] = {}
+
+
+def get_result_store(force: bool = False) -> Optional[ResultStore]:
+    """返回进程级默认结果库；配置关闭时返回 None，force=True 时仍按配置的路径打开（CLI --store、results 查看）。"""
+    from ndx_rsi.config_loader import get_result_store_config
+
+    if "store" not in _DEFAULT:
+        cfg = get_result_store_config()
+        _DEFAULT["store"] = ResultStore(cfg["path"]) if cfg["enabled"] else None
+    if force and _DEFAULT["store"] is None:
+        return ResultStore(get_result_store_config()["path"])
+    return _DEFAULT["store"]
@@ -0,0 +1,283 @@
+"""
+滚动前推（walk-forward）优化：按日历年切分训练/测试窗口，在每个训练窗口上从参数网格中选出最优参数，
+在紧随其后的测试窗口上做样本外（OOS）评估，各测试窗口的权益首尾相接为一条样本外权益曲线。
+- 信号只依赖当前及以前的 K 线（generate_signals 第 i 行 = generate_signal(df.iloc[:i+1])），因此每组参数只在整段行情上
+  算一次指标与仓位序列，任意窗口直接切片记账（与 run_backtest 的 vectorized 引擎同一套 _run_next_day_vectorized），
+  重叠窗口共享同一份指标，不按窗口重算
+- 参数组合在进程池中并行（行情与批量 EMA 经共享内存下发，复用 sweep/runner.py 的 worker 初始化），窗口评估为纯数组切片
+- 训练窗口各自从窗口前一根收盘空仓起步（开仓计手续费），指标已用窗口之前的全部历史预热
+- 样本外：各测试窗口选中参数的仓位拼成一条仓位序列，从首个测试窗口前一根收盘空仓起整段记账一次；
+  跨窗口的持仓延续（仓位不变不计手续费，平仓时才记一笔交易），每窗口指标取整段记账在该窗口的切片
+- 仅支持次日执行（backtest.next_day_execution=true）
+"""
+import datetime as dt
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi.backtest.metrics import OnlineMetrics
+from ndx_rsi.backtest.runner import BENCHMARK_METRICS, _run_next_day_vectorized, _vectorized_metrics
+from ndx_rsi.config_loader import (
+    get_backtest_config,
+    get_datasource_config,
+    get_strategy_config,
+    get_walk_forward_config,
+    merge_config,
+)
+from ndx_rsi.data import create_data_source, preprocess_ohlcv
+from ndx_rsi.indicators import IndicatorPipeline, get_indicator_cache
+from ndx_rsi.strategy.factory import create_strategy
+from ndx_rsi.sweep import runner as sweep_runner
+from ndx_rsi.sweep.runner import expand_grid, params_key
+
+# 训练窗口选参指标；max_drawdown 越小越好，其余越大越好
+SELECTION_METRICS = ("sharpe_ratio", "total_return", "profit_factor", "win_rate", "max_drawdown")
+
+
+def walk_forward_windows(
+    index: pd.DatetimeIndex,
+    first: int = 0,
+    train_years: int = 5,
+    test_years: int = 1,
+    anchored: bool = False,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    从 index[first] 起按日历年切分窗口，返回 [(train_lo, train_hi, test_lo, test_hi)]（位置，右开）。
+    测试窗口首尾相接、步长 test_years；anchored=True 时训练窗口起点固定在 first。最后一个测试窗口可不满 test_years。
+    """
+    if train_years <= 0 or test_years <= 0:
+        raise ValueError("train_years and test_years must be positive")
+    n = len(index)
+    windows: List[Tuple[int, int, int, int]] = []
+    if first >= n:
+        return windows
+    origin = index[first]
+    k = 0
+    while True:
+        train_start = origin + pd.DateOffset(years=0 if anchored else k * test_years)
+        test_start = origin + pd.DateOffset(years=train_years + k * test_years)
+        test_end = origin + pd.DateOffset(years=train_years + (k + 1) * test_years)
+        train_lo = int(index.searchsorted(train_start))
+        test_lo = int(index.searchsorted(test_start))
+        test_hi = int(index.searchsorted(test_end))
+        if test_lo >= n:
+            break
+        if train_lo < test_lo < test_hi:
+            windows.append((train_lo, test_lo, test_lo, test_hi))
+        k += 1
+    return windows
+
+
+def _combo_positions(strategy_name: str, params: Dict[str, Any], raw: pd.DataFrame) -> Tuple[np.ndarray, int]:
+    """整段行情上一组参数的信号仓位（min_bars 之前为 0），返回 (pos_new, min_bars)；指标走本进程的指标缓存。"""
+    df, _ = preprocess_ohlcv(raw)
+    strategy = create_strategy(strategy_name, merge_config(get_strategy_config(strategy_name) or {}, params))
+    df = IndicatorPipeline(strategy.required_indicators()).run(df, get_indicator_cache())
+    start = strategy.min_bars
+    pos = np.zeros(len(df), dtype=float)
+    if len(df) > start:
+        pos[start:] = strategy.generate_signals(df, start=start)["position"].to_numpy(dtype=float)
+    return pos, start
+
+
+def _positions_one(params: Dict[str, Any]) -> Tuple[str, np.ndarray, int]:
+    """worker 内计算一组参数的仓位序列（行情由 sweep_runner._init_worker 挂载）。"""
+    pos, start = _combo_positions(sweep_runner._WORKER["job"]["strategy_name"], params, sweep_runner._WORKER["data"])
+    return params_key(params), pos, start
+
+
+def _all_positions(
+    strategy_name: str, combos: List[Dict[str, Any]], raw: pd.DataFrame, workers: Optional[int]
+) -> Dict[str, Tuple[np.ndarray, int]]:
+    """全部参数组合的仓位序列；单进程时直接在本进程计算，否则进程池并行。"""
+    n_workers = min(workers or os.cpu_count() or 1, len(combos))
+    if n_workers <= 1:
+        return {params_key(p): _combo_positions(strategy_name, p, raw) for p in combos}
+    shm, desc = sweep_runner._share_ohlcv(raw)
+    ema_params = sweep_runner._sweep_ema_params(strategy_name, combos) if get_indicator_cache() is not None else []
+    ema_shm, ema_desc = sweep_runner._share_ema_matrix(raw, ema_params) if ema_params else (None, None)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=sweep_runner._init_worker,
+            initargs=(desc, {"strategy_name": strategy_name}, ema_desc),
+        ) as pool:
+            return {key: (pos, start) for key, pos, start in pool.map(_positions_one, combos)}
+    finally:
+        for block in (shm, ema_shm):
+            if block is not None:
+                block.close()
+                block.unlink()
+
+
+def _evaluate(
+    close: np.ndarray,
+    pos: np.ndarray,
+    index: pd.DatetimeIndex,
+    lo: int,
+    hi: int,
+    commission: float,
+    rfr_daily: float,
+    accrue: bool,
+    risk_free_rate: float,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """窗口 [lo, hi) 的记账与绩效：从 lo-1 根收盘空仓起步，返回 (策略指标, _run_next_day_vectorized 结果)。"""
+    a = max(lo - 1, 0)
+    vec = _run_next_day_vectorized(close[a:hi], pos[a:hi], commission, rfr_daily, accrue)
+    years = max((index[hi - 1] - index[a]).days / 365.0, 0.1)
+    return _vectorized_metrics(vec).summary(years, risk_free_rate), vec
+
+
+def _window_metrics(vec: Dict[str, Any], r0: int, r1: int, years: float, risk_free_rate: float) -> Dict[str, Any]:
+    """整段样本外记账中第 [r0, r1) 行（一个测试窗口）的绩效：权益以窗口前一行为基数，交易按平仓行归属。"""
+    level = float(vec["equity"][r0 - 1]) if r0 else 1.0
+    acc = OnlineMetrics()
+    acc.position = float(vec["held"][r0 - 1]) if r0 else 0.0
+    acc.update_equity_many(vec["checkpoints"][2 * r0:2 * r1] / level)
+    acc.update_bars(vec["bar_returns"][r0:r1], vec["held"][r0:r1])
+    exit_idx = vec["exit_idx"]
+    acc.add_trades(vec["closed_pnls"][(exit_idx >= r0) & (exit_idx < r1)])
+    return acc.summary(years, risk_free_rate)
+
+
+def _score(metrics: Dict[str, Any], metric: str) -> float:
+    value = float(metrics[metric])
+    return -value if metric == "max_drawdown" else value
+
+
+def _validate_grid(strategy_name: str, grid: Dict[str, Iterable[Any]]) -> None:
+    """网格参数须为 strategies.<策略名> 下的顶层 key（YAML 中没有该策略时不校验）。"""
+    base = get_strategy_config(strategy_name) or {}
+    for key in grid:
+        if base and key not in base:
+            raise ValueError(f"Unknown parameter: {key}. Available: {list(base)}")
+
+
+def run_walk_forward(
+    strategy_name: str = "EMA_trend_v2",
+    grid: Optional[Dict[str, Iterable[Any]]] = None,
+    symbol: str = "QQQ",
+    start_date: str = "2003-01-01",
+    end_date: Optional[str] = None,
+    train_years: Optional[int] = None,
+    test_years: Optional[int] = None,
+    anchored: Optional[bool] = None,
+    metric: Optional[str] = None,
+    workers: Optional[int] = None,
+    data: Optional[pd.DataFrame] = None,
+    backtest_config: Optional[Dict[str, Any]] = None,
+    return_series: bool = False,
+) -> Union[Dict[str, Any], Tuple[Dict[str, Any], pd.DataFrame]]:
+    """
+    滚动前推优化，返回 {"oos": 样本外拼接绩效, "benchmark": 同区间买入持有, "windows": [每窗口选中参数与训练/测试指标], ...}。
+    grid / train_years / test_years / anchored / metric 为空时取 strategy.yaml 的 walk_forward 段。
+    return_series=True 时返回 (result, series_df)，series_df 含 equity, benchmark_cum_return, position, window（窗口序号）。
+    data: 已拉取的原始 OHLCV，提供时不再访问数据源。
+    """
+    wf_cfg = get_walk_forward_config(strategy_name)
+    grid = grid if grid else wf_cfg["grid"]
+    train_years = int(train_years if train_years is not None else wf_cfg["train_years"])
+    test_years = int(test_years if test_years is not None else wf_cfg["test_years"])
+    anchored = bool(anchored if anchored is not None else wf_cfg["anchored"])
+    metric = metric or wf_cfg["metric"]
+    if metric not in SELECTION_METRICS:
+        raise ValueError(f"Unknown metric: {metric}. Available: {list(SELECTION_METRICS)}")
+    if not grid:
+        raise ValueError(f"No parameter grid for strategy: {strategy_name}")
+    _validate_grid(strategy_name, grid)
+    bt_cfg = merge_config(get_backtest_config(), backtest_config)
+    if not bt_cfg.get("next_day_execution", False):
+        raise ValueError("Walk-forward requires backtest.next_day_execution=true")
+    commission = bt_cfg.get("commission", 0.0005)
+    metrics_cfg = bt_cfg.get("metrics", {})
+    risk_free_rate = metrics_cfg.get("risk_free_rate", 0.0)
+    accrue = metrics_cfg.get("accrue_risk_free_when_flat", True)
+    rfr_daily = (1.0 + float(risk_free_rate)) ** (1.0 / 252) - 1.0
+    if end_date is None:
+        end_date = dt.date.today().isoformat()
+
+    if data is None:
+        config = get_datasource_config(symbol) or {"code": symbol, "data_source": "yfinance"}
+        data = create_data_source(symbol, config).get_historical_data(start_date, end_date, "1d")
+    if data.empty or len(data) < 60:
+        return {"error": "insufficient_data"}
+
+    combos = expand_grid(grid)
+    positions = _all_positions(strategy_name, combos, data, workers)
+    df, _ = preprocess_ohlcv(data)
+    index = pd.DatetimeIndex(df.index)
+    close = df["close"].to_numpy(dtype=float)
+    # 所有组合都已过预热期后才开始切窗口
+    first = max(start for _, start in positions.values())
+    windows = walk_forward_windows(index, first, train_years, test_years, anchored)
+    if not windows:
+        return {"error": "insufficient_data"}
+
+    oos_lo, oos_hi = windows[0][2], windows[-1][3]
+    base = oos_lo - 1
+    # 样本外仓位：第 i 根收盘的决策（第 i+1 根持仓）取第 i+1 根所在测试窗口选中的参数
+    oos_pos = np.empty(oos_hi - base, dtype=float)
+    rows: List[Dict[str, Any]] = []
+    args = (commission, rfr_daily, accrue, risk_free_rate)
+    for k, (train_lo, train_hi, test_lo, test_hi) in enumerate(windows):
+        train = {
+            params_key(p): _evaluate(close, positions[params_key(p)][0], index, train_lo, train_hi, *args)[0]
+            for p in combos
+        }
+        # 同分时取网格中靠前的组合
+        best = max(combos, key=lambda p: _score(train[params_key(p)], metric))
+        best_pos = positions[params_key(best)][0]
+        oos_pos[test_lo - 1 - base:test_hi - base] = best_pos[test_lo - 1:test_hi]
+        rows.append({
+            "window": k,
+            "train_start": index[train_lo].date().isoformat(),
+            "train_end": index[train_hi - 1].date().isoformat(),
+            "test_start": index[test_lo].date().isoformat(),
+            "test_end": index[test_hi - 1].date().isoformat(),
+            "params": dict(best),
+            f"train_{metric}": train[params_key(best)][metric],
+        })
+
+    vec = _run_next_day_vectorized(close[base:oos_hi], oos_pos, commission, rfr_daily, accrue)
+    for row, (_, _, test_lo, test_hi) in zip(rows, windows):
+        # 首个窗口含起步那一行（首次开仓的手续费）
+        r0 = 0 if test_lo == oos_lo else test_lo - base
+        window_years = max((index[test_hi - 1] - index[test_lo - 1]).days / 365.0, 0.1)
+        row["test"] = _window_metrics(vec, r0, test_hi - base, window_years, risk_free_rate)
+    years = max((index[oos_hi - 1] - index[base]).days / 365.0, 0.1)
+    oos = _vectorized_metrics(vec).summary(years, risk_free_rate)
+    # 基准：样本外区间（首个测试窗口前一根收盘起）买入持有
+    bench = close[base:oos_hi] / close[base]
+    bench_acc = OnlineMetrics()
+    bench_acc.update_equity_many(bench)
+    bench_acc.update_bars(bench[1:] / bench[:-1] - 1.0, np.ones(len(bench) - 1))
+    bench_metrics = bench_acc.summary(years, risk_free_rate)
+    result: Dict[str, Any] = {
+        "strategy_name": strategy_name,
+        "symbol": symbol,
+        "metric": metric,
+        "train_years": train_years,
+        "test_years": test_years,
+        "anchored": anchored,
+        "combos": len(combos),
+        "oos_start": index[oos_lo].date().isoformat(),
+        "oos_end": index[oos_hi - 1].date().isoformat(),
+        "oos": oos,
+        "benchmark": {key: bench_metrics[key] for key in BENCHMARK_METRICS},
+        "windows": rows,
+    }
+    if not return_series:
+        return result
+    series_df = pd.DataFrame(
+        {
+            "equity": vec["equity"][1:],
+            "benchmark_cum_return": bench[1:],
+            "position": vec["held"][1:],
+            "window": np.repeat([r["window"] for r in rows], [hi - lo for _, _, lo, hi in windows]),
+        },
+        index=pd.DatetimeIndex(index[oos_lo:oos_hi], freq=None).rename("date"),
+    )
+    return result, series_df
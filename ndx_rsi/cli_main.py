@@ -1,36 +1,86 @@
 """
-CLI 入口：fetch_data、run_backtest、run_signal、verify_indicators。
+CLI 入口：fetch_data、fetch_batch、run_backtest、run_signal、verify_indicators、sweep、portfolio。
 """
 import argparse
 import sys
 from datetime import date
 from pathlib import Path
+from typing import Any, Dict, List, Optional
 
 # 确保包可被导入（当以 python -m ndx_rsi.cli_main 或脚本方式运行时）
 if __name__ == "__main__" and str(Path(__file__).resolve().parent.parent) not in sys.path:
     sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from ndx_rsi import profiling
+
+# run_signal --state 保留的最近 K 线根数下限（另取策略 min_bars 的较大者）
+SIGNAL_STATE_TAIL = 120
+
 
 def cmd_fetch_data(args: argparse.Namespace) -> int:
     from ndx_rsi.config_loader import get_datasource_config
-    from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
+    from ndx_rsi.data import create_data_source, preprocess_ohlcv
 
     config = get_datasource_config(args.symbol) or {"code": args.symbol}
-    ds = YFinanceDataSource(args.symbol, config)
-    df = ds.get_historical_data(args.start, args.end, args.frequency or "1d")
-    df, ok = preprocess_ohlcv(df)
+    ds = create_data_source(args.symbol, config)
+    with profiling.timer("data.fetch"):
+        df = ds.get_historical_data(args.start, args.end, args.frequency or "1d")
+    with profiling.timer("data.preprocess"):
+        df, ok = preprocess_ohlcv(df)
     print(f"Fetched {len(df)} rows. OK={ok}")
     if args.output:
-        df.to_csv(args.output)
+        # 按扩展名选择格式；Parquet/Feather 可作为 data_source: file 的列式数据文件
+        suffix = Path(args.output).suffix.lower()
+        if suffix in (".parquet", ".pq"):
+            df.to_parquet(args.output)
+        elif suffix in (".feather", ".arrow"):
+            df.reset_index().to_feather(args.output)
+        else:
+            df.to_csv(args.output)
         print(f"Saved to {args.output}")
     return 0
 
 
+def cmd_fetch_batch(args: argparse.Namespace) -> int:
+    from ndx_rsi.config_loader import get_cache_config, get_datasource_config
+    from ndx_rsi.data import OHLCVCache, fetch_ohlcv_batch, preprocess_ohlcv
+
+    # 配置中的指数名（如 NDX）映射为 Yahoo 代码（^NDX），其余原样使用
+    codes = {s: (get_datasource_config(s) or {}).get("code", s) for s in args.symbols}
+    cache_cfg = get_cache_config()
+    cache = OHLCVCache(cache_cfg["dir"], ttl_hours=cache_cfg["ttl_hours"]) if cache_cfg.get("enabled") else None
+    with profiling.timer("data.fetch"):
+        frames = fetch_ohlcv_batch(
+            list(codes.values()), args.start, args.end, args.frequencies,
+            max_workers=args.workers, rate_per_second=args.rate, cache=cache,
+            on_error="skip" if args.skip_errors else "raise",
+        )
+    out_dir = Path(args.output_dir) if args.output_dir else None
+    if out_dir is not None:
+        out_dir.mkdir(parents=True, exist_ok=True)
+    for symbol, code in codes.items():
+        for freq in args.frequencies:
+            if (code, freq) not in frames:
+                print(f"{symbol} {freq}: failed")
+                continue
+            df, ok = preprocess_ohlcv(frames[(code, freq)])
+            print(f"{symbol} {freq}: {len(df)} rows. OK={ok}")
+            if out_dir is not None:
+                path = out_dir / f"{symbol.lstrip('^')}_{freq}.{args.format}"
+                if args.format == "parquet":
+                    df.to_parquet(path)
+                else:
+                    df.to_csv(path)
+    if out_dir is not None:
+        print(f"Saved to {out_dir}")
+    return 0
+
+
 def cmd_run_backtest(args: argparse.Namespace) -> int:
     from ndx_rsi.backtest import run_backtest
-    from ndx_rsi.plot import plot_cumulative_returns
 
-    need_series = getattr(args, "plot", False) or getattr(args, "save_plot", None)
+    need_plot = getattr(args, "plot", False) or getattr(args, "save_plot", None)
+    need_series = need_plot or getattr(args, "monte_carlo", 0)
     start = args.start or "2003-01-01"
     end = args.end or date.today().isoformat()
     if need_series:
@@ -40,6 +90,8 @@ def cmd_run_backtest(args: argparse.Namespace) -> int:
             start_date=start,
             end_date=end,
             return_series=True,
+            engine=args.engine,
+            use_store=args.store or None,
         )
     else:
         result = run_backtest(
@@ -47,6 +99,8 @@ def cmd_run_backtest(args: argparse.Namespace) -> int:
             symbol=args.symbol or "QQQ",
             start_date=start,
             end_date=end,
+            engine=args.engine,
+            use_store=args.store or None,
         )
     if "error" in result:
         print("Error:", result["error"])
@@ -68,129 +122,133 @@ def cmd_run_backtest(args: argparse.Namespace) -> int:
         print("=" * 56)
     else:
         print("Backtest result:", result)
-    if need_series and not series_df.empty:
+    if getattr(args, "monte_carlo", 0) and not series_df.empty:
+        with profiling.timer("montecarlo"):
+            _print_monte_carlo(args, series_df, start, end)
+    if need_plot and not series_df.empty:
+        from ndx_rsi.plot import plot_cumulative_returns
+
         title = f"{getattr(args, 'symbol', 'QQQ')} {getattr(args, 'strategy', 'EMA_trend_v2')} Cumulative Returns"
         save_path = getattr(args, "save_plot", None)
         show = getattr(args, "plot", False) and not save_path
-        plot_cumulative_returns(series_df, title=title, save_path=save_path, show=show)
+        with profiling.timer("plot"):
+            plot_cumulative_returns(series_df, title=title, save_path=save_path, show=show)
     return 0
 
 
-def cmd_run_signal(args: argparse.Namespace) -> int:
-    from ndx_rsi.config_loader import get_datasource_config, get_strategy_config
-    from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
-    from ndx_rsi.report import format_signal_report
-    from ndx_rsi.indicators import (
-        calculate_rsi_handwrite,
-        calculate_ma,
-        calculate_volume_ratio,
-        calculate_adx,
-        calculate_macd,
+def _print_monte_carlo(args: argparse.Namespace, series_df, start: str, end: str) -> None:
+    """对回测序列的逐 Bar 收益与逐笔 PnL 做平稳块自助抽样，打印各指标的置信区间。"""
+    from ndx_rsi.backtest import bootstrap_metrics
+    from ndx_rsi.config_loader import get_backtest_config
+
+    years = max((date.fromisoformat(end) - date.fromisoformat(start)).days / 365.0, 0.1)
+    mc = bootstrap_metrics(
+        series_df["bar_return"].to_numpy(),
+        series_df["trade_pnl"].to_numpy(),
+        n_samples=args.monte_carlo,
+        mean_block=args.mc_block,
+        confidence=args.confidence,
+        years=years,
+        risk_free_rate=get_backtest_config()["metrics"]["risk_free_rate"],
+        seed=args.seed,
     )
-    from ndx_rsi.strategy.factory import create_strategy
+    if "error" in mc:
+        print("Monte Carlo error:", mc["error"])
+        return
+    print(f"  蒙特卡洛（平稳块自助抽样 {mc['n_samples']} 次，块均长 {mc['mean_block']}，{mc['confidence']:.0%} 置信区间）")
+    print(f"  {'指标':<16} {'点估计':>10} {'中位数':>10} {'下限':>10} {'上限':>10}")
+    for key, m in mc["metrics"].items():
+        print(f"  {key:<16} {m['point']:>10.4f} {m['median']:>10.4f} {m['ci_low']:>10.4f} {m['ci_high']:>10.4f}")
+    print("=" * 56)
 
-    strategy_name = args.strategy or "EMA_trend_v2"
-    config = get_datasource_config(args.symbol) or {"code": args.symbol}
-    ds = YFinanceDataSource(args.symbol, config)
+
+def _fetch_signal_history(ds, strategy_name: str, since: Optional[str] = None):
+    """拉取信号所需的日线；since 给定时只拉 since 当日起的增量。"""
+    import datetime
+
+    end = datetime.date.today()
+    if since is not None:
+        return ds.get_historical_data(since, end.isoformat(), "1d")
     # EMA 策略需要 200+ 根 K 线，用更长的历史拉取
     if strategy_name in ("EMA_cross_v1", "EMA_trend_v2", "EMA_trend_v3"):
-        import datetime
-        end = datetime.date.today()
         start = end - datetime.timedelta(days=400)
-        df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
-    elif strategy_name == "NDX_MA50_Volume_RSI":
-        import datetime
-        end = datetime.date.today()
+        return ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
+    if strategy_name == "NDX_MA50_Volume_RSI":
         start = end - datetime.timedelta(days=120)
-        df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
-    else:
-        df = ds.get_realtime_data()
-    df, _ = preprocess_ohlcv(df)
+        return ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
+    return ds.get_realtime_data()
 
-    if strategy_name == "EMA_cross_v1":
-        sc = get_strategy_config(strategy_name) or {}
-        short_ema = sc.get("short_ema", 50)
-        long_ema = sc.get("long_ema", 200)
-        min_bars = max(50, long_ema)
-        if df.empty or len(df) < min_bars:
-            print(f"Insufficient data for signal (need at least {min_bars} bars).")
-            return 1
-        df["ema_" + str(short_ema)] = df["close"].ewm(span=short_ema, adjust=False).mean()
-        df["ema_" + str(long_ema)] = df["close"].ewm(span=long_ema, adjust=False).mean()
-    elif strategy_name == "EMA_trend_v2":
-        sc = get_strategy_config(strategy_name) or {}
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        min_bars = max(50, ema_slow)
-        if df.empty or len(df) < min_bars:
-            print(f"Insufficient data for signal (need at least {min_bars} bars).")
-            return 1
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-    elif strategy_name == "EMA_trend_v3":
-        sc = get_strategy_config(strategy_name) or {}
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        adx_period = sc.get("adx_period", 14)
-        macd_fast = sc.get("macd_fast", 12)
-        macd_slow = sc.get("macd_slow", 26)
-        macd_signal = sc.get("macd_signal", 9)
-        min_bars = 200
-        if df.empty or len(df) < min_bars:
-            print(f"Insufficient data for signal (need at least {min_bars} bars).")
-            return 1
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-        df["sma_200"] = calculate_ma(df["close"], 200)
-        df["adx_" + str(adx_period)] = calculate_adx(
-            df["high"], df["low"], df["close"], period=adx_period
-        )
-        macd_line, _, _ = calculate_macd(
-            df["close"], fast=macd_fast, slow=macd_slow, signal=macd_signal
-        )
-        df["macd_line"] = macd_line
-    elif strategy_name == "NDX_MA50_Volume_RSI":
-        min_bars = 60
-        if df.empty or len(df) < min_bars:
-            print(f"Insufficient data for signal (need at least {min_bars} bars).")
-            return 1
-        df["ma50"] = calculate_ma(df["close"], 50)
-        df["ma20"] = calculate_ma(df["close"], 20)
-        df["rsi_14"] = calculate_rsi_handwrite(df["close"], 14)
-        df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
-    else:
-        if df.empty or len(df) < 50:
-            print("Insufficient data for signal.")
-            return 1
-        df["ma50"] = calculate_ma(df["close"], 50)
-        df["rsi_9"] = calculate_rsi_handwrite(df["close"], 9)
-        df["rsi_24"] = calculate_rsi_handwrite(df["close"], 24)
-        df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
 
+def load_signal_frame(symbol: str, strategy_name: str, strategy, state_path: Optional[str] = None):
+    """
+    返回带指标列的日线 DataFrame，供 generate_signal / 报告使用。
+    state_path 给定时用增量状态（indicators/state.py）：已有状态只拉上次之后的新 K 线并流式更新；
+    最新一根可能未收盘，只参与本次计算、不写入状态，下次运行重新拉取。
+    """
+    from ndx_rsi.config_loader import get_datasource_config
+    from ndx_rsi.data import create_data_source, preprocess_ohlcv
+    from ndx_rsi.indicators import IndicatorPipeline, IndicatorState
+
+    config = get_datasource_config(symbol) or {"code": symbol}
+    ds = create_data_source(symbol, config)
+    specs = strategy.required_indicators()
+    if not state_path:
+        with profiling.timer("data.fetch"):
+            df = _fetch_signal_history(ds, strategy_name)
+        with profiling.timer("data.preprocess"):
+            df, _ = preprocess_ohlcv(df)
+        if df.empty:
+            return df
+        with profiling.timer("indicators"):
+            return IndicatorPipeline(specs).run(df)
+
+    tail = max(strategy.min_bars, SIGNAL_STATE_TAIL)
+    state = IndicatorState.load(state_path, specs, tail)
+    with profiling.timer("data.fetch"):
+        if state is None or state.last_ts is None:
+            state = IndicatorState(specs, tail)
+            df = _fetch_signal_history(ds, strategy_name)
+        else:
+            df = _fetch_signal_history(ds, strategy_name, since=state.last_ts.date().isoformat())
+    with profiling.timer("data.preprocess"):
+        df, _ = preprocess_ohlcv(df)
+    profiling.count("indicators.state_bars", max(len(df) - 1, 0))
+    with profiling.timer("indicators"):
+        state.update(df.iloc[:-1])
+        state.save(state_path)
+        return state.preview(df.iloc[-1:])
+
+
+def cmd_run_signal(args: argparse.Namespace) -> int:
+    from ndx_rsi.config_loader import get_strategy_config
+    from ndx_rsi.report import format_signal_report
+    from ndx_rsi.strategy.factory import create_strategy
+
+    strategy_name = args.strategy or "EMA_trend_v2"
     strategy = create_strategy(strategy_name)
-    sig = strategy.generate_signal(df)
-    risk = strategy.calculate_risk(sig, df)
-    report = format_signal_report(
-        strategy_name, args.symbol, df, sig, risk,
-        get_strategy_config(strategy_name),
-    )
+    df = load_signal_frame(args.symbol, strategy_name, strategy, getattr(args, "state", None))
+    if df.empty or len(df) < strategy.min_bars:
+        print(f"Insufficient data for signal (need at least {strategy.min_bars} bars).")
+        return 1
+    with profiling.timer("signals"):
+        sig = strategy.generate_signal(df)
+        risk = strategy.calculate_risk(sig, df)
+    with profiling.timer("report"):
+        report = format_signal_report(
+            strategy_name, args.symbol, df, sig, risk,
+            get_strategy_config(strategy_name),
+        )
     print(report)
     return 0
 
 
 def cmd_verify_indicators(args: argparse.Namespace) -> int:
     from ndx_rsi.config_loader import get_datasource_config
-    from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
+    from ndx_rsi.data import create_data_source, preprocess_ohlcv
     from ndx_rsi.indicators import verify_rsi
 
     config = get_datasource_config(args.symbol) or {"code": args.symbol}
-    ds = YFinanceDataSource(args.symbol, config)
+    ds = create_data_source(args.symbol, config)
     df = ds.get_historical_data(args.start or "2024-01-01", args.end or "2025-01-01", "1d")
     df, _ = preprocess_ohlcv(df)
     if df.empty or len(df) < 30:
@@ -204,8 +262,184 @@ def cmd_verify_indicators(args: argparse.Namespace) -> int:
     return 0 if (ok9 and ok24) else 1
 
 
+def _parse_param_grid(items: Optional[List[str]]) -> Optional[Dict[str, List[Any]]]:
+    """--param key=v1,v2 列表 → 参数网格；格式错误时打印提示并返回 None。"""
+    from ndx_rsi.sweep import parse_grid_values
+
+    grid: Dict[str, List[Any]] = {}
+    for item in items or []:
+        key, sep, values = item.partition("=")
+        if not sep or not values:
+            print(f"Invalid --param {item!r}, expected key=v1,v2,...")
+            return None
+        grid[key.strip()] = parse_grid_values(values)
+    return grid
+
+
+def cmd_sweep(args: argparse.Namespace) -> int:
+    from ndx_rsi.sweep import run_sweep
+
+    grid = _parse_param_grid(args.param)
+    if grid is None:
+        return 1
+    if not grid:
+        print("No parameter grid given (use --param key=v1,v2,...).")
+        return 1
+    table = run_sweep(
+        args.strategy,
+        grid,
+        symbol=args.symbol,
+        start_date=args.start,
+        end_date=args.end or date.today().isoformat(),
+        workers=args.workers,
+        results_path=args.output,
+        engine=args.engine,
+    )
+    if table.empty:
+        print("Sweep produced no results.")
+        return 1
+    sort_col = args.sort_by if args.sort_by in table.columns else "total_return"
+    print(table.sort_values(sort_col, ascending=False).to_string(index=False))
+    if "indicator_cache_hits" in table.columns:
+        hits = int(table["indicator_cache_hits"].fillna(0).sum())
+        misses = int(table["indicator_cache_misses"].fillna(0).sum())
+        print(f"Indicator cache: {hits} hits / {misses} misses")
+    if args.output:
+        print(f"Saved to {args.output}")
+    return 0
+
+
+def cmd_portfolio(args: argparse.Namespace) -> int:
+    from ndx_rsi.backtest.portfolio import parse_leg, run_portfolio_backtest
+
+    try:
+        legs = [parse_leg(item) for item in args.leg or []]
+    except ValueError as e:
+        print(e)
+        return 1
+    if not legs:
+        print("No legs given (use --leg SYMBOL:STRATEGY:WEIGHT).")
+        return 1
+    out = run_portfolio_backtest(
+        legs,
+        start_date=args.start,
+        end_date=args.end or date.today().isoformat(),
+        rebalance=args.rebalance,
+        calendar=args.calendar,
+        max_workers=args.workers,
+        return_series=bool(args.output),
+    )
+    result, series = out if isinstance(out, tuple) else (out, None)
+    if "error" in result:
+        print("Error:", result["error"], result.get("leg") or "")
+        return 1
+    rows = [("组合", result["portfolio"])] + [(f"{name} ({m['weight']:.0%})", m) for name, m in result["legs"].items()]
+    print(f"  再平衡 {result['rebalance']} | 日历 {result['calendar']} | {result['bars']} 个交易日")
+    print(f"  {'':<36} {'累计收益':>10} {'年化':>9} {'最大回撤':>9} {'夏普':>8}")
+    for label, m in rows:
+        print(
+            f"  {label:<36} {m['total_return']:>10.2%} {m['annual_return']:>9.2%}"
+            f" {m['max_drawdown']:>9.2%} {m['sharpe_ratio']:>8.3f}"
+        )
+    if series is not None:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        series.to_csv(args.output)
+        print(f"Saved to {args.output}")
+    return 0
+
+
+def cmd_walk_forward(args: argparse.Namespace) -> int:
+    from ndx_rsi.backtest import run_walk_forward
+
+    grid = _parse_param_grid(args.param)
+    if grid is None:
+        return 1
+    try:
+        out = run_walk_forward(
+            args.strategy,
+            grid=grid or None,
+            symbol=args.symbol,
+            start_date=args.start,
+            end_date=args.end or date.today().isoformat(),
+            train_years=args.train_years,
+            test_years=args.test_years,
+            anchored=True if args.anchored else None,
+            metric=args.metric,
+            workers=args.workers,
+            return_series=bool(args.output),
+        )
+    except ValueError as e:
+        print(e)
+        return 1
+    result, series = out if isinstance(out, tuple) else (out, None)
+    if "error" in result:
+        print("Error:", result["error"])
+        return 1
+    print(
+        f"  {result['strategy_name']} {result['symbol']} | 训练 {result['train_years']} 年 / 测试 {result['test_years']} 年"
+        f"{'（锚定）' if result['anchored'] else ''} | 选参指标 {result['metric']} | {result['combos']} 组参数"
+    )
+    print(f"  {'测试窗口':<24} {'收益':>9} {'最大回撤':>9} {'夏普':>8}  参数")
+    for w in result["windows"]:
+        t = w["test"]
+        print(
+            f"  {w['test_start']} ~ {w['test_end']} {t['total_return']:>9.2%} {t['max_drawdown']:>9.2%}"
+            f" {t['sharpe_ratio']:>8.3f}  {w['params']}"
+        )
+    for label, m in (("样本外拼接", result["oos"]), ("买入持有", result["benchmark"])):
+        print(f"  {label} {result['oos_start']} ~ {result['oos_end']}: 收益 {m['total_return']:.2%}  "
+              f"最大回撤 {m['max_drawdown']:.2%}  夏普 {m['sharpe_ratio']:.3f}")
+    if series is not None:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        series.to_csv(args.output)
+        print(f"Saved to {args.output}")
+    return 0
+
+
+def cmd_results(args: argparse.Namespace) -> int:
+    import json
+
+    import pandas as pd
+
+    from ndx_rsi.backtest.store import ResultStore, get_result_store
+
+    store = ResultStore(args.db) if args.db else get_result_store(force=True)
+    try:
+        if args.action == "list":
+            table = store.list_runs(args.strategy, args.symbol, args.limit)
+            if table.empty:
+                print("No stored runs.")
+                return 0
+            table["key"] = table["key"].str[:12]
+            print(table.to_string(index=False))
+        elif args.action == "show":
+            for key in args.keys:
+                run = store.get_run(key, with_series=bool(args.output))
+                series = run.pop("series", None)
+                print(json.dumps(run, ensure_ascii=False, indent=2, default=str))
+                if series is not None:
+                    Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+                    series.to_csv(args.output)
+                    print(f"Saved to {args.output}")
+        else:
+            with pd.option_context("display.max_colwidth", 40):
+                print(store.compare_runs(args.keys).to_string())
+    except ValueError as e:
+        print(e)
+        return 1
+    return 0
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(description="NDX RSI Quant CLI")
+    parser.add_argument(
+        "--profile", metavar="PATH", default=None,
+        help="写出本次运行的分阶段耗时与计数 JSON（默认取 datasource.yaml 的 profiling 段）",
+    )
+    parser.add_argument(
+        "--metrics-textfile", metavar="PATH", default=None,
+        help="另写 node-exporter textfile（Prometheus 文本格式，如 .../textfile_collector/ndx_rsi.prom）",
+    )
     sub = parser.add_subparsers(dest="command", required=True)
 
     # fetch_data
@@ -214,9 +448,22 @@ def main() -> int:
     p1.add_argument("--start", default="2024-01-01")
     p1.add_argument("--end", default="2025-01-01")
     p1.add_argument("--frequency", default="1d")
-    p1.add_argument("--output", "-o", default=None)
+    p1.add_argument("--output", "-o", default=None, help="输出文件；.parquet/.feather 写列式格式，其余写 CSV")
     p1.set_defaults(func=cmd_fetch_data)
 
+    # fetch_batch
+    p1b = sub.add_parser("fetch_batch", help="Fetch many symbols/frequencies concurrently with rate limiting")
+    p1b.add_argument("--symbols", nargs="+", default=["QQQ", "TQQQ"], help="标的，如 QQQ TQQQ NDX（指数名按 datasource.yaml 映射代码）")
+    p1b.add_argument("--start", default="2024-01-01")
+    p1b.add_argument("--end", default="2025-01-01")
+    p1b.add_argument("--frequencies", nargs="+", default=["1d"], help="周期，如 1d 1h 30m 1wk")
+    p1b.add_argument("--workers", type=int, default=None, help="并发线程数（默认取 datasource.yaml 的 fetcher 段）")
+    p1b.add_argument("--rate", type=float, default=None, help="每秒请求数上限（默认取 fetcher 段）")
+    p1b.add_argument("--skip-errors", action="store_true", help="跳过失败项，不整体报错")
+    p1b.add_argument("--output-dir", "-o", default=None, help="输出目录，每个标的/周期一个文件")
+    p1b.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    p1b.set_defaults(func=cmd_fetch_batch)
+
     # run_backtest
     p2 = sub.add_parser("run_backtest", help="Run backtest and print metrics")
     p2.add_argument("--strategy", default="EMA_trend_v2", help="策略名：EMA_trend_v2")
@@ -225,12 +472,31 @@ def main() -> int:
     p2.add_argument("--end", default=None, help="回测结束日期，默认今日")
     p2.add_argument("--plot", action="store_true", help="回测完成后弹窗显示累计收益图")
     p2.add_argument("--save-plot", metavar="PATH", default=None, help="回测完成后保存累计收益图到指定路径")
+    p2.add_argument(
+        "--engine", choices=["loop", "vectorized"], default="loop",
+        help="回测引擎：loop 逐 Bar；vectorized 次日执行分支数组化记账（结果一致）",
+    )
+    p2.add_argument(
+        "--monte-carlo", type=int, default=0, metavar="N",
+        help="对逐 Bar 收益与逐笔 PnL 做 N 次平稳块自助抽样，输出各指标置信区间（0=关闭）",
+    )
+    p2.add_argument(
+        "--store", action="store_true",
+        help="本次使用回测结果库（默认取 datasource.yaml 的 result_store.enabled，默认关闭）：相同输入直接返回库中结果",
+    )
+    p2.add_argument("--mc-block", type=float, default=20.0, help="自助抽样的平均块长（Bar 数）")
+    p2.add_argument("--confidence", type=float, default=0.95, help="置信水平")
+    p2.add_argument("--seed", type=int, default=None, help="随机种子（可复现）")
     p2.set_defaults(func=cmd_run_backtest)
 
     # run_signal
     p3 = sub.add_parser("run_signal", help="Generate signal for latest data")
     p3.add_argument("--strategy", default="EMA_trend_v2")
     p3.add_argument("--symbol", default="QQQ", help="信号标的，如 QQQ、TQQQ")
+    p3.add_argument(
+        "--state", metavar="PATH", default=None,
+        help="增量指标状态文件（JSON）；存在时只拉取上次之后的新 K 线，不存在时用整段历史初始化",
+    )
     p3.set_defaults(func=cmd_run_signal)
 
     # verify_indicators
@@ -240,8 +506,78 @@ def main() -> int:
     p4.add_argument("--end", default="2025-01-01")
     p4.set_defaults(func=cmd_verify_indicators)
 
+    # sweep
+    p5 = sub.add_parser("sweep", help="Parallel parameter sweep over a strategy grid")
+    p5.add_argument("--strategy", default="EMA_trend_v2")
+    p5.add_argument("--symbol", default="QQQ")
+    p5.add_argument("--start", default="2003-01-01")
+    p5.add_argument("--end", default=None, help="结束日期，默认今日")
+    p5.add_argument(
+        "--param", action="append", metavar="KEY=V1,V2",
+        help="参数网格，可重复，如 --param ema_fast=60,80,100 --param vol_threshold=0.015,0.02",
+    )
+    p5.add_argument("--workers", type=int, default=None, help="并行进程数，默认 CPU 核数")
+    p5.add_argument("--output", "-o", default=None, help="结果 CSV；已存在时跳过其中已完成的组合（断点续跑）")
+    p5.add_argument("--engine", choices=["loop", "vectorized"], default="vectorized")
+    p5.add_argument("--sort-by", default="total_return", help="终端输出排序列")
+    p5.set_defaults(func=cmd_sweep)
+
+    # portfolio
+    p6 = sub.add_parser("portfolio", help="Multi-symbol portfolio backtest on a shared calendar")
+    p6.add_argument(
+        "--leg", action="append", metavar="SYMBOL:STRATEGY:WEIGHT",
+        help="组合的一条腿，可重复，如 --leg QQQ:EMA_trend_v2:0.6 --leg TQQQ:NDX_MA50_Volume_RSI:0.3（权重和 ≤ 1，余为现金）",
+    )
+    p6.add_argument("--start", default="2003-01-01")
+    p6.add_argument("--end", default=None, help="结束日期，默认今日")
+    p6.add_argument("--rebalance", choices=["none", "daily", "weekly", "monthly", "quarterly"], default="monthly")
+    p6.add_argument(
+        "--calendar", choices=["intersection", "union"], default="intersection",
+        help="共同交易日历：intersection 只保留各腿都有行情的日期；union 取并集",
+    )
+    p6.add_argument("--workers", type=int, default=None, help="并发拉取行情的线程数，默认每个标的一个")
+    p6.add_argument("--output", "-o", default=None, help="按日序列 CSV（组合权益、各腿市值与持仓）")
+    p6.set_defaults(func=cmd_portfolio)
+
+    # walk_forward
+    p7 = sub.add_parser("walk_forward", help="Walk-forward optimization with stitched out-of-sample equity")
+    p7.add_argument("--strategy", default="EMA_trend_v2")
+    p7.add_argument("--symbol", default="QQQ")
+    p7.add_argument("--start", default="2003-01-01")
+    p7.add_argument("--end", default=None, help="结束日期，默认今日")
+    p7.add_argument(
+        "--param", action="append", metavar="KEY=V1,V2",
+        help="参数网格，可重复；缺省时取 strategy.yaml 的 walk_forward.grids.<策略名>",
+    )
+    p7.add_argument("--train-years", type=int, default=None, help="训练窗口年数，默认取 walk_forward.train_years")
+    p7.add_argument("--test-years", type=int, default=None, help="测试窗口年数（滚动步长），默认取 walk_forward.test_years")
+    p7.add_argument("--anchored", action="store_true", help="训练窗口起点固定（扩张窗口）")
+    p7.add_argument(
+        "--metric", choices=["sharpe_ratio", "total_return", "profit_factor", "win_rate", "max_drawdown"], default=None,
+        help="训练窗口选参指标，默认取 walk_forward.metric",
+    )
+    p7.add_argument("--workers", type=int, default=None, help="并行进程数，默认 CPU 核数")
+    p7.add_argument("--output", "-o", default=None, help="样本外按日序列 CSV（权益、基准、持仓、窗口序号）")
+    p7.set_defaults(func=cmd_walk_forward)
+
+    # results：查看/对比回测结果库
+    p8 = sub.add_parser("results", help="List, show or compare stored backtest runs")
+    p8.add_argument("action", choices=["list", "show", "compare"])
+    p8.add_argument("keys", nargs="*", help="show/compare 的回测键（可用唯一前缀）")
+    p8.add_argument("--strategy", default=None, help="list：按策略过滤")
+    p8.add_argument("--symbol", default=None, help="list：按标的过滤")
+    p8.add_argument("--limit", type=int, default=50, help="list：最多显示条数")
+    p8.add_argument("--db", default=None, help="结果库路径，默认取 datasource.yaml 的 result_store.path")
+    p8.add_argument("--output", "-o", default=None, help="show：同时导出按日序列 CSV")
+    p8.set_defaults(func=cmd_results)
+
     args = parser.parse_args()
-    return args.func(args)
+    labels = {k: getattr(args, k, None) for k in ("strategy", "symbol", "engine")}
+    with profiling.profile_run(f"cli.{args.command}", args.profile, args.metrics_textfile, labels) as profile:
+        code = args.func(args)
+        if profile is not None and code:
+            profile.status = "error"
+    return code
 
 
 if __name__ == "__main__":
@@ -2,9 +2,10 @@
 配置加载：从 config/datasource.yaml、config/strategy.yaml 按 key 读取配置。
 仅负责加载与返回 dict，无业务逻辑。
 """
+import copy
 import os
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 try:
     import yaml
@@ -22,13 +23,34 @@ def _config_dir() -> Path:
     return pkg.parent / "config"
 
 
+# 已解析的 YAML：path -> (mtime_ns, data)；文件修改后自动重新加载
+_YAML_CACHE: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+
 def _load_yaml(path: Path) -> Dict[str, Any]:
+    """读取 YAML；按文件修改时间缓存解析结果，返回深拷贝，调用方可放心修改。"""
     if not path.exists():
         return {}
     if yaml is None:
         raise ImportError("PyYAML is required. Install with: pip install PyYAML")
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
+    mtime = path.stat().st_mtime_ns
+    cached = _YAML_CACHE.get(str(path))
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = (mtime, yaml.safe_load(f) or {})
+        _YAML_CACHE[str(path)] = cached
+    return copy.deepcopy(cached[1])
+
+
+def merge_config(base: Dict[str, Any], override: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """递归合并配置：override 中的 key 覆盖 base，嵌套 dict 逐层合并；不修改入参。"""
+    out = copy.deepcopy(base)
+    for key, value in (override or {}).items():
+        if isinstance(value, dict) and isinstance(out.get(key), dict):
+            out[key] = merge_config(out[key], value)
+        else:
+            out[key] = copy.deepcopy(value)
+    return out
 
 
 def get_datasource_config(index_code: Optional[str] = None) -> Dict[str, Any]:
@@ -43,6 +65,92 @@ def get_datasource_config(index_code: Optional[str] = None) -> Dict[str, Any]:
     return indices
 
 
+def get_cache_config() -> Dict[str, Any]:
+    """
+    读取本地行情缓存配置（config/datasource.yaml 的 cache 段），缺失项用默认值。
+    dir 为相对路径时相对于项目根目录（config 目录的上级）。
+    """
+    data = _load_yaml(_config_dir() / "datasource.yaml")
+    raw = data.get("cache", {}) or {}
+    cache_dir = Path(os.environ.get("NDX_RSI_CACHE_DIR") or raw.get("dir", "data_cache"))
+    if not cache_dir.is_absolute():
+        cache_dir = _config_dir().parent / cache_dir
+    return {
+        "enabled": raw.get("enabled", False),
+        "dir": str(cache_dir),
+        "ttl_hours": raw.get("ttl_hours", 12),
+    }
+
+
+def get_indicator_cache_config() -> Dict[str, Any]:
+    """
+    读取指标缓存配置（config/datasource.yaml 的 indicator_cache 段），缺失项用默认值。
+    dir 为相对路径时相对于项目根目录。
+    """
+    data = _load_yaml(_config_dir() / "datasource.yaml")
+    raw = data.get("indicator_cache", {}) or {}
+    cache_dir = Path(raw.get("dir", "data_cache/indicators"))
+    if not cache_dir.is_absolute():
+        cache_dir = _config_dir().parent / cache_dir
+    return {
+        "enabled": raw.get("enabled", True),
+        "max_entries": int(raw.get("max_entries", 256)),
+        "persist": raw.get("persist", False),
+        "dir": str(cache_dir),
+    }
+
+
+def get_result_store_config() -> Dict[str, Any]:
+    """
+    读取回测结果库配置（config/datasource.yaml 的 result_store 段），缺失项用默认值。
+    path 为相对路径时相对于项目根目录。
+    """
+    data = _load_yaml(_config_dir() / "datasource.yaml")
+    raw = data.get("result_store", {}) or {}
+    path = Path(raw.get("path", "data_cache/results.sqlite"))
+    if not path.is_absolute():
+        path = _config_dir().parent / path
+    return {
+        "enabled": raw.get("enabled", False),
+        "path": str(path),
+    }
+
+
+def get_fetcher_config() -> Dict[str, Any]:
+    """
+    读取批量拉取配置（config/datasource.yaml 的 fetcher 段，data/batch_fetch.py 使用），缺失项用默认值。
+    base_url 可用环境变量 NDX_RSI_FETCH_BASE_URL 覆盖（如指向本地镜像或测试服务）。
+    """
+    data = _load_yaml(_config_dir() / "datasource.yaml")
+    raw = data.get("fetcher", {}) or {}
+    return {
+        "base_url": os.environ.get("NDX_RSI_FETCH_BASE_URL") or raw.get("base_url", "https://query1.finance.yahoo.com"),
+        "max_workers": int(raw.get("max_workers", 8)),
+        "rate_per_second": float(raw.get("rate_per_second", 2.0)),
+        "burst": float(raw.get("burst", 4)),
+        "timeout": float(raw.get("timeout", 10.0)),
+        "max_retries": int(raw.get("max_retries", 4)),
+        "backoff_base": float(raw.get("backoff_base", 0.5)),
+        "backoff_cap": float(raw.get("backoff_cap", 30.0)),
+    }
+
+
+def get_profiling_config() -> Dict[str, Any]:
+    """
+    读取运行埋点配置（config/datasource.yaml 的 profiling 段）：json_path / textfile_path 为空表示不输出，
+    两者皆空时埋点关闭；环境变量 NDX_RSI_PROFILE、NDX_RSI_METRICS_TEXTFILE 优先。相对路径相对于项目根目录。
+    """
+    data = _load_yaml(_config_dir() / "datasource.yaml")
+    raw = data.get("profiling", {}) or {}
+    out: Dict[str, Any] = {}
+    for key, env in (("json_path", "NDX_RSI_PROFILE"), ("textfile_path", "NDX_RSI_METRICS_TEXTFILE")):
+        value = os.environ.get(env) or (raw.get(key) if raw.get("enabled", False) else None)
+        if value and not Path(value).is_absolute():
+            value = str(_config_dir().parent / value)
+        out[key] = value or None
+    return out
+
+
 def get_strategy_config(strategy_name: Optional[str] = None) -> Dict[str, Any]:
     """
     读取 strategy 配置。若提供 strategy_name，返回该策略配置 dict；否则返回全量 strategies。
@@ -81,3 +189,20 @@ def get_backtest_config() -> Dict[str, Any]:
         },
         "commission": raw.get("commission", 0.0005),
     }
+
+
+def get_walk_forward_config(strategy_name: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取滚动前推优化配置（config/strategy.yaml 的 walk_forward 段），缺失项用默认值。
+    提供 strategy_name 时 grid 为 walk_forward.grids.<strategy_name>（参数名 → 候选值列表），否则为空。
+    """
+    data = _load_yaml(_config_dir() / "strategy.yaml")
+    raw = data.get("walk_forward", {}) or {}
+    grids = raw.get("grids", {}) or {}
+    return {
+        "train_years": raw.get("train_years", 5),
+        "test_years": raw.get("test_years", 1),
+        "anchored": raw.get("anchored", False),
+        "metric": raw.get("metric", "sharpe_ratio"),
+        "grid": dict(grids.get(strategy_name, {}) or {}) if strategy_name is not None else {},
+    }
@@ -1,5 +1,24 @@
 from ndx_rsi.data.base import BaseDataSource
 from ndx_rsi.data.yfinance_source import YFinanceDataSource
+from ndx_rsi.data.batch_fetch import FetchError, TokenBucket, fetch_ohlcv_batch
+from ndx_rsi.data.cache import OHLCVCache
+from ndx_rsi.data.file_source import CSVDataSource, ColumnarFileDataSource
+from ndx_rsi.data.factory import create_data_source
 from ndx_rsi.data.preprocess import preprocess_ohlcv
+from ndx_rsi.data.resample import resample_ohlcv
+from ndx_rsi.data.synthetic import generate_ohlcv
 
-__all__ = ["BaseDataSource", "YFinanceDataSource", "preprocess_ohlcv"]
+__all__ = [
+    "BaseDataSource",
+    "YFinanceDataSource",
+    "FetchError",
+    "TokenBucket",
+    "fetch_ohlcv_batch",
+    "OHLCVCache",
+    "CSVDataSource",
+    "ColumnarFileDataSource",
+    "create_data_source",
+    "preprocess_ohlcv",
+    "resample_ohlcv",
+    "generate_ohlcv",
+]
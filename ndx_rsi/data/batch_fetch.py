@@ -0,0 +1,242 @@
+"""
+批量并发拉取：多个 (标的, 周期) 直接请求 Yahoo chart 接口（/v8/finance/chart/<code>），返回 {(标的, 周期): DataFrame}。
+- 有界线程池（I/O 为主，同 portfolio 并发拉取），所有请求共用一个令牌桶限速
+- 可重试错误（超时、连接错误、响应体截断等 HTTPException、HTTP 429/5xx）按带抖动的指数退避重试（full jitter），429 时不短于 Retry-After
+- 每个请求单独超时；4xx（除 429）与接口返回的 error 不重试
+- 输出与 YFinanceDataSource 一致：列名小写、按复权收盘价调整 OHLC（同 yfinance auto_adjust）、交易所时区索引
+- 传入 OHLCVCache 时按标的/周期走本地缓存，只拉缺失部分
+base_url 等默认值取 datasource.yaml 的 fetcher 段（get_fetcher_config），测试中可指向本地服务。
+"""
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi import profiling
+from ndx_rsi.data.cache import OHLCVCache
+from ndx_rsi.data.yfinance_source import _FREQ_TO_INTERVAL
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+# 日线及以上周期：时间戳归一到交易所时区的当日零点（与 yfinance 一致）
+_DAILY_INTERVALS = ("1d", "5d", "1wk", "1mo", "3mo")
+_USER_AGENT = "Mozilla/5.0 (ndx_rsi batch fetcher)"
+
+
+class FetchError(RuntimeError):
+    """拉取失败；retryable 表示可重试（超时、限流、服务端错误）。"""
+
+    def __init__(self, message: str, retryable: bool = False, retry_after: Optional[float] = None) -> None:
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多存 capacity 个；acquire() 取一个，不足时阻塞等待。线程安全。"""
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.capacity = max(float(capacity), 1.0)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """取一个令牌，返回等待的秒数。"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return waited
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0, rng: Optional[random.Random] = None) -> float:
+    """第 attempt 次重试（从 0 起）前的等待：均匀抽样于 [0, min(cap, base × 2^attempt)]（full jitter）。"""
+    return (rng or random).uniform(0.0, min(cap, base * (2 ** attempt)))
+
+
+def _epoch(date_str: str) -> int:
+    return int(pd.Timestamp(date_str, tz="UTC").timestamp())
+
+
+def chart_url(base_url: str, code: str, start_date: str, end_date: str, interval: str) -> str:
+    query = urllib.parse.urlencode({
+        "period1": _epoch(start_date),
+        "period2": _epoch(end_date),
+        "interval": interval,
+        "events": "div,splits",
+        "includeAdjustedClose": "true",
+    })
+    return f"{base_url.rstrip('/')}/v8/finance/chart/{urllib.parse.quote(code, safe='')}?{query}"
+
+
+def parse_chart(payload: Dict[str, Any], interval: str = "1d") -> pd.DataFrame:
+    """chart 接口 JSON → OHLCV DataFrame；接口返回 error 时抛 FetchError（不重试）。"""
+    chart = payload.get("chart") or {}
+    if chart.get("error"):
+        err = chart["error"]
+        raise FetchError(f"{err.get('code')}: {err.get('description')}" if isinstance(err, dict) else str(err))
+    result = (chart.get("result") or [None])[0]
+    if not result or not result.get("timestamp"):
+        return pd.DataFrame(columns=OHLCV_COLUMNS)
+    indicators = result.get("indicators") or {}
+    quote = (indicators.get("quote") or [{}])[0]
+    n = len(result["timestamp"])
+    df = pd.DataFrame({c: np.asarray(quote.get(c) or [None] * n, dtype=float) for c in OHLCV_COLUMNS})
+    adjclose = (indicators.get("adjclose") or [{}])[0].get("adjclose")
+    if adjclose is not None:
+        # 按复权收盘价整体调整 OHLC
+        adj = np.asarray(adjclose, dtype=float)
+        ratio = adj / df["close"].to_numpy()
+        for col in ("open", "high", "low"):
+            df[col] = df[col].to_numpy() * ratio
+        df["close"] = adj
+    tz = (result.get("meta") or {}).get("exchangeTimezoneName") or "America/New_York"
+    index = pd.to_datetime(np.asarray(result["timestamp"], dtype="int64"), unit="s", utc=True).tz_convert(tz)
+    if interval in _DAILY_INTERVALS:
+        index = index.normalize()
+    df.index = index.rename("Date")
+    df = df[df["close"].notna()]
+    return df[~df.index.duplicated(keep="last")].sort_index()
+
+
+def _request_json(url: str, timeout: float) -> Dict[str, Any]:
+    """单次 GET；把网络/HTTP 错误统一为 FetchError（标注是否可重试）。"""
+    req = urllib.request.Request(url, headers={"User-Agent": _USER_AGENT, "Accept": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+    except urllib.error.HTTPError as e:
+        retry_after = e.headers.get("Retry-After") if e.headers else None
+        retryable = e.code == 429 or e.code >= 500
+        try:
+            # chart 接口 4xx 时也返回带 error 的 JSON（如未知标的）
+            payload = json.loads(e.read() or b"{}")
+        except ValueError:
+            payload = {}
+        if not retryable and (payload.get("chart") or {}).get("error"):
+            parse_chart(payload)
+        raise FetchError(
+            f"HTTP {e.code} for {url}",
+            retryable=retryable,
+            retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+        ) from e
+    except (urllib.error.URLError, http.client.HTTPException, socket.timeout, TimeoutError, ConnectionError) as e:
+        raise FetchError(f"{type(e).__name__} for {url}: {e}", retryable=True) from e
+    try:
+        return json.loads(body)
+    except ValueError as e:
+        raise FetchError(f"Invalid JSON from {url}", retryable=True) from e
+
+
+def fetch_chart(
+    code: str,
+    start_date: str,
+    end_date: str,
+    frequency: str = "1d",
+    base_url: Optional[str] = None,
+    timeout: Optional[float] = None,
+    max_retries: Optional[int] = None,
+    backoff_base: Optional[float] = None,
+    backoff_cap: Optional[float] = None,
+    limiter: Optional[TokenBucket] = None,
+) -> pd.DataFrame:
+    """拉取单个标的/周期的 [start_date, end_date)；可重试错误按退避重试 max_retries 次后抛出最后一次 FetchError。"""
+    from ndx_rsi.config_loader import get_fetcher_config
+
+    cfg = get_fetcher_config()
+    base_url = base_url or cfg["base_url"]
+    timeout = cfg["timeout"] if timeout is None else timeout
+    max_retries = cfg["max_retries"] if max_retries is None else max_retries
+    backoff_base = cfg["backoff_base"] if backoff_base is None else backoff_base
+    backoff_cap = cfg["backoff_cap"] if backoff_cap is None else backoff_cap
+    interval = _FREQ_TO_INTERVAL.get(frequency, "1d")
+    url = chart_url(base_url, code, start_date, end_date, interval)
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            profiling.add_time("fetch.rate_limit_wait", limiter.acquire())
+        profiling.count("fetch.requests")
+        try:
+            with profiling.timer("fetch.request"):
+                return parse_chart(_request_json(url, timeout), interval)
+        except FetchError as e:
+            if not e.retryable or attempt == max_retries:
+                profiling.count("fetch.failures")
+                raise
+            profiling.count("fetch.retries")
+            time.sleep(max(backoff_delay(attempt, backoff_base, backoff_cap), e.retry_after or 0.0))
+    raise AssertionError("unreachable")
+
+
+def fetch_ohlcv_batch(
+    symbols: Iterable[str],
+    start_date: str,
+    end_date: str,
+    frequencies: Sequence[str] = ("1d",),
+    max_workers: Optional[int] = None,
+    rate_per_second: Optional[float] = None,
+    burst: Optional[float] = None,
+    cache: Optional[OHLCVCache] = None,
+    on_error: str = "raise",
+    **request_kwargs: Any,
+) -> Dict[Tuple[str, str], pd.DataFrame]:
+    """
+    并发拉取 symbols × frequencies（symbols 为 Yahoo 代码，如 ^NDX、QQQ），返回 {(symbol, frequency): DataFrame}。
+    max_workers / rate_per_second / burst 缺省取 fetcher 配置；request_kwargs 透传给 fetch_chart（base_url、timeout 等）。
+    on_error="raise" 时全部完成后若有失败抛 FetchError（列出失败项）；"skip" 时结果中不含失败项。
+    """
+    from ndx_rsi.config_loader import get_fetcher_config
+
+    if on_error not in ("raise", "skip"):
+        raise ValueError(f"Unknown on_error: {on_error}. Available: ['raise', 'skip']")
+    cfg = get_fetcher_config()
+    limiter = TokenBucket(
+        cfg["rate_per_second"] if rate_per_second is None else rate_per_second,
+        cfg["burst"] if burst is None else burst,
+    )
+    keys = list(dict.fromkeys((s, f) for s in symbols for f in frequencies))
+    if not keys:
+        return {}
+
+    def fetch(key: Tuple[str, str]) -> pd.DataFrame:
+        symbol, frequency = key
+
+        def download(start: str, end: str) -> pd.DataFrame:
+            return fetch_chart(symbol, start, end, frequency, limiter=limiter, **request_kwargs)
+
+        if cache is None:
+            return download(start_date, end_date)
+        return cache.get(symbol, _FREQ_TO_INTERVAL.get(frequency, "1d"), start_date, end_date, fetch=download)
+
+    def safe_fetch(key: Tuple[str, str]) -> Any:
+        try:
+            return fetch(key)
+        except FetchError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=min(max_workers or cfg["max_workers"], len(keys))) as pool:
+        out = dict(zip(keys, pool.map(safe_fetch, keys)))
+    errors = {k: v for k, v in out.items() if isinstance(v, FetchError)}
+    if errors and on_error == "raise":
+        detail = "; ".join(f"{s} {f}: {e}" for (s, f), e in errors.items())
+        raise FetchError(f"{len(errors)}/{len(keys)} fetches failed: {detail}")
+    return {k: v for k, v in out.items() if k not in errors}
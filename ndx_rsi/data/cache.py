@@ -0,0 +1,188 @@
+"""
+本地 OHLCV 缓存：按 标的/周期 一个文件（Parquet 列式；未安装 pyarrow 时退化为 pickle），
+附带 .meta.json 记录已拉取过的日期区间 ranges（[起, 止) 列表）与最近一次刷新尾部的时间 fetched_at。
+- 请求区间已被 ranges 覆盖 → 直接读文件，不联网
+- 区间内未覆盖的部分（头部、中间空洞、尾部）→ 逐段拉取，合并后原子写回；返回空结果的段不记入 ranges
+- 请求区间含缓存最后一根 K 线且尾部刷新已超过 ttl_hours → 从该根所在日起重拉（可能未收盘的数据）
+- 只补头部/空洞时不更新 fetched_at
+旧格式 meta（只有 start）不含区间信息，首次请求时按未覆盖整段重拉。
+分红/拆股导致历史复权价整体变化时，删除对应缓存文件即可重新全量拉取。
+"""
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# pyarrow 可选：未安装时缓存用 pickle 存储
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PARQUET = True
+except ImportError:
+    _HAS_PARQUET = False
+
+DEFAULT_TTL_HOURS = 12.0
+
+
+def _to_index_ts(date_str: str, index: pd.DatetimeIndex) -> pd.Timestamp:
+    """把 YYYY-MM-DD 转成与索引同时区的 Timestamp，便于比较。"""
+    ts = pd.Timestamp(date_str)
+    if index.tz is not None and ts.tzinfo is None:
+        ts = ts.tz_localize(index.tz)
+    return ts
+
+
+def slice_range(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+    """取 [start_date, end_date) 区间（与 yfinance 的 end 不含当日口径一致）。"""
+    if df.empty:
+        return df
+    start = _to_index_ts(start_date, df.index)
+    end = _to_index_ts(end_date, df.index)
+    return df[(df.index >= start) & (df.index < end)]
+
+
+class OHLCVCache:
+    """按 标的/周期 持久化 OHLCV，支持增量补尾。"""
+
+    def __init__(self, cache_dir: str, ttl_hours: float = DEFAULT_TTL_HOURS) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.ttl_hours = float(ttl_hours)
+
+    def _base(self, symbol: str, interval: str) -> Path:
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", symbol)
+        return self.cache_dir / f"{safe}_{interval}"
+
+    def _data_path(self, symbol: str, interval: str) -> Path:
+        return self._base(symbol, interval).with_suffix(".parquet" if _HAS_PARQUET else ".pkl")
+
+    def _meta_path(self, symbol: str, interval: str) -> Path:
+        return self._base(symbol, interval).with_suffix(".meta.json")
+
+    def load(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        path = self._data_path(symbol, interval)
+        if not path.exists():
+            return None
+        if _HAS_PARQUET:
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def load_meta(self, symbol: str, interval: str) -> Dict[str, Any]:
+        path = self._meta_path(symbol, interval)
+        if not path.exists():
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, symbol: str, interval: str, df: pd.DataFrame, meta: Dict[str, Any]) -> None:
+        """先写临时文件再 os.replace，中途崩溃不会留下半截缓存。"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._data_path(symbol, interval)
+        tmp = path.with_name(path.name + ".tmp")
+        if _HAS_PARQUET:
+            df.to_parquet(tmp)
+        else:
+            df.to_pickle(tmp)
+        os.replace(tmp, path)
+        meta_path = self._meta_path(symbol, interval)
+        meta_tmp = meta_path.with_name(meta_path.name + ".tmp")
+        with open(meta_tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(meta_tmp, meta_path)
+
+    def is_fresh(self, meta: Dict[str, Any]) -> bool:
+        fetched_at = meta.get("fetched_at")
+        return fetched_at is not None and (time.time() - float(fetched_at)) < self.ttl_hours * 3600
+
+    def get(
+        self,
+        symbol: str,
+        interval: str,
+        start_date: str,
+        end_date: str,
+        fetch: Callable[[str, str], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """
+        返回 [start_date, end_date) 的行情；fetch(start, end) 为联网拉取函数，仅对未覆盖的部分与需刷新的尾部调用。
+        """
+        cached = self.load(symbol, interval)
+        meta = self.load_meta(symbol, interval)
+        if cached is not None and cached.empty:
+            cached = None
+        ranges = [] if cached is None else [(str(a), str(b)) for a, b in meta.get("ranges", [])]
+        start, end = _day(start_date), _day(end_date)
+        # 未覆盖的部分总是拉取；TTL 只决定是否重拉最后一根 K 线所在日（可能未收盘）
+        segments = _uncovered(start, end, ranges)
+        last_day = ""
+        if cached is not None and ranges:
+            last_day = cached.index[-1].strftime("%Y-%m-%d")
+            if start <= last_day < end and not self.is_fresh(meta):
+                segments.append((last_day, end))
+        segments = [(a, b) for a, b in _union(segments)]
+        if not segments:
+            return slice_range(cached, start_date, end_date)
+
+        today = time.strftime("%Y-%m-%d")
+        frames = [cached]
+        refreshed = False
+        for seg_start, seg_end in segments:
+            frame = fetch(seg_start, seg_end)
+            frames.append(frame)
+            # 空结果（限流、接口异常等）不记为已覆盖，下次重拉；整段在今天之后的除外
+            if not frame.empty or seg_start > today:
+                ranges.append((seg_start, seg_end))
+            # 拉到最后一根 K 线之后（或首次拉取）才算刷新了尾部
+            refreshed = refreshed or seg_end > last_day
+        merged = frames[0]
+        for frame in frames[1:]:
+            merged = _merge(merged, frame)
+        if not merged.empty:
+            fetched_at = time.time() if refreshed else meta.get("fetched_at")
+            self.save(symbol, interval, merged, {"ranges": _union(ranges), "fetched_at": fetched_at})
+        return slice_range(merged, start_date, end_date)
+
+
+def _day(date_str: str) -> str:
+    return pd.Timestamp(date_str).strftime("%Y-%m-%d")
+
+
+def _union(ranges: List[Tuple[str, str]]) -> List[List[str]]:
+    """合并重叠或相接的 [起, 止) 区间。"""
+    out: List[List[str]] = []
+    for a, b in sorted(ranges):
+        if out and a <= out[-1][1]:
+            out[-1][1] = max(out[-1][1], b)
+        else:
+            out.append([a, b])
+    return out
+
+
+def _uncovered(start: str, end: str, ranges: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """[start, end) 中未被 ranges 覆盖的部分，按时间顺序。"""
+    gaps: List[Tuple[str, str]] = []
+    cur = start
+    for a, b in _union(ranges):
+        if b <= cur:
+            continue
+        if a >= end:
+            break
+        if a > cur:
+            gaps.append((cur, a))
+        cur = max(cur, b)
+        if cur >= end:
+            break
+    if cur < end:
+        gaps.append((cur, end))
+    return gaps
+
+
+def _merge(cached: Optional[pd.DataFrame], new: pd.DataFrame) -> pd.DataFrame:
+    """合并缓存与新数据：同一时间戳以新数据为准，按时间排序。"""
+    if cached is None or cached.empty:
+        return new.sort_index()
+    if new is None or new.empty:
+        return cached
+    merged = pd.concat([cached, new])
+    return merged[~merged.index.duplicated(keep="last")].sort_index()
@@ -0,0 +1,37 @@
+"""
+数据源工厂：按 datasource.yaml 中的 data_source 字段创建数据源实例。
+- yfinance（默认）：联网拉取，经本地 OHLCV 缓存
+- file：读取 path 指定的本地文件；.parquet/.feather/.arrow 走列式内存映射，其余按 CSV 读取
+"""
+from pathlib import Path
+from typing import Optional
+
+from ndx_rsi.data.base import BaseDataSource
+
+DATA_SOURCES = ("yfinance", "file")
+
+
+def create_data_source(symbol: str, config: Optional[dict] = None) -> BaseDataSource:
+    """根据 config["data_source"] 创建数据源；config 为空时按 yfinance 处理。"""
+    config = config or {"code": symbol}
+    kind = config.get("data_source", "yfinance")
+    if kind == "yfinance":
+        from ndx_rsi.data.yfinance_source import YFinanceDataSource
+
+        return YFinanceDataSource(symbol, config)
+    if kind == "file":
+        from ndx_rsi.data.file_source import (
+            COLUMNAR_SUFFIXES,
+            ColumnarFileDataSource,
+            CSVDataSource,
+        )
+
+        path = config.get("path")
+        if isinstance(path, dict):
+            path = next(iter(path.values()), None)
+        if not path:
+            raise ValueError(f"data_source 'file' requires 'path' for {symbol}")
+        if Path(path).suffix.lower() in COLUMNAR_SUFFIXES:
+            return ColumnarFileDataSource(symbol, config)
+        return CSVDataSource(symbol, config)
+    raise ValueError(f"Unknown data_source: {kind}. Available: {list(DATA_SOURCES)}")
@@ -0,0 +1,147 @@
+"""
+本地文件数据源：离线、可复现地读取 OHLCV（datasource.yaml 中 data_source: file）。
+- CSVDataSource：CSV（如 fetch_data -o 导出的文件），安装 pyarrow 时用其多线程解析
+- ColumnarFileDataSource：Parquet / Feather(Arrow IPC)，经 pyarrow 内存映射读取，数值列尽量零拷贝转为 DataFrame
+同一进程内按 (路径, 修改时间) 缓存解析结果，重复打开同一文件无需再解析。
+配置 resample_from 时，未单独给出文件的更粗周期由该周期的文件重采样得到。
+"""
+import re
+from abc import abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, Tuple, Union
+
+import pandas as pd
+
+from ndx_rsi import profiling
+from ndx_rsi.data.base import BaseDataSource
+from ndx_rsi.data.cache import slice_range
+from ndx_rsi.data.resample import resample_for_config, resample_source
+
+# pyarrow 可选：Parquet/Feather 必需；CSV 有则用于加速解析
+try:
+    import pyarrow  # noqa: F401
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+DEFAULT_TIMEZONE = "America/New_York"
+COLUMNAR_SUFFIXES = (".parquet", ".pq", ".feather", ".arrow")
+# 时间戳带 UTC 偏移（如 -05:00）或 Z 结尾
+_TZ_SUFFIX = re.compile(r"([+-]\d{2}:?\d{2}|Z)$")
+
+# (resolved path, 周期) -> (mtime_ns, 已解析或重采样的 DataFrame)；周期为空串表示文件原样。
+# 每个文件只留一份，文件修改后下次读取时替换旧结果
+_LOADED: Dict[Tuple[str, str], Tuple[int, pd.DataFrame]] = {}
+
+
+def resolve_data_path(path: Union[str, Path]) -> Path:
+    """相对路径按项目根目录（config 目录的上级）解析。"""
+    from ndx_rsi.config_loader import _config_dir
+
+    p = Path(path)
+    return p if p.is_absolute() else _config_dir().parent / p
+
+
+def _normalize(df: pd.DataFrame, timezone: str) -> pd.DataFrame:
+    """列名小写、只保留 OHLCV、索引转为按时间排序的 DatetimeIndex。"""
+    df.columns = [str(c).lower() for c in df.columns]
+    for col in ("date", "datetime"):
+        # Feather 不保存索引，日期以普通列写入
+        if col in df.columns:
+            df = df.set_index(col)
+            break
+    df = df[[c for c in OHLCV_COLUMNS if c in df.columns]]
+    index = df.index
+    if not isinstance(index, pd.DatetimeIndex):
+        first = str(index[0]) if len(index) else ""
+        # 夏令时前后偏移不同（-05:00/-04:00），统一按 UTC 解析
+        index = pd.to_datetime(index, utc=bool(_TZ_SUFFIX.search(first)))
+    if index.tz is not None:
+        index = index.tz_convert(timezone)
+    # 各格式/解析引擎的时间精度不同（s/ms/ns），统一为 ns
+    df.index = index.astype(pd.DatetimeTZDtype("ns", index.tz) if index.tz is not None else "datetime64[ns]")
+    df.index.name = "Date"
+    return df if df.index.is_monotonic_increasing else df.sort_index()
+
+
+def _cached(path: Path, frequency: str, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """按 (路径, 周期) 取已解析结果；文件 mtime 变化时重建并替换。"""
+    key, mtime = (str(path), frequency), path.stat().st_mtime_ns
+    hit = _LOADED.get(key)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    df = build()
+    _LOADED[key] = (mtime, df)
+    return df
+
+
+class _FileDataSource(BaseDataSource):
+    """文件数据源公共逻辑：按频率取路径、加载缓存、区间切片。"""
+
+    def _path(self, frequency: str) -> Path:
+        path = self.config.get("path")
+        if isinstance(path, dict):
+            path = path.get(frequency)
+        if not path:
+            raise ValueError(f"No data file configured for {self.index_code} ({frequency})")
+        return resolve_data_path(path)
+
+    @abstractmethod
+    def _read(self, path: Path) -> pd.DataFrame:
+        """读取文件为原始 DataFrame（列名、索引由 _normalize 统一）。"""
+
+    def load(self, frequency: str = "1d") -> pd.DataFrame:
+        """读取整份文件（同一文件未修改时直接返回已解析结果）。"""
+        path_cfg = self.config.get("path")
+        source = resample_source(self.config, frequency)
+        if source is not None and not (isinstance(path_cfg, dict) and path_cfg.get(frequency)):
+            def build() -> pd.DataFrame:
+                with profiling.timer("data.resample"):
+                    return resample_for_config(self.load(source), frequency, self.config)
+
+            return _cached(self._path(source), frequency, build)
+        path = self._path(frequency)
+        return _cached(path, "", lambda: _normalize(self._read(path), self.config.get("timezone", DEFAULT_TIMEZONE)))
+
+    def get_historical_data(
+        self,
+        start_date: str,
+        end_date: str,
+        frequency: str = "1d",
+    ) -> pd.DataFrame:
+        return slice_range(self.load(frequency), start_date, end_date)
+
+    def get_realtime_data(self) -> pd.DataFrame:
+        """文件无实时数据：取文件中最近 120 天，保证结果可复现。"""
+        df = self.load("1d")
+        if df.empty:
+            return df
+        return df[df.index >= df.index[-1] - pd.Timedelta(days=120)]
+
+
+class CSVDataSource(_FileDataSource):
+    """CSV 文件数据源；首列为日期索引。"""
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        if _HAS_PYARROW:
+            return pd.read_csv(path, index_col=0, engine="pyarrow")
+        return pd.read_csv(path, index_col=0)
+
+
+class ColumnarFileDataSource(_FileDataSource):
+    """Parquet / Feather 文件数据源；pyarrow 内存映射读取。"""
+
+    def _read(self, path: Path) -> pd.DataFrame:
+        if not _HAS_PYARROW:
+            raise ImportError("pyarrow is required for Parquet/Feather data files. Install with: pip install pyarrow")
+        if path.suffix.lower() in (".feather", ".arrow"):
+            import pyarrow.feather as feather
+
+            table = feather.read_table(path, memory_map=True)
+        else:
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path, memory_map=True)
+        # split_blocks 避免把各列合并成一个二维块，无空值的数值列可直接引用 Arrow 缓冲区
+        return table.to_pandas(split_blocks=True)
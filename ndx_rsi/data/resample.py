@@ -0,0 +1,96 @@
+"""
+本地重采样：由更细周期的 OHLCV（如 30m）合成 1h / 1d / 1w，切换周期无需再联网。
+- 聚合：open 取首、high 取最大、low 取最小、close 取末、volume 求和
+- 按交易所时区与常规交易时段分桶：日内 Bar 只保留 [开盘, 收盘) 内的数据（剔除盘前盘后）；
+  1h 从开盘起算（9:30、10:30 … 15:30，末根半小时），与 yfinance 1h 一致
+- 1d 标为当日零点，1w 标为该周周一零点（与 yfinance 日线/周线一致）；区间末尾未走完的周期照常输出
+数据源配置 resample_from（如 "30m"）后，更粗的周期由该周期的缓存序列重采样得到，只需存储和更新最细的一份。
+"""
+from typing import Dict, Optional, Sequence
+
+import pandas as pd
+
+DEFAULT_TIMEZONE = "America/New_York"
+DEFAULT_SESSION = ("09:30", "16:00")
+OHLCV_AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"}
+
+# 各周期的分钟数（用于判断粗细与能否整除）；1d/1w 按自然日计
+FREQUENCY_MINUTES: Dict[str, int] = {
+    "1m": 1, "2m": 2, "5m": 5, "15m": 15, "30m": 30, "60m": 60, "1h": 60, "90m": 90,
+    "1d": 1440, "1w": 10080, "1wk": 10080,
+}
+RESAMPLE_TARGETS = ("1h", "60m", "1d", "1w", "1wk")
+
+
+def _minutes(frequency: str) -> int:
+    if frequency not in FREQUENCY_MINUTES:
+        raise ValueError(f"Unknown frequency: {frequency}. Available: {list(FREQUENCY_MINUTES)}")
+    return FREQUENCY_MINUTES[frequency]
+
+
+def can_resample(source: str, target: str) -> bool:
+    """target 是否可由 source 合成：target 为支持的目标周期、比 source 粗，日内周期须能整除。"""
+    if target not in RESAMPLE_TARGETS or source not in FREQUENCY_MINUTES:
+        return False
+    src, dst = _minutes(source), _minutes(target)
+    return dst > src and (dst >= 1440 or dst % src == 0)
+
+
+def resample_ohlcv(
+    df: pd.DataFrame,
+    frequency: str,
+    session: Sequence[str] = DEFAULT_SESSION,
+    timezone: str = DEFAULT_TIMEZONE,
+) -> pd.DataFrame:
+    """
+    把 df（DatetimeIndex，列含 open/high/low/close/volume 中的若干列）重采样为 frequency（1h/1d/1w）。
+    带时区的索引先转到 timezone 再分桶，结果索引为 timezone 下的时间；无时区索引视为交易所本地时间。
+    源数据为日内 Bar 时按 session（开盘, 收盘）过滤；源为日线（时间均为零点）时不过滤。
+    """
+    if frequency not in RESAMPLE_TARGETS:
+        raise ValueError(f"Unknown frequency: {frequency}. Available: {list(RESAMPLE_TARGETS)}")
+    cols = [c for c in OHLCV_AGG if c in df.columns]
+    if df.empty:
+        return df[cols].copy()
+    tz = None if df.index.tz is None else timezone
+    # 按本地墙上时间分桶（夏令时切换日的零点 + 9:30 仍是 9:30），最后再加回时区
+    index = df.index if tz is None else df.index.tz_convert(tz).tz_localize(None)
+    day = index.normalize()
+    open_offset, close_offset = (pd.Timedelta(f"{t}:00") for t in session)
+    data = df[cols]
+    if (index != day).any():
+        # 日内源：只保留常规交易时段
+        in_session = ((index - day) >= open_offset) & ((index - day) < close_offset)
+        data, index, day = data[in_session], index[in_session], day[in_session]
+    if frequency == "1d":
+        keys = day
+    elif frequency in ("1w", "1wk"):
+        keys = day - pd.to_timedelta(day.weekday, unit="D")
+    else:
+        step = pd.Timedelta(minutes=_minutes(frequency))
+        opened = day + open_offset
+        keys = opened + ((index - opened) // step) * step
+    out = data.groupby(keys, sort=True).agg({c: OHLCV_AGG[c] for c in cols})
+    if tz is not None:
+        out.index = out.index.tz_localize(tz)
+    out.index.name = "Date"
+    if "close" in out.columns:
+        out = out[out["close"].notna()]
+    return out
+
+
+def resample_for_config(df: pd.DataFrame, frequency: str, config: dict) -> pd.DataFrame:
+    """按数据源配置（session、timezone）重采样。"""
+    return resample_ohlcv(
+        df, frequency,
+        session=tuple(config.get("session") or DEFAULT_SESSION),
+        timezone=config.get("timezone", DEFAULT_TIMEZONE),
+    )
+
+
+def resample_source(config: dict, frequency: str) -> Optional[str]:
+    """配置了 resample_from 且 frequency 可由其合成时返回源周期，否则 None（照常按 frequency 取数）。"""
+    source = config.get("resample_from")
+    if source and can_resample(source, frequency):
+        return source
+    return None
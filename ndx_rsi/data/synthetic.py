@@ -0,0 +1,69 @@
+"""
+合成行情：几何布朗运动 + 马尔可夫状态切换（牛市/熊市/震荡），生成带成交量的 OHLCV，用于基准测试与离线试验。
+- 每根 Bar 以 1/mean_regime_bars 概率切换到另一状态，各状态有各自的年化漂移、波动率与成交量倍数
+- open 为上一收盘加跳空，high/low 在 open/close 外侧按波动率扩展；成交量随状态与 |收益| 放大
+- 全部向量化生成，百万根 Bar 在秒级完成；同一 seed 结果一致
+日线（freq="B"）的时间戳上限为 2262 年（pandas 纳秒精度），自 2000 年起约容 6.8 万根；更多 Bar 请用分钟线等更高频率。
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# 状态：年化漂移、年化波动率、成交量倍数
+REGIMES: Dict[str, Dict[str, float]] = {
+    "bull": {"drift": 0.15, "vol": 0.15, "volume": 1.0},
+    "bear": {"drift": -0.25, "vol": 0.35, "volume": 1.6},
+    "sideways": {"drift": 0.0, "vol": 0.12, "volume": 0.8},
+}
+
+
+def generate_ohlcv(
+    n_bars: int,
+    start: str = "2000-01-03",
+    freq: str = "B",
+    seed: Optional[int] = None,
+    s0: float = 100.0,
+    regimes: Optional[Dict[str, Dict[str, float]]] = None,
+    mean_regime_bars: float = 250.0,
+    periods_per_year: int = 252,
+    base_volume: float = 1e7,
+    with_regime: bool = False,
+) -> pd.DataFrame:
+    """
+    生成 n_bars 根 OHLCV（索引为 DatetimeIndex "Date"，列 open/high/low/close/volume）。
+    regimes 缺省为 REGIMES；漂移与波动率按 periods_per_year 折算到每根 Bar。
+    with_regime=True 时另含 regime 列（状态名），便于检查策略在各状态下的表现。
+    """
+    regimes = regimes or REGIMES
+    if n_bars < 1:
+        raise ValueError("n_bars must be >= 1")
+    if mean_regime_bars < 1:
+        raise ValueError("mean_regime_bars must be >= 1")
+    rng = np.random.default_rng(seed)
+    names = list(regimes)
+    k = len(names)
+    drift = np.array([regimes[r]["drift"] for r in names]) / periods_per_year
+    sigma = np.array([regimes[r]["vol"] for r in names]) / np.sqrt(periods_per_year)
+    volume_mult = np.array([regimes[r].get("volume", 1.0) for r in names])
+
+    # 状态序列：切换时跳到其余 k-1 个状态之一
+    switch = rng.random(n_bars) < 1.0 / mean_regime_bars
+    switch[0] = False
+    steps = np.where(switch, rng.integers(1, k, size=n_bars) if k > 1 else 0, 0)
+    state = (rng.integers(0, k) + np.cumsum(steps)) % k
+
+    mu, sd = drift[state], sigma[state]
+    z = rng.standard_normal(n_bars)
+    close = s0 * np.exp(np.cumsum(mu - 0.5 * sd * sd + sd * z))
+    prev_close = np.concatenate(([s0], close[:-1]))
+    open_ = prev_close * np.exp(0.3 * sd * rng.standard_normal(n_bars))
+    high = np.maximum(open_, close) * np.exp(0.5 * sd * np.abs(rng.standard_normal(n_bars)))
+    low = np.minimum(open_, close) * np.exp(-0.5 * sd * np.abs(rng.standard_normal(n_bars)))
+    volume = np.round(base_volume * volume_mult[state] * (0.5 + np.abs(z)) * rng.lognormal(0.0, 0.25, n_bars))
+
+    index = pd.date_range(start, periods=n_bars, freq=freq, name="Date")
+    data: Dict[str, Any] = {"open": open_, "high": high, "low": low, "close": close, "volume": volume}
+    if with_regime:
+        data["regime"] = np.array(names, dtype=object)[state]
+    return pd.DataFrame(data, index=index)
@@ -1,12 +1,17 @@
 """
 YFinance 数据源实现：拉取 NDX/QQQ/TQQQ 等日线或分钟线，列名统一小写，优先前复权。
+启用本地缓存（datasource.yaml 的 cache 段）时，仅在缓存缺失或过期时联网补齐。
+配置 resample_from 时，更粗的周期由该周期序列本地重采样得到（见 data/resample.py）。
 """
 import time
 from typing import Optional
 
 import pandas as pd
 
+from ndx_rsi import profiling
 from ndx_rsi.data.base import BaseDataSource
+from ndx_rsi.data.cache import OHLCVCache
+from ndx_rsi.data.resample import resample_for_config, resample_source
 
 
 # yfinance interval: 1m, 2m, 5m, 15m, 30m, 60m, 1d, 5d, 1wk, 1mo
@@ -21,19 +26,27 @@ def _fetch_hist_with_retry(
 
     last_err = None
     for attempt in range(max_retries):
+        if attempt:
+            profiling.count("yfinance.retries")
+        profiling.count("yfinance.requests")
         try:
-            hist = ticker.history(start=start_date, end=end_date, interval=interval)
+            with profiling.timer("yfinance.history"):
+                hist = ticker.history(start=start_date, end=end_date, interval=interval)
             if hist is not None and not hist.empty:
                 return hist
+            profiling.count("yfinance.empty_responses")
             if attempt < max_retries - 1:
                 time.sleep(1.5)
         except (TypeError, KeyError, AttributeError) as e:
+            profiling.count("yfinance.errors")
             last_err = e
             if attempt < max_retries - 1:
                 time.sleep(1.5)
     # 用 download 兜底（部分环境下更稳定）
+    profiling.count("yfinance.fallback_downloads")
     try:
-        df = yf.download(symbol, start=start_date, end=end_date, interval=interval, progress=False, auto_adjust=True)
+        with profiling.timer("yfinance.download"):
+            df = yf.download(symbol, start=start_date, end=end_date, interval=interval, progress=False, auto_adjust=True)
         if df is not None and not df.empty:
             if isinstance(df.columns, pd.MultiIndex):
                 df.columns = [c[0] if isinstance(c, tuple) else c for c in df.columns]
@@ -50,18 +63,44 @@ def _fetch_hist_with_retry(
 class YFinanceDataSource(BaseDataSource):
     """使用 yfinance 拉取行情，列名统一为 open/high/low/close/volume，索引 DatetimeIndex。"""
 
+    def __init__(self, index_code: str, config: dict, cache: Optional[OHLCVCache] = None) -> None:
+        super().__init__(index_code, config)
+        if cache is None:
+            from ndx_rsi.config_loader import get_cache_config
+
+            cache_cfg = get_cache_config()
+            if cache_cfg.get("enabled"):
+                cache = OHLCVCache(cache_cfg["dir"], ttl_hours=cache_cfg["ttl_hours"])
+        self.cache = cache
+
     def get_historical_data(
         self,
         start_date: str,
         end_date: str,
         frequency: str = "1d",
     ) -> pd.DataFrame:
-        import yfinance as yf
-
+        source = resample_source(self.config, frequency)
+        if source is not None:
+            df = self.get_historical_data(start_date, end_date, source)
+            with profiling.timer("data.resample"):
+                return resample_for_config(df, frequency, self.config)
         interval = _FREQ_TO_INTERVAL.get(frequency, "1d")
         code = self.config.get("code", self.index_code)
-        ticker = yf.Ticker(code)
-        hist = _fetch_hist_with_retry(ticker, start_date, end_date, interval, symbol=code)
+        if self.cache is None:
+            return self._download(code, start_date, end_date, interval)
+        return self.cache.get(
+            code, interval, start_date, end_date,
+            fetch=lambda s, e: self._download(code, s, e, interval),
+        )
+
+    def _download(self, code: str, start_date: str, end_date: str, interval: str) -> pd.DataFrame:
+        """联网拉取并统一列名。"""
+        import yfinance as yf
+
+        with profiling.timer("yfinance.fetch"):
+            ticker = yf.Ticker(code)
+            hist = _fetch_hist_with_retry(ticker, start_date, end_date, interval, symbol=code)
+        profiling.count("yfinance.rows", len(hist))
         if hist.empty:
             return pd.DataFrame(columns=["open", "high", "low", "close", "volume"])
 
@@ -1,17 +1,47 @@
 from ndx_rsi.indicators.rsi import (
     calculate_rsi_handwrite,
     calculate_rsi_talib,
+    calculate_rsi_wilder,
     verify_rsi,
 )
 from ndx_rsi.indicators.ma import calculate_ma, calculate_ma5, calculate_ma20
 from ndx_rsi.indicators.volume_ratio import calculate_volume_ratio
-from ndx_rsi.indicators.market_env import judge_market_env, get_rsi_thresholds
-from ndx_rsi.indicators.adx import calculate_adx
+from ndx_rsi.indicators.market_env import judge_market_env, get_rsi_thresholds, market_env_series
+from ndx_rsi.indicators.regression import rolling_slope
+from ndx_rsi.indicators.adx import calculate_adx, calculate_atr
+from ndx_rsi.indicators.wilder import wilder_smooth
 from ndx_rsi.indicators.macd import calculate_macd
+from ndx_rsi.indicators.cache import IndicatorCache, get_indicator_cache, hash_ohlcv
+from ndx_rsi.indicators.pipeline import (
+    IndicatorSpec,
+    IndicatorPipeline,
+    indicator,
+    compute_indicators,
+    prepare_indicators,
+)
+from ndx_rsi.indicators.streaming import (
+    StreamingIndicator,
+    RollingSMA,
+    StreamingEMA,
+    StreamingRSI,
+    StreamingVolumeRatio,
+    RollingSlope,
+    StreamingReturn,
+    RollingStd,
+    StreamingVol,
+    StreamingWilder,
+    StreamingATR,
+    StreamingADX,
+    StreamingMACD,
+    StreamingPipeline,
+)
+from ndx_rsi.indicators.state import IndicatorState
+from ndx_rsi.indicators.batch import ema_matrix, sma_matrix, rolling_std_matrix
 
 __all__ = [
     "calculate_rsi_handwrite",
     "calculate_rsi_talib",
+    "calculate_rsi_wilder",
     "verify_rsi",
     "calculate_ma",
     "calculate_ma5",
@@ -19,6 +49,36 @@ __all__ = [
     "calculate_volume_ratio",
     "judge_market_env",
     "get_rsi_thresholds",
+    "market_env_series",
+    "rolling_slope",
     "calculate_adx",
+    "calculate_atr",
+    "wilder_smooth",
     "calculate_macd",
+    "IndicatorCache",
+    "get_indicator_cache",
+    "hash_ohlcv",
+    "IndicatorSpec",
+    "IndicatorPipeline",
+    "indicator",
+    "compute_indicators",
+    "prepare_indicators",
+    "RollingSMA",
+    "StreamingEMA",
+    "StreamingRSI",
+    "StreamingVolumeRatio",
+    "RollingSlope",
+    "StreamingIndicator",
+    "StreamingReturn",
+    "RollingStd",
+    "StreamingVol",
+    "StreamingWilder",
+    "StreamingATR",
+    "StreamingADX",
+    "StreamingMACD",
+    "StreamingPipeline",
+    "IndicatorState",
+    "ema_matrix",
+    "sma_matrix",
+    "rolling_std_matrix",
 ]
@@ -1,28 +1,34 @@
 """
 ADX (Average Directional Index) 14 日，手写实现。
-公式：+DM/-DM、TR → Wilder 平滑 → +DI/-DI → DX → ADX。
+公式：+DM/-DM、TR → Wilder 平滑 → +DI/-DI → DX → ADX；ATR 为 TR 的 Wilder 平滑。
 用于 v7 纳指机构级策略：ADX > 25 为强趋势。
 """
 import pandas as pd
 import numpy as np
 
+from ndx_rsi.indicators.wilder import wilder_smooth
 
-def _wilder_smooth(series: pd.Series, period: int) -> pd.Series:
-    """Wilder 平滑：首值为前 period 的 SMA，之后 RMA_t = (RMA_{t-1} * (period-1) + x_t) / period。"""
-    out = pd.Series(index=series.index, dtype=float)
-    arr = series.values
-    n = len(arr)
-    if n < period:
-        return out
-    # 第一个有效值：前 period 的简单平均
-    out.iloc[period - 1] = np.nanmean(arr[:period])
-    for i in range(period, n):
-        prev = out.iloc[i - 1]
-        if pd.isna(prev):
-            out.iloc[i] = np.nan
-        else:
-            out.iloc[i] = (prev * (period - 1) + arr[i]) / period
-    return out
+
+def _true_range(high: pd.Series, low: pd.Series, close: pd.Series) -> pd.Series:
+    """TR = max(high-low, |high-close_prev|, |low-close_prev|)；首行仅 high-low。"""
+    close_prev = close.shift(1)
+    return pd.concat([
+        high - low,
+        (high - close_prev).abs(),
+        (low - close_prev).abs(),
+    ], axis=1).max(axis=1)
+
+
+def calculate_atr(
+    high: pd.Series,
+    low: pd.Series,
+    close: pd.Series,
+    period: int = 14,
+) -> pd.Series:
+    """计算 ATR：TR 的 Wilder 平滑，前 period-1 行为 NaN。"""
+    if len(close) < 2 or len(high) != len(close) or len(low) != len(close):
+        return pd.Series(index=close.index, dtype=float)
+    return wilder_smooth(_true_range(high, low, close), period)
 
 
 def calculate_adx(
@@ -40,14 +46,7 @@ def calculate_adx(
 
     high_prev = high.shift(1)
     low_prev = low.shift(1)
-    close_prev = close.shift(1)
-
-    # TR = max(high-low, |high-close_prev|, |low-close_prev|)
-    tr = pd.concat([
-        high - low,
-        (high - close_prev).abs(),
-        (low - close_prev).abs(),
-    ], axis=1).max(axis=1)
+    tr = _true_range(high, low, close)
 
     # +DM, -DM：仅保留较大一方，且为正值
     up_move = high - high_prev
@@ -58,9 +57,9 @@ def calculate_adx(
     minus_dm = pd.Series(minus_dm, index=close.index)
 
     # Wilder 平滑
-    atr = _wilder_smooth(tr, period)
-    plus_di_smooth = _wilder_smooth(plus_dm, period)
-    minus_di_smooth = _wilder_smooth(minus_dm, period)
+    atr = wilder_smooth(tr, period)
+    plus_di_smooth = wilder_smooth(plus_dm, period)
+    minus_di_smooth = wilder_smooth(minus_dm, period)
 
     # +DI, -DI（避免除零）
     atr_safe = atr.replace(0, np.nan)
@@ -73,5 +72,5 @@ def calculate_adx(
     dx = 100.0 * (plus_di - minus_di).abs() / di_sum
 
     # ADX = Wilder smooth of DX
-    adx = _wilder_smooth(dx, period)
+    adx = wilder_smooth(dx, period)
     return adx
@@ -0,0 +1,134 @@
+"""
+指标缓存：按内容寻址，键为 sha1(INDICATOR_CACHE_VERSION | 行情内容哈希 | 指标类型 | 参数)。
+- 行情内容哈希覆盖索引与 OHLCV 数值，数据不变则键不变；只改回测参数重跑时指标直接命中
+- 进程内 LRU（OrderedDict），超过 max_entries 淘汰最久未用的条目；seed() 预置的条目另存、不参与淘汰
+- cache_dir 非空时同时落盘（pickle，原子写入），新进程/下次运行可复用
+- hits / misses 计数，用于观察参数扫描中省下的计算
+缓存中的 Series 由多次回测共享，调用方不得原地修改。
+"""
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# 指标实现版本：任一指标的计算口径变化时加 1，磁盘上旧实现算出的条目不再命中
+INDICATOR_CACHE_VERSION = 1
+
+
+def hash_ohlcv(df: pd.DataFrame) -> str:
+    """行情内容哈希：索引（逐元素哈希）+ 现有 OHLCV 列（float64）的字节。"""
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df.index, index=False).to_numpy().tobytes())
+    h.update(str(getattr(df.index, "tz", None)).encode())
+    for col in OHLCV_COLUMNS:
+        if col in df.columns:
+            h.update(col.encode())
+            h.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()
+
+
+class IndicatorCache:
+    """指标 Series 的 LRU 缓存，可选磁盘持久化。"""
+
+    def __init__(self, max_entries: int = 256, cache_dir: Optional[str] = None) -> None:
+        self.max_entries = max_entries
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._store: "OrderedDict[str, pd.Series]" = OrderedDict()
+        self._seeded: Dict[str, pd.Series] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(data_hash: str, kind: str, params: Any) -> str:
+        return hashlib.sha1(f"{INDICATOR_CACHE_VERSION}|{data_hash}|{kind}|{params!r}".encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"  # type: ignore[operator]
+
+    def get(self, key: str) -> Optional[pd.Series]:
+        """命中返回 Series 并计 hit（内存未命中时查磁盘）；否则返回 None 并计 miss。"""
+        value = self._seeded.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        value = self._store.get(key)
+        if value is None and self.cache_dir is not None and self._path(key).exists():
+            with open(self._path(key), "rb") as f:
+                value = pickle.load(f)
+            self._remember(key, value)
+        if value is None:
+            self.misses += 1
+            return None
+        self._store.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: pd.Series) -> None:
+        self._remember(key, value)
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def seed(self, key: str, value: pd.Series) -> None:
+        """
+        预置条目（只进内存，不计命中/未命中、不落盘），如参数扫描预先批量算好的指标。
+        预置条目不受 max_entries 限制、不会被淘汰，直到 clear()。
+        """
+        self._seeded[key] = value
+
+    def _remember(self, key: str, value: pd.Series) -> None:
+        self._store[key] = value
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_entries:
+            self._store.popitem(last=False)
+
+    def get_or_compute(self, key: str, compute: Callable[[], pd.Series]) -> pd.Series:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._store),
+            "seeded": len(self._seeded),
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self) -> None:
+        """清空内存条目（含预置条目）与计数（磁盘文件保留）。"""
+        self._store.clear()
+        self._seeded.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+# 进程级默认缓存：按 config 的 indicator_cache 段首次使用时创建
+_DEFAULT: Dict[str, Optional[IndicatorCache]] = {}
+
+
+def get_indicator_cache() -> Optional[IndicatorCache]:
+    """返回进程级默认指标缓存；配置关闭时返回 None。"""
+    if "cache" not in _DEFAULT:
+        from ndx_rsi.config_loader import get_indicator_cache_config
+
+        cfg = get_indicator_cache_config()
+        _DEFAULT["cache"] = (
+            IndicatorCache(cfg["max_entries"], cfg["dir"] if cfg["persist"] else None) if cfg["enabled"] else None
+        )
+    return _DEFAULT["cache"]
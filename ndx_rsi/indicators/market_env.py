@@ -1,11 +1,14 @@
 """
 市场环境识别：50 日均线斜率 + 价格与均线关系 → bull/bear/oscillate/transition。
+market_env_series：整段序列一次算出每根 K 线的市场环境（滚动斜率闭式计算），与逐窗口 judge_market_env 一致。
 RSI 阈值表与 design.md 一致。
 """
 import numpy as np
 import pandas as pd
 from typing import Dict, Any
 
+from ndx_rsi.indicators.regression import refine_near_thresholds, rolling_slope
+
 # 斜率阈值：近 SLOPE_LOOKBACK 日的 MA50 斜率
 SLOPE_LOOKBACK = 20
 # 震荡：价格在 MA50 ±3% 内波动
@@ -39,27 +42,71 @@ def judge_market_env(prices: pd.Series, ma50: pd.Series) -> str:
     p = prices.iloc[-SLOPE_LOOKBACK:].values
     m = ma50.iloc[-SLOPE_LOOKBACK:].values
     slope = np.polyfit(np.arange(len(m)), m, 1)[0]
-    slope_pct = slope / (m[-1] + 1e-10)
-    # 连续 2 日：最近 2 根 K 线收盘价与对应日 MA50 比较
     close_2 = prices.iloc[-2:].values
     ma50_2 = ma50.iloc[-2:].values
-    if (ma50_2 <= 0).any():
+    return classify_market_env(slope, close_2[0], close_2[1], ma50_2[0], ma50_2[1])
+
+
+def classify_market_env(
+    slope: float, prev_close: float, last_close: float, prev_ma50: float, last_ma50: float
+) -> str:
+    """
+    judge_market_env 的判定部分：slope 为近 SLOPE_LOOKBACK 日 MA50 的最小二乘斜率，其余为最近 2 日收盘价与 MA50。
+    供逐窗口与流式（on_bar）两种计算路径共用。
+    """
+    slope_pct = slope / (last_ma50 + 1e-10)
+    # 连续 2 日：最近 2 根 K 线收盘价与对应日 MA50 比较
+    if prev_ma50 <= 0 or last_ma50 <= 0:
         return "transition"
-    both_above = (close_2 >= ma50_2 - 1e-10).all()
-    both_below = (close_2 <= ma50_2 + 1e-10).all()
+    both_above = prev_close >= prev_ma50 - 1e-10 and last_close >= last_ma50 - 1e-10
+    both_below = prev_close <= prev_ma50 + 1e-10 and last_close <= last_ma50 + 1e-10
     if slope_pct > SLOPE_UP and both_above:
         return "bull"
     if slope_pct < SLOPE_DOWN and both_below:
         return "bear"
-    last_price = prices.iloc[-1]
-    last_ma = ma50.iloc[-1]
-    diff_pct = (last_price - last_ma) / last_ma
+    diff_pct = (last_close - last_ma50) / last_ma50
     if SLOPE_FLAT_LOW <= slope_pct <= SLOPE_FLAT_HIGH:
         if abs(diff_pct) <= OSCILLATE_RANGE:
             return "oscillate"
     return "transition"
 
 
+MARKET_ENVS = ["bull", "bear", "oscillate", "transition"]
+
+
+def market_env_series(prices: pd.Series, ma50: pd.Series) -> pd.Series:
+    """
+    逐 Bar 市场环境（category 序列）：第 i 行等于 judge_market_env(prices.iloc[:i+1], ma50.iloc[:i+1])。
+    """
+    close = prices.to_numpy(dtype=float)
+    ma = ma50.to_numpy(dtype=float)
+    n = len(close)
+    env = np.full(n, "transition", dtype=object)
+    if n >= SLOPE_LOOKBACK:
+        last_ma = ma
+        prev_ma = np.concatenate(([np.nan], ma[:-1]))
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        scale = last_ma + 1e-10
+        slope = rolling_slope(ma, SLOPE_LOOKBACK)
+        slope = refine_near_thresholds(
+            slope, ma, SLOPE_LOOKBACK, scale, (SLOPE_UP, SLOPE_DOWN, SLOPE_FLAT_LOW, SLOPE_FLAT_HIGH)
+        )
+        slope_pct = slope / scale
+        with np.errstate(invalid="ignore", divide="ignore"):
+            diff_pct = (close - last_ma) / last_ma
+        invalid = (prev_ma <= 0) | (last_ma <= 0)
+        both_above = (prev_close >= prev_ma - 1e-10) & (close >= last_ma - 1e-10)
+        both_below = (prev_close <= prev_ma + 1e-10) & (close <= last_ma + 1e-10)
+        flat = (SLOPE_FLAT_LOW <= slope_pct) & (slope_pct <= SLOPE_FLAT_HIGH) & (np.abs(diff_pct) <= OSCILLATE_RANGE)
+        env = np.select(
+            [invalid, (slope_pct > SLOPE_UP) & both_above, (slope_pct < SLOPE_DOWN) & both_below, flat],
+            ["transition", "bull", "bear", "oscillate"],
+            default="transition",
+        ).astype(object)
+        env[: SLOPE_LOOKBACK - 1] = "transition"
+    return pd.Series(pd.Categorical(env, categories=MARKET_ENVS), index=prices.index)
+
+
 def get_rsi_thresholds(market_env: str) -> Dict[str, Any]:
     """返回该市场环境下的 overbuy/oversell/strong_* 阈值。"""
     return _THRESHOLDS.get(market_env, _THRESHOLDS["transition"]).copy()
@@ -0,0 +1,167 @@
+"""
+声明式指标管线：策略通过 required_indicators() 声明所需指标，管线解析依赖、按 (kind, params) 去重后一次算出。
+- 依赖：vol 依赖 daily_return；macd_line 复用 ema(fast)/ema(slow)，与趋势判断共用同一条 EMA
+- 去重：同一 (kind, params) 只计算一次，可输出到多个列名（如 sma(50) 同时作为 ma50 与 sma_50）
+- 多策略同一标的：prepare_indicators 合并各策略声明，每个指标只算一次
+- 缓存：run(df, cache) 按 (行情内容哈希, kind, params) 查 IndicatorCache，命中则跳过计算
+新增指标类型：在 INDICATORS 中注册列名规则、依赖与计算函数。
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi.indicators.adx import calculate_adx
+from ndx_rsi.indicators.cache import IndicatorCache, hash_ohlcv
+from ndx_rsi.indicators.ma import calculate_ma
+from ndx_rsi.indicators.rsi import calculate_rsi_handwrite
+from ndx_rsi.indicators.volume_ratio import calculate_volume_ratio
+
+Params = Tuple[Tuple[str, Any], ...]
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    """指标声明：kind 指标类型，params 参数（按名称排序的元组，可哈希），column 输出列名。"""
+
+    kind: str
+    params: Params = ()
+    column: str = ""
+
+    @property
+    def key(self) -> Tuple[str, Params]:
+        """去重键：同 kind 同参数视为同一指标。"""
+        return (self.kind, self.params)
+
+
+@dataclass(frozen=True)
+class _IndicatorKind:
+    column: Callable[..., str]
+    compute: Callable[..., pd.Series]  # compute(df, deps, **params)
+    deps: Callable[..., List[IndicatorSpec]] = lambda **params: []
+
+
+def indicator(kind: str, column: Optional[str] = None, **params: Any) -> IndicatorSpec:
+    """构造 IndicatorSpec；column 缺省时按指标类型的命名规则生成（如 ema_80、vol_20）。"""
+    if kind not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {kind}. Available: {list(INDICATORS)}")
+    return IndicatorSpec(kind, tuple(sorted(params.items())), column or INDICATORS[kind].column(**params))
+
+
+def _macd_line(df: pd.DataFrame, deps: List[pd.Series], fast: int, slow: int) -> pd.Series:
+    """与 calculate_macd 的 macd_line 一致：数据不足 slow 根时全为 NaN。"""
+    if len(df) < slow:
+        return pd.Series(np.nan, index=df.index, dtype=float)
+    return deps[0] - deps[1]
+
+
+INDICATORS: Dict[str, _IndicatorKind] = {
+    "ema": _IndicatorKind(
+        column=lambda span: f"ema_{span}",
+        compute=lambda df, deps, span: df["close"].ewm(span=span, adjust=False).mean(),
+    ),
+    "sma": _IndicatorKind(
+        column=lambda window: f"sma_{window}",
+        compute=lambda df, deps, window: calculate_ma(df["close"], window),
+    ),
+    "daily_return": _IndicatorKind(
+        column=lambda: "daily_return",
+        compute=lambda df, deps: df["close"].pct_change(),
+    ),
+    "vol": _IndicatorKind(
+        column=lambda window: f"vol_{window}",
+        compute=lambda df, deps, window: deps[0].rolling(window).std(),
+        deps=lambda window: [indicator("daily_return")],
+    ),
+    "rsi": _IndicatorKind(
+        column=lambda period: f"rsi_{period}",
+        compute=lambda df, deps, period: calculate_rsi_handwrite(df["close"], period),
+    ),
+    "volume_ratio": _IndicatorKind(
+        column=lambda window: "volume_ratio",
+        compute=lambda df, deps, window: calculate_volume_ratio(df["volume"], window),
+    ),
+    "adx": _IndicatorKind(
+        column=lambda period: f"adx_{period}",
+        compute=lambda df, deps, period: calculate_adx(df["high"], df["low"], df["close"], period=period),
+    ),
+    "macd_line": _IndicatorKind(
+        column=lambda fast, slow: "macd_line",
+        compute=_macd_line,
+        deps=lambda fast, slow: [indicator("ema", span=fast), indicator("ema", span=slow)],
+    ),
+}
+
+
+class IndicatorPipeline:
+    """解析指标声明（依赖在前、去重），run(df) 一次性算出全部列。"""
+
+    def __init__(self, specs: Iterable[IndicatorSpec] = ()) -> None:
+        # (kind, params) -> 输出列名列表；插入顺序即计算顺序（依赖先于使用方）
+        self._nodes: "OrderedDict[Tuple[str, Params], List[str]]" = OrderedDict()
+        self._owner: Dict[str, Tuple[str, Params]] = {}
+        self.add(specs)
+
+    def add(self, specs: Iterable[IndicatorSpec]) -> "IndicatorPipeline":
+        for spec in specs:
+            self._add(spec)
+        return self
+
+    def _add(self, spec: IndicatorSpec) -> None:
+        for dep in INDICATORS[spec.kind].deps(**dict(spec.params)):
+            self._add(dep)
+        owner = self._owner.setdefault(spec.column, spec.key)
+        if owner != spec.key:
+            raise ValueError(f"Indicator column {spec.column!r} declared for both {owner} and {spec.key}")
+        columns = self._nodes.setdefault(spec.key, [])
+        if spec.column not in columns:
+            columns.append(spec.column)
+
+    def plan(self) -> List[Tuple[str, Dict[str, Any], List[str]]]:
+        """解析结果：[(kind, params, 输出列名), ...]，每个指标只出现一次。"""
+        return [(kind, dict(params), list(cols)) for (kind, params), cols in self._nodes.items()]
+
+    def run(self, df: pd.DataFrame, cache: Optional[IndicatorCache] = None) -> pd.DataFrame:
+        """
+        返回 df 副本并追加全部指标列（同名旧列被覆盖）；新列一次性拼接，避免逐列插入。
+        传入 cache 时逐指标查缓存，命中的指标不再计算。
+        """
+        values: Dict[Tuple[str, Params], pd.Series] = {}
+        columns: Dict[str, pd.Series] = {}
+        data_hash = hash_ohlcv(df) if cache is not None and self._nodes else ""
+        for key, names in self._nodes.items():
+            kind, params = key
+            ind = INDICATORS[kind]
+            deps = [values[d.key] for d in ind.deps(**dict(params))]
+            if cache is None:
+                values[key] = ind.compute(df, deps, **dict(params))
+            else:
+                values[key] = cache.get_or_compute(
+                    cache.make_key(data_hash, kind, params),
+                    lambda: ind.compute(df, deps, **dict(params)),
+                )
+            for name in names:
+                columns[name] = values[key]
+        if not columns:
+            return df.copy()
+        base = df.drop(columns=[c for c in columns if c in df.columns])
+        return pd.concat([base, pd.DataFrame(columns, index=df.index)], axis=1)
+
+
+def compute_indicators(
+    df: pd.DataFrame, specs: Iterable[IndicatorSpec], cache: Optional[IndicatorCache] = None
+) -> pd.DataFrame:
+    """按声明计算指标，返回追加了指标列的新 DataFrame。"""
+    return IndicatorPipeline(specs).run(df, cache)
+
+
+def prepare_indicators(
+    df: pd.DataFrame, strategies: Iterable[Any], cache: Optional[IndicatorCache] = None
+) -> pd.DataFrame:
+    """合并多个策略的 required_indicators()，同一标的上每个指标只算一次。"""
+    pipeline = IndicatorPipeline()
+    for strategy in strategies:
+        pipeline.add(strategy.required_indicators())
+    return pipeline.run(df, cache)
@@ -0,0 +1,55 @@
+"""
+滚动最小二乘斜率：整段序列一次算出每根 K 线近 window 个值对 x=0..window-1 的斜率，等价于逐窗口 np.polyfit(…, 1)[0]。
+斜率 = Σ(x_k - x̄)·y_k / Σ(x_k - x̄)²，即以中心化权重对序列做滑动点积（O(n·window)，window 为 5/20 这样的小常数）。
+不用 Σy、Σk·y 前缀和相减：长历史上前缀和量级过大，相减会损失有效位。
+"""
+from typing import Iterable, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def rolling_slope(values: np.ndarray, window: int) -> np.ndarray:
+    """第 i 个输出为 values[i-window+1 : i+1] 的最小二乘斜率；前 window-1 个为 NaN。"""
+    y = np.asarray(values, dtype=float)
+    out = np.full(len(y), np.nan)
+    if window < 2 or len(y) < window:
+        return out
+    x = np.arange(window) - (window - 1) / 2.0
+    out[window - 1:] = sliding_window_view(y, window) @ (x / (x @ x))
+    return out
+
+
+def refine_near_thresholds(
+    slope: np.ndarray,
+    values: np.ndarray,
+    window: int,
+    scale: np.ndarray,
+    thresholds: Iterable[float],
+    tol: float = 1e-9,
+) -> np.ndarray:
+    """
+    slope/scale 与任一阈值相差不超过 tol 的位置改用 np.polyfit 重算，
+    使阈值判定与逐窗口实现逐位一致（两种算法的舍入误差只在阈值附近才会影响分类）。
+    """
+    pct = slope / scale
+    near = np.zeros(len(slope), dtype=bool)
+    for th in thresholds:
+        near |= np.abs(pct - th) <= tol
+    idx = np.flatnonzero(near & (np.arange(len(slope)) >= window - 1))
+    if idx.size:
+        slope = slope.copy()
+        x = np.arange(window)
+        for i in idx:
+            slope[i] = np.polyfit(x, values[i - window + 1:i + 1], 1)[0]
+    return slope
+
+
+def refine_slope(
+    slope: float, values: Sequence[float], scale: float, thresholds: Iterable[float], tol: float = 1e-9
+) -> float:
+    """refine_near_thresholds 的标量版本（流式逐 Bar 用）：slope/scale 贴近阈值时对 values 用 np.polyfit 重算。"""
+    pct = slope / scale
+    if any(abs(pct - th) <= tol for th in thresholds):
+        return float(np.polyfit(np.arange(len(values)), np.asarray(values, dtype=float), 1)[0])
+    return slope
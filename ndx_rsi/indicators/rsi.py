@@ -4,6 +4,8 @@ RSI 计算：手写实现（与 BRD 公式一致）+ TA-Lib 验证；偏差≤0.
 import pandas as pd
 from typing import Optional
 
+from ndx_rsi.indicators.wilder import wilder_smooth
+
 # TA-Lib 可选：未安装时 verify_rsi 跳过或返回 True（仅手写）
 try:
     import talib
@@ -29,6 +31,20 @@ def calculate_rsi_handwrite(prices: pd.Series, period: int = 14) -> pd.Series:
     return rsi.fillna(50.0)
 
 
+def calculate_rsi_wilder(prices: pd.Series, period: int = 14) -> pd.Series:
+    """
+    Wilder RSI（与 TA-Lib RSI 同口径）：涨幅/跌幅用 Wilder 平滑，首值为前 period 个涨跌幅的 SMA。
+    首个有效值在第 period 行，之前填 50；无下跌时 RSI=100。
+    """
+    delta = prices.diff(1).iloc[1:]
+    gain = delta.where(delta > 0, 0.0)
+    loss = (-delta).where(delta < 0, 0.0)
+    avg_gain = wilder_smooth(gain, period)
+    avg_loss = wilder_smooth(loss, period).replace(0, 1e-10)
+    rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    return rsi.reindex(prices.index).fillna(50.0)
+
+
 def calculate_rsi_talib(prices: pd.Series, period: int = 14) -> pd.Series:
     """使用 TA-Lib 计算 RSI，用于验证手写结果。未安装 TA-Lib 时返回与手写相同。"""
     if not _HAS_TALIB:
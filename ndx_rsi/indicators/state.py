@@ -0,0 +1,113 @@
+"""
+实时信号的增量指标状态：流式指标快照 + 最近 tail 根 K 线（OHLCV 与指标列），存为 JSON。
+每日运行时载入状态、只喂入上次之后的新 K 线，不再整段重拉、重算 EMA200/ADX/MACD 等。
+状态文件记录指标声明；声明（策略参数）或版本变化时 load 返回 None，调用方重新用整段历史初始化。
+"""
+import copy
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi.indicators.pipeline import IndicatorSpec
+from ndx_rsi.indicators.streaming import StreamingPipeline
+
+# 2：RollingSMA/StreamingEMA 按 pandas 口径处理 NaN（旧快照可能已被 NaN 污染，整段重新初始化）
+STATE_VERSION = 2
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def _spec_key(spec: IndicatorSpec) -> List[Any]:
+    return [spec.kind, [list(p) for p in spec.params], spec.column]
+
+
+class IndicatorState:
+    """流式指标 + 最近 tail 根带指标的 K 线；update 只处理时间戳晚于 last_ts 的新 K 线。"""
+
+    def __init__(self, specs: Iterable[IndicatorSpec], tail: int = 250) -> None:
+        self.specs = list(specs)
+        self.tail = tail
+        self.pipeline = StreamingPipeline(self.specs)
+        self._rows: deque = deque(maxlen=tail)  # (时间戳 ns, {列: 值})
+        self.tz: Optional[str] = None
+        self.last_ts: Optional[pd.Timestamp] = None
+
+    def update(self, df: pd.DataFrame) -> int:
+        """喂入 df 中晚于 last_ts 的 K 线，返回新增根数。"""
+        if df.empty:
+            return 0
+        if self.last_ts is None:
+            self.tz = str(df.index.tz) if df.index.tz is not None else None
+        new = df if self.last_ts is None else df[df.index > self.last_ts]
+        cols = [c for c in OHLCV_COLUMNS if c in new.columns]
+        for ts, bar in zip(new.index, new[cols].to_dict("records")):
+            bar.update(self.pipeline.update(bar))
+            self._rows.append((pd.Timestamp(ts).value, bar))
+            self.last_ts = pd.Timestamp(ts)
+        return len(new)
+
+    def preview(self, df: pd.DataFrame) -> pd.DataFrame:
+        """在状态副本上喂入 df（如当日未收盘的 K 线）并返回 frame，不改变已保存的状态。"""
+        ahead = copy.deepcopy(self)
+        ahead.update(df)
+        return ahead.frame()
+
+    def frame(self) -> pd.DataFrame:
+        """最近 tail 根 K 线及指标列（索引时区与输入一致）。"""
+        if not self._rows:
+            return pd.DataFrame(columns=OHLCV_COLUMNS + self.pipeline.columns)
+        index = pd.to_datetime([ts for ts, _ in self._rows])
+        if self.tz is not None:
+            index = index.tz_localize("UTC").tz_convert(self.tz)
+        return pd.DataFrame([row for _, row in self._rows], index=index)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "specs": [_spec_key(s) for s in self.specs],
+            "tail": self.tail,
+            "tz": self.tz,
+            "indicators": self.pipeline.snapshot(),
+            "rows": [[ts, row] for ts, row in self._rows],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], specs: Iterable[IndicatorSpec], tail: int = 250) -> Optional["IndicatorState"]:
+        """状态与当前声明不符（版本、指标、tail 变化）时返回 None。"""
+        state = cls(specs, tail)
+        if (
+            data.get("version") != STATE_VERSION
+            or data.get("specs") != [_spec_key(s) for s in state.specs]
+            or data.get("tail") != tail
+        ):
+            return None
+        state.pipeline.restore(data["indicators"])
+        state.tz = data.get("tz")
+        state._rows.extend((int(ts), row) for ts, row in data.get("rows", []))
+        if state._rows:
+            last = pd.Timestamp(state._rows[-1][0])
+            state.last_ts = last.tz_localize("UTC").tz_convert(state.tz) if state.tz else last
+        return state
+
+    def save(self, path: str) -> None:
+        """原子写入 JSON（NaN 按 json 模块默认写作 NaN）。"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, default=lambda v: v.item() if isinstance(v, np.generic) else str(v))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, specs: Iterable[IndicatorSpec], tail: int = 250) -> Optional["IndicatorState"]:
+        """文件不存在、损坏或与声明不符时返回 None。"""
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls.from_dict(data, specs, tail)
@@ -0,0 +1,377 @@
+"""
+流式指标：逐根 K 线 update(x) 常数时间更新，口径与批量函数一致。
+- RollingSMA      ↔ calculate_ma（rolling(window, min_periods)）
+- StreamingEMA    ↔ Series.ewm(span, adjust=False).mean()
+- StreamingRSI    ↔ calculate_rsi_handwrite（SMA 涨跌幅，未满 period 时为 50）
+- StreamingVolumeRatio ↔ calculate_volume_ratio
+- RollingSlope    ↔ np.polyfit(arange(window), 最近 window 个值, 1)[0]（每根以中心化权重点积重算）
+- StreamingReturn / RollingStd / StreamingVol ↔ pct_change / rolling(window).std() / 日收益 rolling std
+- StreamingWilder ↔ wilder_smooth；StreamingATR / StreamingADX ↔ calculate_atr / calculate_adx
+- StreamingMACD   ↔ calculate_macd（macd_line / signal_line / histogram）
+用于 NDXShortTermRSIStrategy.on_bar 等实时/逐 Bar 场景，避免每根 K 线对整段历史重算。
+snapshot() 导出可 JSON 序列化的状态，restore() 载入后从断点继续 update（见 indicators/state.py）。
+StreamingPipeline 按 IndicatorSpec 声明组装上述对象，输出列名与 IndicatorPipeline 一致。
+"""
+from collections import deque
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ndx_rsi.indicators.pipeline import IndicatorSpec, Params
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, StreamingIndicator):
+        return value.snapshot()
+    if isinstance(value, deque):
+        return [_dump(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+@lru_cache(maxsize=None)
+def _centered_weights(m: int) -> Tuple[float, ...]:
+    """x=0..m-1 中心化后除以 Σ(x-x̄)²：与 y 的点积即最小二乘斜率。"""
+    x = np.arange(m) - (m - 1) / 2.0
+    return tuple((x / (x @ x)).tolist())
+
+
+class StreamingIndicator:
+    """流式指标基类：snapshot/restore 按实例属性导出/载入状态（deque 存为列表，嵌套指标递归）。"""
+
+    value: float
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {key: _dump(val) for key, val in vars(self).items()}
+
+    def restore(self, state: Mapping[str, Any]) -> "StreamingIndicator":
+        for key, val in state.items():
+            cur = getattr(self, key)
+            if isinstance(cur, StreamingIndicator):
+                cur.restore(val)
+            elif isinstance(cur, deque):
+                setattr(self, key, deque(val, maxlen=cur.maxlen))
+            else:
+                setattr(self, key, val)
+        return self
+
+
+class RollingSMA(StreamingIndicator):
+    """滑动窗口均值：维护窗口内非 NaN 值的累加和与个数，入一出一（同 rolling 忽略 NaN，有效值不足 min_periods 时为 NaN）。"""
+
+    def __init__(self, window: int, min_periods: int = 1) -> None:
+        self.window = window
+        self.min_periods = min_periods
+        self._buf: deque = deque(maxlen=window)
+        self._sum = 0.0
+        self._valid = 0
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        if len(self._buf) == self.window:
+            out = self._buf[0]
+            if out == out:
+                self._sum -= out
+                self._valid -= 1
+        self._buf.append(x)
+        if x == x:
+            self._sum += x
+            self._valid += 1
+        self.value = self._sum / self._valid if self._valid >= max(self.min_periods, 1) else np.nan
+        return self.value
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    EMA（adjust=False）：首值为第一个有效输入，之后 y = (w·y + α·x) / (w + α)，w = 1-α，α = 2/(span+1)。
+    遇 NaN 时输出保持上一值，旧值权重 w 每根再乘 (1-α)（同 ewm(ignore_na=False) 与 batch.ema_matrix 的递推）。
+    """
+
+    def __init__(self, span: int) -> None:
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = np.nan
+        self._old_wt = 1.0
+
+    def update(self, x: float) -> float:
+        if np.isnan(self.value):
+            self.value = x
+        elif x != x:
+            self._old_wt *= 1.0 - self.alpha
+        else:
+            old_wt = self._old_wt * (1.0 - self.alpha)
+            # 同 pandas：与当前值相等时不更新，避免常数段舍入漂移
+            if self.value != x:
+                self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+            self._old_wt = 1.0
+        return self.value
+
+
+class StreamingRSI(StreamingIndicator):
+    """手写 RSI 的流式版本：涨幅/跌幅各自 period 日简单平均，未满 period 根时返回 50。"""
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self._gain = RollingSMA(period, min_periods=period)
+        self._loss = RollingSMA(period, min_periods=period)
+        self._prev: Optional[float] = None
+        self.value = 50.0
+
+    def update(self, price: float) -> float:
+        delta = price - self._prev if self._prev is not None else np.nan
+        self._prev = price
+        avg_gain = self._gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self._loss.update(-delta if delta < 0 else 0.0)
+        if np.isnan(avg_gain) or np.isnan(avg_loss):
+            self.value = 50.0
+        else:
+            rs = avg_gain / (avg_loss if avg_loss != 0 else 1e-10)
+            self.value = 100 - (100 / (1 + rs))
+        return self.value
+
+
+class StreamingVolumeRatio(StreamingIndicator):
+    """量能比：当日成交量 / 近 window 日均量（min_periods=1）。"""
+
+    def __init__(self, window: int = 20) -> None:
+        self._ma = RollingSMA(window, min_periods=1)
+        self.value = np.nan
+
+    def update(self, volume: float) -> float:
+        vol_ma = self._ma.update(volume)
+        self.value = volume / (vol_ma if vol_ma != 0 else 1e-10)
+        return self.value
+
+
+class RollingSlope(StreamingIndicator):
+    """
+    最近 window 个值对 x=0..m-1 的最小二乘斜率（m 为当前样本数，m≥2 时有效）。
+    每根按中心化权重与窗口做点积重算（同 regression.rolling_slope，窗口为 5/20 这样的小常数），
+    不维护 Σy、Σk·y 的增减；窗口内有 NaN 时为 NaN，NaN 移出窗口后即恢复。
+    """
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._buf: deque = deque(maxlen=window)
+        self.value = np.nan
+
+    def update(self, y: float) -> float:
+        self._buf.append(y)
+        m = len(self._buf)
+        if m < 2:
+            self.value = np.nan
+            return self.value
+        self.value = sum(w * v for w, v in zip(_centered_weights(m), self._buf))
+        return self.value
+
+    @property
+    def samples(self) -> deque:
+        """当前窗口内的值（只读，供阈值附近用 polyfit 复核）。"""
+        return self._buf
+
+
+class StreamingReturn(StreamingIndicator):
+    """日收益率：close / prev_close - 1，首根为 NaN（同 pct_change）。"""
+
+    def __init__(self) -> None:
+        self._prev = np.nan
+        self.value = np.nan
+
+    def update(self, close: float) -> float:
+        self.value = close / self._prev - 1.0
+        self._prev = close
+        return self.value
+
+
+class RollingStd(StreamingIndicator):
+    """滑动样本标准差（ddof=1）：窗口未满或含 NaN 时为 NaN（同 rolling(window).std()）。"""
+
+    def __init__(self, window: int) -> None:
+        self.window = window
+        self._buf: deque = deque(maxlen=window)
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        self._buf.append(x)
+        if len(self._buf) < self.window or self.window < 2:
+            self.value = np.nan
+        else:
+            self.value = float(np.std(self._buf, ddof=1))
+        return self.value
+
+
+class StreamingVol(StreamingIndicator):
+    """日收益率的滑动标准差（pipeline 中的 vol_{window}）。"""
+
+    def __init__(self, window: int) -> None:
+        self._ret = StreamingReturn()
+        self._std = RollingStd(window)
+        self.value = np.nan
+
+    def update(self, close: float) -> float:
+        self.value = self._std.update(self._ret.update(close))
+        return self.value
+
+
+class StreamingWilder(StreamingIndicator):
+    """
+    Wilder 平滑的流式版本：第 period 个输入时以前 period 个值的均值（忽略 NaN）为首值，
+    之后 y = (1-α)·y + α·x，α = 1/period；首值后遇到 NaN 输入则此后恒为 NaN。
+    """
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.alpha = 1.0 / period
+        self._n = 0
+        self._seed_sum = 0.0
+        self._seed_count = 0
+        self._dead = False
+        self.value = np.nan
+
+    def update(self, x: float) -> float:
+        self._n += 1
+        if self._dead:
+            return self.value
+        if self._n <= self.period:
+            if not np.isnan(x):
+                self._seed_sum += x
+                self._seed_count += 1
+            if self._n == self.period:
+                if self._seed_count == 0:
+                    self._dead = True
+                else:
+                    self.value = self._seed_sum / self._seed_count
+        elif np.isnan(x):
+            self._dead = True
+            self.value = np.nan
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * x
+        return self.value
+
+
+class StreamingATR(StreamingIndicator):
+    """ATR：TR（首根为 high-low）的 Wilder 平滑。"""
+
+    def __init__(self, period: int = 14) -> None:
+        self._prev_close = np.nan
+        self._tr = StreamingWilder(period)
+        self.value = np.nan
+
+    def true_range(self, high: float, low: float, close: float) -> float:
+        tr = high - low
+        if not np.isnan(self._prev_close):
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        return tr
+
+    def update(self, high: float, low: float, close: float) -> float:
+        self.value = self._tr.update(self.true_range(high, low, close))
+        return self.value
+
+
+class StreamingADX(StreamingIndicator):
+    """ADX：TR、+DM、-DM 各自 Wilder 平滑 → +DI/-DI → DX → DX 的 Wilder 平滑（同 calculate_adx）。"""
+
+    def __init__(self, period: int = 14) -> None:
+        self._atr = StreamingATR(period)
+        self._plus = StreamingWilder(period)
+        self._minus = StreamingWilder(period)
+        self._adx = StreamingWilder(period)
+        self._prev_high = np.nan
+        self._prev_low = np.nan
+        self.value = np.nan
+
+    def update(self, high: float, low: float, close: float) -> float:
+        up_move = high - self._prev_high
+        down_move = self._prev_low - low
+        self._prev_high, self._prev_low = high, low
+        plus_dm = up_move if (up_move > down_move and up_move > 0) else 0.0
+        minus_dm = down_move if (down_move > up_move and down_move > 0) else 0.0
+        atr = self._atr.update(high, low, close)
+        plus = self._plus.update(plus_dm)
+        minus = self._minus.update(minus_dm)
+        dx = np.nan
+        if atr != 0 and not np.isnan(atr):
+            plus_di = 100.0 * plus / atr
+            minus_di = 100.0 * minus / atr
+            di_sum = plus_di + minus_di
+            if di_sum != 0 and not np.isnan(di_sum):
+                dx = 100.0 * abs(plus_di - minus_di) / di_sum
+        self.value = self._adx.update(dx)
+        return self.value
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD：value 为 macd_line；不足 slow 根时三条线均为 NaN（同 calculate_macd）。"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9) -> None:
+        self.slow = slow
+        self._fast = StreamingEMA(fast)
+        self._slow = StreamingEMA(slow)
+        self._signal = StreamingEMA(signal)
+        self._n = 0
+        self.value = np.nan
+        self.signal_line = np.nan
+        self.histogram = np.nan
+
+    def update(self, close: float) -> float:
+        self._n += 1
+        line = self._fast.update(close) - self._slow.update(close)
+        signal_line = self._signal.update(line)
+        if self._n < self.slow:
+            return self.value
+        self.value, self.signal_line, self.histogram = line, signal_line, line - signal_line
+        return self.value
+
+
+# 指标类型 -> (构造函数, update 所需的 K 线字段)；与 pipeline.INDICATORS 的 kind/参数一一对应
+STREAMING_INDICATORS: Dict[str, Tuple[Callable[..., StreamingIndicator], Tuple[str, ...]]] = {
+    "ema": (lambda span: StreamingEMA(span), ("close",)),
+    "sma": (lambda window: RollingSMA(window), ("close",)),
+    "daily_return": (lambda: StreamingReturn(), ("close",)),
+    "vol": (lambda window: StreamingVol(window), ("close",)),
+    "rsi": (lambda period: StreamingRSI(period), ("close",)),
+    "volume_ratio": (lambda window: StreamingVolumeRatio(window), ("volume",)),
+    "adx": (lambda period: StreamingADX(period), ("high", "low", "close")),
+    "macd_line": (lambda fast, slow: StreamingMACD(fast, slow), ("close",)),
+}
+
+
+class StreamingPipeline:
+    """按 IndicatorSpec 声明组装流式指标（同 kind 同参数只建一个），update(bar) 返回 {列名: 当根值}。"""
+
+    def __init__(self, specs: Iterable[IndicatorSpec]) -> None:
+        self._nodes: Dict[Tuple[str, Params], Tuple[StreamingIndicator, Tuple[str, ...], List[str]]] = {}
+        for spec in specs:
+            if spec.kind not in STREAMING_INDICATORS:
+                raise ValueError(f"Unknown streaming indicator: {spec.kind}. Available: {list(STREAMING_INDICATORS)}")
+            if spec.key not in self._nodes:
+                factory, fields = STREAMING_INDICATORS[spec.kind]
+                self._nodes[spec.key] = (factory(**dict(spec.params)), fields, [])
+            columns = self._nodes[spec.key][2]
+            if spec.column not in columns:
+                columns.append(spec.column)
+
+    @property
+    def columns(self) -> List[str]:
+        return [col for _, _, cols in self._nodes.values() for col in cols]
+
+    def update(self, bar: Mapping[str, float]) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        for ind, fields, columns in self._nodes.values():
+            value = ind.update(*(float(bar[f]) for f in fields))
+            for col in columns:
+                out[col] = value
+        return out
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        return [ind.snapshot() for ind, _, _ in self._nodes.values()]
+
+    def restore(self, state: List[Mapping[str, Any]]) -> "StreamingPipeline":
+        if len(state) != len(self._nodes):
+            raise ValueError("Streaming state does not match indicator declarations")
+        for (ind, _, _), snap in zip(self._nodes.values(), state):
+            ind.restore(snap)
+        return self
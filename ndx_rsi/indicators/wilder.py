@@ -0,0 +1,31 @@
+"""
+Wilder 平滑（RMA）公共内核：ADX、ATR、Wilder RSI 共用。
+RMA_t = (RMA_{t-1} * (period-1) + x_t) / period，首值为前 period 个值的 SMA；
+等价于以 SMA 为初值、alpha = 1/period 的指数滤波，用 ewm(adjust=False) 向量化计算。
+"""
+import numpy as np
+import pandas as pd
+
+
+def wilder_smooth(series: pd.Series, period: int) -> pd.Series:
+    """
+    Wilder 平滑，返回与 series 同索引的 Series。
+    口径：前 period-1 行为 NaN；首值为前 period 个值的 nanmean（忽略其中的 NaN）；
+    之后一旦遇到 NaN 输入，该行及其后全部为 NaN。
+    """
+    arr = np.asarray(series, dtype=float)
+    n = len(arr)
+    out = np.full(n, np.nan)
+    if n < period:
+        return pd.Series(out, index=series.index)
+    head = arr[:period]
+    if np.isnan(head).all():
+        return pd.Series(out, index=series.index)
+    seed = np.nanmean(head)
+    tail = arr[period:]
+    nan_pos = np.flatnonzero(np.isnan(tail))
+    stop = nan_pos[0] if nan_pos.size else tail.size
+    # 以 SMA 为首值拼接后做 adjust=False 的指数滤波，首个输出即 seed
+    seq = np.concatenate(([seed], tail[:stop]))
+    out[period - 1:period + stop] = pd.Series(seq).ewm(alpha=1.0 / period, adjust=False).mean().to_numpy()
+    return pd.Series(out, index=series.index)
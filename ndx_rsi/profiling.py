@@ -0,0 +1,210 @@
+"""
+运行期埋点：分阶段计时（timer）与计数（count），每次运行汇总为一份 profile。
+- 未启用时 timer() 返回共享的空上下文、count() 直接返回，开销只有一次全局判断
+- profile_run() 包住一次 CLI/脚本运行：结束时写出 JSON，并可写 node-exporter textfile（Prometheus 文本格式，原子替换）
+- 逐 Bar 循环内不埋点，以整段计时 + Bar 计数代替
+输出路径取 datasource.yaml 的 profiling 段，环境变量 NDX_RSI_PROFILE / NDX_RSI_METRICS_TEXTFILE 或 CLI 参数覆盖。
+"""
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_NULL = nullcontext()
+# 当前运行的 profile；None 即未启用
+_PROFILE: Optional["Profile"] = None
+
+
+class Profile:
+    """一次运行的阶段耗时（调用次数、总耗时、单次最大耗时）与计数；多线程（如并发拉取行情）可同时写入。"""
+
+    def __init__(self, name: str, labels: Optional[Dict[str, Any]] = None) -> None:
+        self.name = name
+        self.labels = {k: str(v) for k, v in (labels or {}).items() if v is not None}
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.status = "ok"  # 运行结束状态：ok / error
+        self._lock = threading.Lock()
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            s = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += seconds
+            s[2] = max(s[2], seconds)
+
+    def add_count(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "labels": dict(self.labels),
+            "status": self.status,
+            "started_at": self.started_at,
+            "wall_seconds": round(time.perf_counter() - self._t0, 6),
+            "stages": {
+                k: {"calls": int(c), "total_seconds": round(t, 6), "max_seconds": round(m, 6)}
+                for k, (c, t, m) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+
+class _Timer:
+    __slots__ = ("profile", "stage", "t0")
+
+    def __init__(self, profile: Profile, stage: str) -> None:
+        self.profile = profile
+        self.stage = stage
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.profile.add_time(self.stage, time.perf_counter() - self.t0)
+
+
+def enabled() -> bool:
+    return _PROFILE is not None
+
+
+def timer(stage: str):
+    """with timer("backtest.bar_loop"): ... ；未启用时为空上下文。"""
+    profile = _PROFILE
+    return _NULL if profile is None else _Timer(profile, stage)
+
+
+def count(name: str, n: float = 1) -> None:
+    profile = _PROFILE
+    if profile is not None:
+        profile.add_count(name, n)
+
+
+def add_time(stage: str, seconds: float) -> None:
+    """直接计入一段耗时（不便用 with 包住的大段代码）。"""
+    profile = _PROFILE
+    if profile is not None:
+        profile.add_time(stage, seconds)
+
+
+def timed(stage: str) -> Callable:
+    """函数装饰器版 timer。"""
+
+    def deco(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _PROFILE is None:
+                return fn(*args, **kwargs)
+            with timer(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return deco
+
+
+def start_profile(name: str, labels: Optional[Dict[str, Any]] = None) -> Profile:
+    global _PROFILE
+    _PROFILE = Profile(name, labels)
+    return _PROFILE
+
+
+def finish_profile() -> Optional[Dict[str, Any]]:
+    """结束当前 profile 并返回汇总 dict（未启用时返回 None）。"""
+    global _PROFILE
+    profile, _PROFILE = _PROFILE, None
+    return profile.to_dict() if profile is not None else None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def to_textfile(profile: Dict[str, Any], prefix: str = "ndx_rsi") -> str:
+    """profile → Prometheus 文本格式（gauge，表示最近一次运行）。"""
+    run = profile["name"]
+    lines = []
+
+    def metric(name: str, help_text: str, samples: List[tuple]) -> None:
+        if not samples:
+            return
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        for labels, value in samples:
+            lines.append(f"{prefix}_{name}{_labels(**labels)} {value:.15g}")
+
+    stages = profile["stages"].items()
+    metric("stage_seconds", "Total wall time per stage in the last run.",
+           [({"run": run, "stage": k}, v["total_seconds"]) for k, v in stages])
+    metric("stage_calls", "Number of times each stage ran in the last run.",
+           [({"run": run, "stage": k}, v["calls"]) for k, v in stages])
+    metric("stage_max_seconds", "Longest single call per stage in the last run.",
+           [({"run": run, "stage": k}, v["max_seconds"]) for k, v in stages])
+    metric("events", "Event counters in the last run.",
+           [({"run": run, "name": k}, v) for k, v in profile["counters"].items()])
+    metric("run_seconds", "Wall time of the last run.", [({"run": run}, profile["wall_seconds"])])
+    metric("run_success", "1 if the last run finished without error.", [({"run": run}, float(profile["status"] == "ok"))])
+    metric("run_timestamp_seconds", "Unix time the last run started.", [({"run": run}, profile["started_at"])])
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """先写临时文件再替换，collector 不会读到半截文件。"""
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, target)
+
+
+def write_profile(
+    profile: Dict[str, Any], json_path: Optional[str] = None, textfile_path: Optional[str] = None
+) -> None:
+    if json_path:
+        _write_atomic(json_path, json.dumps(profile, ensure_ascii=False, indent=2))
+    if textfile_path:
+        _write_atomic(textfile_path, to_textfile(profile))
+
+
+@contextmanager
+def profile_run(
+    name: str,
+    json_path: Optional[str] = None,
+    textfile_path: Optional[str] = None,
+    labels: Optional[Dict[str, Any]] = None,
+) -> Iterator[Optional[Profile]]:
+    """
+    包住一次运行：未给路径时取 get_profiling_config()；两者都为空则不启用（yield None）。
+    块内抛异常时 status 记为 error；块内可设置 profile.status（如 CLI 返回码非 0）。
+    """
+    if json_path is None and textfile_path is None:
+        from ndx_rsi.config_loader import get_profiling_config
+
+        cfg = get_profiling_config()
+        json_path, textfile_path = cfg["json_path"], cfg["textfile_path"]
+    if not json_path and not textfile_path:
+        yield None
+        return
+    profile = start_profile(name, labels)
+    try:
+        yield profile
+    except BaseException:
+        profile.status = "error"
+        raise
+    finally:
+        out = finish_profile()
+        if out is not None:
+            write_profile(out, json_path, textfile_path)
@@ -249,8 +249,11 @@ def _report_ndx_short_term(
 ) -> str:
     close = _get(row, "close")
     ma50 = _get(row, "ma50")
-    rsi_9 = _get(row, "rsi_9")
-    rsi_24 = _get(row, "rsi_24")
+    # RSI 列按 rsi_params 的实际周期命名（缺省 9 / 24）
+    rsi_params = (config or {}).get("rsi_params", {})
+    short_p, long_p = rsi_params.get("short_period", 9), rsi_params.get("long_period", 24)
+    rsi_s = _get(row, f"rsi_{short_p}")
+    rsi_l = _get(row, f"rsi_{long_p}")
     vol_ratio = _get(row, "volume_ratio")
 
     reason = (sig.get("reason") or "no_signal").strip()
@@ -262,8 +265,8 @@ def _report_ndx_short_term(
         f"【{symbol} NDX短线 信号 - {date_str}】",
         f"  收盘价: {close}",
         f"  MA50: {ma50}",
-        f"  RSI(9): {rsi_9}",
-        f"  RSI(24): {rsi_24}",
+        f"  RSI({short_p}): {rsi_s}",
+        f"  RSI({long_p}): {rsi_l}",
         f"  量能比: {vol_ratio}",
         f"  推导逻辑: {derivation}",
         f"  操作建议: {action}",
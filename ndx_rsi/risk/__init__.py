@@ -1,7 +1,8 @@
 from ndx_rsi.risk.control import (
     check_extreme_market,
     apply_position_cap,
+    apply_position_cap_array,
     get_stop_loss_take_profit,
 )
 
-__all__ = ["check_extreme_market", "apply_position_cap", "get_stop_loss_take_profit"]
+__all__ = ["check_extreme_market", "apply_position_cap", "apply_position_cap_array", "get_stop_loss_take_profit"]
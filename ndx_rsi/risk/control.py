@@ -1,7 +1,9 @@
 """
 风控：极端行情禁止开仓（VIX>30 且 RSI 极值）、仓位上限、止损止盈比例。
 """
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
 
 from ndx_rsi.indicators.market_env import get_rsi_thresholds
 
@@ -50,6 +52,26 @@ def apply_position_cap(
     return max(position, -cap)
 
 
+def apply_position_cap_array(
+    position: np.ndarray,
+    market_env: Sequence[str],
+    rsi_short: np.ndarray,
+    dynamic_cap_config: Optional[Dict[str, Any]] = None,
+) -> np.ndarray:
+    """apply_position_cap 的逐元素版本（整段仓位序列一次限仓），结果与逐个调用一致。"""
+    env = np.asarray(market_env, dtype=object)
+    position = np.asarray(position, dtype=float)
+    rsi_short = np.asarray(rsi_short, dtype=float)
+    caps = {"bull": 0.8, "bear": 0.3, "oscillate": 0.5, "transition": 0.5}
+    cap = np.array([caps.get(e, 0.5) for e in env], dtype=float)
+    if dynamic_cap_config is not None:
+        bull_hot = (env == "bull") & (rsi_short > get_rsi_thresholds("bull").get("strong_overbuy", 85))
+        bear_cold = (env == "bear") & (rsi_short < get_rsi_thresholds("bear").get("strong_oversell", 15))
+        cap[bull_hot] = dynamic_cap_config.get("bull_overbought", 0.5)
+        cap[bear_cold] = dynamic_cap_config.get("bear_oversell", 0.5)
+    return np.where(position > 0, np.minimum(position, cap), np.maximum(position, -cap))
+
+
 def get_stop_loss_take_profit(
     close: float,
     signal: str,
@@ -1,16 +1,37 @@
-from ndx_rsi.signal.trend_volume import get_trend, get_volume_type
+from ndx_rsi.signal.trend_volume import get_trend, get_volume_type, trend_series
 from ndx_rsi.signal.rsi_signals import (
     check_overbought_oversold,
     check_golden_death_cross,
     check_divergence,
+    divergence_flags,
+    divergence_series,
+    divergence_at,
+)
+from ndx_rsi.signal.combine import generate_signal_dict, generate_signal_from_values, signal_values
+from ndx_rsi.signal.rules import (
+    Rule,
+    SIGNAL_RULES,
+    signal_features,
+    evaluate_rules,
+    generate_signal_series,
 )
-from ndx_rsi.signal.combine import generate_signal_dict
 
 __all__ = [
     "get_trend",
     "get_volume_type",
+    "trend_series",
     "check_overbought_oversold",
     "check_golden_death_cross",
     "check_divergence",
+    "divergence_flags",
+    "divergence_series",
+    "divergence_at",
     "generate_signal_dict",
+    "generate_signal_from_values",
+    "signal_values",
+    "Rule",
+    "SIGNAL_RULES",
+    "signal_features",
+    "evaluate_rules",
+    "generate_signal_series",
 ]
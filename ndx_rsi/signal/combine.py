@@ -3,7 +3,7 @@
 上升趋势忽略单纯超买（除非缩量滞涨）；下降趋势忽略单纯超卖（除非缩量企稳）。
 """
 import pandas as pd
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from ndx_rsi.signal.trend_volume import TREND_UP, TREND_DOWN, get_trend, get_volume_type
 from ndx_rsi.signal.rsi_signals import (
@@ -38,115 +38,168 @@ def generate_signal_dict(
     prev = df.iloc[-2]
     close = row.get("close", 0)
     rsi_s = row.get(rsi_short_col, 50)
-    rsi_l = row.get(rsi_long_col, 50)
     vol_ratio = row.get(volume_ratio_col, 1.0)
-    ma5 = row.get(ma5_col, None) if ma5_col in df.columns else None
-    prices = df["close"]
-    ma50 = df[ma50_col]
+    trend = get_trend(df["close"], df[ma50_col])
+    # v2 可选：顶/底背离
+    divergence = None
+    if use_divergence and len(df) >= divergence_lookback:
+        divergence = check_divergence(
+            df["close"], df[rsi_short_col],
+            lookback=divergence_lookback,
+            volume_ratio=vol_ratio,
+            require_volume=False,
+        )
+    return generate_signal_from_values(
+        close=close,
+        rsi_s=rsi_s,
+        rsi_l=row.get(rsi_long_col, 50),
+        prev_rsi_s=prev.get(rsi_short_col, 50),
+        prev_rsi_l=prev.get(rsi_long_col, 50),
+        vol_ratio=vol_ratio,
+        ma5=row.get(ma5_col, None) if ma5_col in df.columns else None,
+        trend=trend,
+        market_env=market_env,
+        divergence=divergence,
+        use_divergence=use_divergence,
+        current_position_info=current_position_info,
+        ts=str(df.index[-1]),
+    )
+
+
+def generate_signal_from_values(
+    close: float,
+    rsi_s: float,
+    rsi_l: float,
+    prev_rsi_s: float,
+    prev_rsi_l: float,
+    vol_ratio: float,
+    ma5: Optional[float],
+    trend: str,
+    market_env: str,
+    divergence: Optional[str] = None,
+    use_divergence: bool = False,
+    current_position_info: Optional[Dict[str, Any]] = None,
+    ts: str = "",
+) -> Dict[str, Any]:
+    """
+    generate_signal_dict 的规则部分：输入已算好的当根/前一根标量（趋势、背离由调用方给出），输出 signal dict。
+    逐窗口（generate_signal_dict）与流式（NDXShortTermRSIStrategy.on_bar）共用同一套规则（见 signal_values）。
+    """
+    signal, position, reason = signal_values(
+        close, rsi_s, rsi_l, prev_rsi_s, prev_rsi_l, vol_ratio, ma5, trend, market_env,
+        divergence=divergence, use_divergence=use_divergence, current_position_info=current_position_info,
+    )
+    return {"signal": signal, "position": position, "reason": reason, "ts": ts}
+
 
+def signal_values(
+    close: float,
+    rsi_s: float,
+    rsi_l: float,
+    prev_rsi_s: float,
+    prev_rsi_l: float,
+    vol_ratio: float,
+    ma5: Optional[float],
+    trend: str,
+    market_env: str,
+    divergence: Optional[str] = None,
+    use_divergence: bool = False,
+    current_position_info: Optional[Dict[str, Any]] = None,
+) -> Tuple[str, float, str]:
+    """组合规则本体，返回 (signal, position, reason)；on_bar 直接取三元组写入复用的结果 dict，不逐 Bar 建 dict。"""
     # TASK-11：平仓信号（持仓 short + overbought 入场 + RSI<65 → close；long + oversell 入场 + RSI>35 → close）
     if current_position_info:
         direction = current_position_info.get("direction", "")
         entry_reason = current_position_info.get("entry_reason", "")
         if direction == "short" and entry_reason == "overbought" and rsi_s < 65:
-            return {"signal": "close", "position": 0.0, "reason": "close_overbought_exit", "ts": str(df.index[-1])}
+            return "close", 0.0, "close_overbought_exit"
         if direction == "long" and entry_reason == "oversell" and rsi_s > 35:
-            return {"signal": "close", "position": 0.0, "reason": "close_oversell_exit", "ts": str(df.index[-1])}
+            return "close", 0.0, "close_oversell_exit"
         if direction == "short" and entry_reason == "strong_overbought" and rsi_s < 65:
-            return {"signal": "close", "position": 0.0, "reason": "close_overbought_exit", "ts": str(df.index[-1])}
+            return "close", 0.0, "close_overbought_exit"
         if direction == "long" and entry_reason == "strong_oversell" and rsi_s > 35:
-            return {"signal": "close", "position": 0.0, "reason": "close_oversell_exit", "ts": str(df.index[-1])}
+            return "close", 0.0, "close_oversell_exit"
 
-    trend = get_trend(prices, ma50)
     vol_type = get_volume_type(vol_ratio)
 
     ob, os = check_overbought_oversold(rsi_s, rsi_l, market_env)
     cross = check_golden_death_cross(
         rsi_s, rsi_l,
-        prev.get(rsi_short_col, 50), prev.get(rsi_long_col, 50),
+        prev_rsi_s, prev_rsi_l,
         market_env,
         close=close if close else None,
         ma5=float(ma5) if ma5 is not None and pd.notna(ma5) else None,
     )
-    # v2 可选：顶/底背离
-    divergence = None
-    if use_divergence and len(df) >= divergence_lookback:
-        divergence = check_divergence(
-            df["close"], df[rsi_short_col],
-            lookback=divergence_lookback,
-            volume_ratio=vol_ratio,
-            require_volume=False,
-        )
     # 组合：金叉/死叉按趋势分路径（TASK-03 FIX-03）；再超买超卖；背离按趋势分支在下方处理（TASK-10）
     mid = (rsi_s + rsi_l) / 2
     if cross == "golden_cross":
         if trend == TREND_UP or trend == TREND_DOWN:
             if vol_ratio >= 1.2:
-                return {"signal": "buy", "position": 0.4, "reason": "golden_cross", "ts": str(df.index[-1])}
+                return "buy", 0.4, "golden_cross"
         else:
             # 震荡：金叉需缩量 + midpoint 30-50；金叉 mid>50 且放量 → hold
             if mid > 50 and vol_ratio >= 1.2:
                 pass
             elif vol_type == "down" and 30 <= mid <= 50:
-                return {"signal": "buy", "position": 0.3, "reason": "golden_cross", "ts": str(df.index[-1])}
+                return "buy", 0.3, "golden_cross"
     if cross == "death_cross":
         if trend == TREND_UP or trend == TREND_DOWN:
             if vol_ratio >= 1.2:
-                return {"signal": "sell", "position": -0.4, "reason": "death_cross", "ts": str(df.index[-1])}
+                return "sell", -0.4, "death_cross"
         else:
             # 震荡：死叉需放量 + midpoint 50-70；死叉 mid<30 且缩量 → hold
             if mid < 30 and vol_type == "down":
                 pass
             elif vol_ratio >= 1.2 and 50 <= mid <= 70:
-                return {"signal": "sell", "position": -0.3, "reason": "death_cross", "ts": str(df.index[-1])}
+                return "sell", -0.3, "death_cross"
 
     if trend == TREND_UP:
         # TASK-10：上升趋势只处理底背离 + vol≥1.2 → buy 0.5；忽略顶背离
         if use_divergence and divergence == "bullish_divergence" and vol_ratio >= 1.2:
-            return {"signal": "buy", "position": 0.5, "reason": "bullish_divergence", "ts": str(df.index[-1])}
+            return "buy", 0.5, "bullish_divergence"
         # TASK-04 FIX-04：上升趋势回踩/超卖时放量 → 不买（资金出逃）
         if os and vol_ratio >= 1.2:
-            return {"signal": "hold", "position": 0.0, "reason": "pullback_volume_reject", "ts": str(df.index[-1])}
+            return "hold", 0.0, "pullback_volume_reject"
         if os and vol_type == "down":  # 超卖 + 缩量企稳 → 买（TASK-08 强超卖 0.4）
             pos_buy = 0.4 if os == "strong_oversell" else 0.3
-            return {"signal": "buy", "position": pos_buy, "reason": os, "ts": str(df.index[-1])}
+            return "buy", pos_buy, os
         if 45 <= rsi_s <= 55 and vol_ratio >= 1.2:
-            return {"signal": "hold", "position": 0.0, "reason": "pullback_volume_reject", "ts": str(df.index[-1])}
+            return "hold", 0.0, "pullback_volume_reject"
         if 45 <= rsi_s <= 55 and vol_type == "down":  # 回踩 50 加仓
-            return {"signal": "buy", "position": 0.2, "reason": "trend_pullback", "ts": str(df.index[-1])}
+            return "buy", 0.2, "trend_pullback"
         # TASK-05 FIX-05：上升趋势超买 + 放量 → 继续持仓，忽略超买（BRD）
         if ob and vol_ratio >= 1.2:
-            return {"signal": "hold", "position": 0.0, "reason": "overbought_with_volume_ignore", "ts": str(df.index[-1])}
+            return "hold", 0.0, "overbought_with_volume_ignore"
         if ob and vol_type == "down":  # 超买 + 缩量滞涨 → 轻减（TASK-08 强超买 -0.3）
             pos_sell = -0.3 if ob == "strong_overbought" else -0.2
-            return {"signal": "sell_light", "position": pos_sell, "reason": ob, "ts": str(df.index[-1])}
+            return "sell_light", pos_sell, ob
     elif trend == TREND_DOWN:
         # TASK-10：下降趋势只处理顶背离 + 缩量 → sell -1.0 清仓；忽略底背离
         if use_divergence and divergence == "bearish_divergence" and vol_type == "down":
-            return {"signal": "sell", "position": -1.0, "reason": "bearish_divergence", "ts": str(df.index[-1])}
+            return "sell", -1.0, "bearish_divergence"
         if ob and vol_ratio >= 1.2:  # 超买 + 放量 → 减（TASK-08 强超买 -0.4）
             pos_sell = -0.4 if ob == "strong_overbought" else -0.3
-            return {"signal": "sell", "position": pos_sell, "reason": ob, "ts": str(df.index[-1])}
+            return "sell", pos_sell, ob
         # TASK-06 FIX-06：50-60 缩量反弹轻减、放量滞涨加重减
         if 50 <= rsi_s <= 60 and vol_type == "down":
-            return {"signal": "sell_light", "position": -0.2, "reason": "trend_bounce_sell_light", "ts": str(df.index[-1])}
+            return "sell_light", -0.2, "trend_bounce_sell_light"
         if 50 <= rsi_s <= 60 and vol_ratio >= 1.2:
-            return {"signal": "sell", "position": -0.4, "reason": "trend_bounce_sell", "ts": str(df.index[-1])}
+            return "sell", -0.4, "trend_bounce_sell"
         if os and vol_type == "down":  # 超卖 + 缩量 → 轻仓试多（TASK-08 强超卖 0.4）
             pos_buy = 0.4 if os == "strong_oversell" else 0.3
-            return {"signal": "buy_light", "position": pos_buy, "reason": os, "ts": str(df.index[-1])}
+            return "buy_light", pos_buy, os
     else:
         # TASK-10：震荡市底背离+缩量 → buy 0.3；顶背离+放量 → sell -0.3
         if use_divergence and divergence == "bullish_divergence" and vol_type == "down":
-            return {"signal": "buy", "position": 0.3, "reason": "bullish_divergence", "ts": str(df.index[-1])}
+            return "buy", 0.3, "bullish_divergence"
         if use_divergence and divergence == "bearish_divergence" and vol_ratio >= 1.2:
-            return {"signal": "sell", "position": -0.3, "reason": "bearish_divergence", "ts": str(df.index[-1])}
+            return "sell", -0.3, "bearish_divergence"
         # 震荡：超买需放量确认才减、超卖需缩量才加（TASK-08 强超买 -0.4 / 强超卖 0.4）
         if ob and vol_ratio >= 1.2:
             pos_sell = -0.4 if ob == "strong_overbought" else -0.3
-            return {"signal": "sell", "position": pos_sell, "reason": ob, "ts": str(df.index[-1])}
+            return "sell", pos_sell, ob
         if os and vol_type == "down":
             pos_buy = 0.4 if os == "strong_oversell" else 0.3
-            return {"signal": "buy", "position": pos_buy, "reason": os, "ts": str(df.index[-1])}
+            return "buy", pos_buy, os
 
-    return {"signal": "hold", "position": 0.0, "reason": "no_signal", "ts": str(df.index[-1])}
+    return "hold", 0.0, "no_signal"
@@ -1,9 +1,12 @@
 """
 RSI 信号：超买超卖（按阈值）、金叉/死叉（9 日上穿/下穿 24 日）、顶/底背离（v2 可选）。
 与 design.md 一致。
+divergence_flags / divergence_series：整段序列一次算出每根 K 线的背离结果；divergence_at 按下标读取，check_divergence 亦经此计算。
 """
+import numpy as np
 import pandas as pd
-from typing import Any, Dict, Optional, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Any, Dict, Optional, Sequence, Tuple
 
 from ndx_rsi.indicators.market_env import get_rsi_thresholds
 
@@ -19,36 +22,67 @@ def check_divergence(
     顶背离：价格创新高、RSI 未创新高 → "bearish_divergence"。
     底背离：价格创新低、RSI 未创新低 → "bullish_divergence"。
     使用最近两段区间内的最高/最低点比较；require_volume 为 True 时可要求量能条件（如放量）。
+    只取最后 lookback 个值（数组视图，不切 Series）交给 divergence_flags，再用 divergence_at 读最后一根。
     """
-    if len(prices) < lookback or len(rsi) < lookback:
+    if len(prices) < lookback or len(rsi) < lookback or min(5, lookback // 3) < 2:
         return None
-    n = min(5, lookback // 3)
-    if n < 2:
-        return None
-    # 最近 n 根 vs 前一段 n 根
-    recent_p = prices.iloc[-n:]
-    prev_p = prices.iloc[-2 * n : -n]
-    recent_r = rsi.iloc[-n:]
-    prev_r = rsi.iloc[-2 * n : -n]
-    if recent_p.empty or prev_p.empty or recent_r.empty or prev_r.empty:
-        return None
-    recent_price_high = recent_p.max()
-    prev_price_high = prev_p.max()
-    recent_rsi_high = recent_r.max()
-    prev_rsi_high = prev_r.max()
-    recent_price_low = recent_p.min()
-    prev_price_low = prev_p.min()
-    recent_rsi_low = recent_r.min()
-    prev_rsi_low = prev_r.min()
-
     if require_volume and volume_ratio is not None and volume_ratio < 1.0:
         # 顶背离可要求放量、底背离可要求缩量等，此处简化：仅当有量能数据时可选过滤
         pass
-    # 顶背离：价格创新高、RSI 未创新高
-    if recent_price_high > prev_price_high and recent_rsi_high < prev_rsi_high:
+    p = np.asarray(prices, dtype=float)[len(prices) - lookback:]
+    r = np.asarray(rsi, dtype=float)[len(rsi) - lookback:]
+    return divergence_at(divergence_flags(p, r, lookback), -1)
+
+
+def _rolling_max_min(values: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """第 j 个输出为 values[j : j+n] 的最大/最小值（忽略 NaN，全为 NaN 时为 NaN，同 Series.max/min）。"""
+    win = sliding_window_view(values, n)
+    return np.fmax.reduce(win, axis=1), np.fmin.reduce(win, axis=1)
+
+
+def divergence_flags(
+    prices: Sequence[float], rsi: Sequence[float], lookback: int = 20
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    返回 (bearish, bullish) 两个布尔数组：第 i 个元素等于 check_divergence(prices[:i+1], rsi[:i+1], lookback) 的结果。
+    最近 n 根与前 n 根的高低点由同一组 n 根滑动窗口最大/最小值错位 n 取得，整段只需一次窗口归约。
+    """
+    p = np.asarray(prices, dtype=float)
+    r = np.asarray(rsi, dtype=float)
+    size = len(p)
+    bearish = np.zeros(size, dtype=bool)
+    bullish = np.zeros(size, dtype=bool)
+    n = min(5, lookback // 3)
+    if n < 2 or size < max(lookback, 2 * n):
+        return bearish, bullish
+    p_high, p_low = _rolling_max_min(p, n)
+    r_high, r_low = _rolling_max_min(r, n)
+    # 第 i 根：最近段起点 i-n+1，前一段起点 i-2n+1；i 从 lookback-1 开始
+    first = max(lookback, 2 * n) - 1
+    cur = slice(first - n + 1, size - n + 1)
+    prev = slice(first - 2 * n + 1, size - 2 * n + 1)
+    bear = (p_high[cur] > p_high[prev]) & (r_high[cur] < r_high[prev])
+    bull = (p_low[cur] < p_low[prev]) & (r_low[cur] > r_low[prev])
+    bearish[first:] = bear
+    bullish[first:] = bull & ~bear  # 与 check_divergence 相同：顶背离优先
+    return bearish, bullish
+
+
+def divergence_series(prices: pd.Series, rsi: pd.Series, lookback: int = 20) -> pd.Series:
+    """逐 Bar 背离结果（"bearish_divergence" / "bullish_divergence" / None），索引同 prices。"""
+    bearish, bullish = divergence_flags(prices, rsi, lookback)
+    out = np.full(len(bearish), None, dtype=object)
+    out[bearish] = "bearish_divergence"
+    out[bullish] = "bullish_divergence"
+    return pd.Series(out, index=prices.index, dtype=object)
+
+
+def divergence_at(flags: Tuple[np.ndarray, np.ndarray], i: int) -> Optional[str]:
+    """按下标读取 divergence_flags 的结果，返回值同 check_divergence。"""
+    bearish, bullish = flags
+    if bearish[i]:
         return "bearish_divergence"
-    # 底背离：价格创新低、RSI 未创新低
-    if recent_price_low < prev_price_low and recent_rsi_low > prev_rsi_low:
+    if bullish[i]:
         return "bullish_divergence"
     return None
 
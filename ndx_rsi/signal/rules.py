@@ -0,0 +1,223 @@
+"""
+信号规则表：把 generate_signal_from_values 的 if/elif 组合逻辑写成有序规则表，编译为 NumPy 布尔掩码整段求值。
+- 每条规则 = (signal, position, reason, 条件名元组)，条件全部成立才命中；条件名以 "!" 开头表示取反
+- 按表中顺序先命中者生效（first-match-wins），均未命中为 hold / no_signal
+- 条件名对应 signal_features 计算出的逐 Bar 掩码（趋势 × 量能 × RSI 超买超卖 × 金叉死叉 × 背离 × 持仓平仓）
+generate_signal_from_values 保留为标量参考实现，规则表须与其逐 Bar 一致。
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ndx_rsi.indicators.market_env import get_rsi_thresholds
+from ndx_rsi.signal.trend_volume import TREND_DOWN, TREND_UP
+
+
+@dataclass(frozen=True)
+class Rule:
+    signal: str
+    position: float
+    reason: str
+    when: Tuple[str, ...]
+
+
+# 顺序即优先级，与 generate_signal_dict / generate_signal_from_values 的分支顺序一致
+SIGNAL_RULES: List[Rule] = [
+    Rule("hold", 0.0, "insufficient_data", ("first_bar",)),
+    # TASK-11：持仓平仓
+    Rule("close", 0.0, "close_overbought_exit", ("short_from_overbought", "rsi_below_65")),
+    Rule("close", 0.0, "close_oversell_exit", ("long_from_oversell", "rsi_above_35")),
+    # 金叉/死叉按趋势分路径（TASK-03 FIX-03）
+    Rule("buy", 0.4, "golden_cross", ("golden_cross", "trending", "vol_heavy")),
+    Rule("buy", 0.3, "golden_cross", ("golden_cross", "sideways", "!golden_hot", "vol_down", "mid_30_50")),
+    Rule("sell", -0.4, "death_cross", ("death_cross", "trending", "vol_heavy")),
+    Rule("sell", -0.3, "death_cross", ("death_cross", "sideways", "!death_cold", "vol_heavy", "mid_50_70")),
+    # 上升趋势
+    Rule("buy", 0.5, "bullish_divergence", ("trend_up", "bullish_divergence", "vol_heavy")),
+    Rule("hold", 0.0, "pullback_volume_reject", ("trend_up", "oversold_any", "vol_heavy")),
+    Rule("buy", 0.4, "strong_oversell", ("trend_up", "strong_oversell", "vol_down")),
+    Rule("buy", 0.3, "oversell", ("trend_up", "oversell", "vol_down")),
+    Rule("hold", 0.0, "pullback_volume_reject", ("trend_up", "rsi_45_55", "vol_heavy")),
+    Rule("buy", 0.2, "trend_pullback", ("trend_up", "rsi_45_55", "vol_down")),
+    Rule("hold", 0.0, "overbought_with_volume_ignore", ("trend_up", "overbought_any", "vol_heavy")),
+    Rule("sell_light", -0.3, "strong_overbought", ("trend_up", "strong_overbought", "vol_down")),
+    Rule("sell_light", -0.2, "overbought", ("trend_up", "overbought", "vol_down")),
+    # 下降趋势
+    Rule("sell", -1.0, "bearish_divergence", ("trend_down", "bearish_divergence", "vol_down")),
+    Rule("sell", -0.4, "strong_overbought", ("trend_down", "strong_overbought", "vol_heavy")),
+    Rule("sell", -0.3, "overbought", ("trend_down", "overbought", "vol_heavy")),
+    Rule("sell_light", -0.2, "trend_bounce_sell_light", ("trend_down", "rsi_50_60", "vol_down")),
+    Rule("sell", -0.4, "trend_bounce_sell", ("trend_down", "rsi_50_60", "vol_heavy")),
+    Rule("buy_light", 0.4, "strong_oversell", ("trend_down", "strong_oversell", "vol_down")),
+    Rule("buy_light", 0.3, "oversell", ("trend_down", "oversell", "vol_down")),
+    # 震荡（趋势非 up/down）
+    Rule("buy", 0.3, "bullish_divergence", ("sideways", "bullish_divergence", "vol_down")),
+    Rule("sell", -0.3, "bearish_divergence", ("sideways", "bearish_divergence", "vol_heavy")),
+    Rule("sell", -0.4, "strong_overbought", ("sideways", "strong_overbought", "vol_heavy")),
+    Rule("sell", -0.3, "overbought", ("sideways", "overbought", "vol_heavy")),
+    Rule("buy", 0.4, "strong_oversell", ("sideways", "strong_oversell", "vol_down")),
+    Rule("buy", 0.3, "oversell", ("sideways", "oversell", "vol_down")),
+]
+
+
+def _as_float(x: Sequence[float]) -> np.ndarray:
+    return np.asarray(x, dtype=float)
+
+
+def _as_str(x: Optional[Sequence[object]], n: int) -> np.ndarray:
+    """字符串数组（含 category 序列）；None/NaN 视为空串。"""
+    if x is None:
+        return np.full(n, "", dtype=object)
+    return pd.Series(np.asarray(x, dtype=object)).fillna("").to_numpy(dtype=object)
+
+
+def _thresholds(market_env: np.ndarray) -> Dict[str, np.ndarray]:
+    """按每根 K 线的市场环境取 RSI 阈值数组。"""
+    out: Dict[str, np.ndarray] = {k: np.empty(len(market_env)) for k in ("overbuy", "strong_overbuy", "oversell", "strong_oversell")}
+    for env in set(market_env.tolist()):
+        mask = market_env == env
+        th = get_rsi_thresholds(env)
+        for key in out:
+            out[key][mask] = th[key]
+    return out
+
+
+def signal_features(
+    close: Sequence[float],
+    rsi_s: Sequence[float],
+    rsi_l: Sequence[float],
+    prev_rsi_s: Sequence[float],
+    prev_rsi_l: Sequence[float],
+    vol_ratio: Sequence[float],
+    ma5: Optional[Sequence[float]],
+    trend: Sequence[str],
+    market_env: Sequence[str],
+    divergence: Optional[Sequence[Optional[str]]] = None,
+    use_divergence: bool = False,
+    direction: Optional[Sequence[str]] = None,
+    entry_reason: Optional[Sequence[str]] = None,
+    first_bar: Optional[Sequence[bool]] = None,
+) -> Dict[str, np.ndarray]:
+    """逐 Bar 计算规则表用到的全部条件掩码；参数含义与 generate_signal_from_values 相同（此处为等长数组）。"""
+    close, rsi_s, rsi_l = _as_float(close), _as_float(rsi_s), _as_float(rsi_l)
+    prev_s, prev_l, vr = _as_float(prev_rsi_s), _as_float(prev_rsi_l), _as_float(vol_ratio)
+    n = len(close)
+    trend = _as_str(trend, n)
+    env = _as_str(market_env, n)
+    div = _as_str(divergence, n)
+    direction = _as_str(direction, n)
+    entry_reason = _as_str(entry_reason, n)
+    ma5 = np.full(n, np.nan) if ma5 is None else _as_float(ma5)
+
+    # 量能（get_volume_type）：≥1.2 放量；0.5 < vr ≤ 0.8 缩量
+    vol_heavy = vr >= 1.2
+    vol_down = ~vol_heavy & (vr > 0.5) & (vr <= 0.8)
+
+    # 超买超卖（check_overbought_oversold）：强超买 > 超买 > 强超卖 > 超卖，互斥
+    th = _thresholds(env)
+    strong_ob = rsi_s >= th["strong_overbuy"]
+    ob = ~strong_ob & (rsi_s >= th["overbuy"])
+    not_ob = ~(strong_ob | ob)
+    strong_os = not_ob & (rsi_s <= th["strong_oversell"])
+    os_ = not_ob & ~strong_os & (rsi_s <= th["oversell"])
+
+    # 金叉/死叉（check_golden_death_cross）：close 为 0 或 ma5 缺失时不做 MA5 确认
+    mid = (rsi_s + rsi_l) / 2
+    has_ma5 = (close != 0) & ~np.isnan(ma5)
+    golden = (prev_s < prev_l) & (rsi_s > rsi_l)
+    death = (prev_s > prev_l) & (rsi_s < rsi_l)
+    golden_cross = golden & ~(mid > 70) & ~(has_ma5 & (close <= ma5)) & (mid >= 30) & (mid <= 60)
+    death_cross = death & ~(mid < 30) & ~(has_ma5 & (close >= ma5)) & (mid >= 40) & (mid <= 70)
+
+    trend_up = trend == TREND_UP
+    trend_down = trend == TREND_DOWN
+    short_pos = direction == "short"
+    long_pos = direction == "long"
+    return {
+        "first_bar": np.zeros(n, dtype=bool) if first_bar is None else np.asarray(first_bar, dtype=bool),
+        "short_from_overbought": short_pos & np.isin(entry_reason, ["overbought", "strong_overbought"]),
+        "long_from_oversell": long_pos & np.isin(entry_reason, ["oversell", "strong_oversell"]),
+        "rsi_below_65": rsi_s < 65,
+        "rsi_above_35": rsi_s > 35,
+        "vol_heavy": vol_heavy,
+        "vol_down": vol_down,
+        "strong_overbought": strong_ob,
+        "overbought": ob,
+        "overbought_any": strong_ob | ob,
+        "strong_oversell": strong_os,
+        "oversell": os_,
+        "oversold_any": strong_os | os_,
+        "golden_cross": golden_cross,
+        "death_cross": death_cross,
+        "golden_hot": (mid > 50) & vol_heavy,
+        "death_cold": (mid < 30) & vol_down,
+        "mid_30_50": (mid >= 30) & (mid <= 50),
+        "mid_50_70": (mid >= 50) & (mid <= 70),
+        "rsi_45_55": (rsi_s >= 45) & (rsi_s <= 55),
+        "rsi_50_60": (rsi_s >= 50) & (rsi_s <= 60),
+        "trend_up": trend_up,
+        "trend_down": trend_down,
+        "trending": trend_up | trend_down,
+        "sideways": ~(trend_up | trend_down),
+        "bullish_divergence": (div == "bullish_divergence") & bool(use_divergence),
+        "bearish_divergence": (div == "bearish_divergence") & bool(use_divergence),
+    }
+
+
+def evaluate_rules(
+    features: Dict[str, np.ndarray], rules: Sequence[Rule] = SIGNAL_RULES
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """按规则顺序 first-match-wins 求值，返回 (signal, position, reason) 三个数组。"""
+    n = len(next(iter(features.values())))
+    signal = np.full(n, "hold", dtype=object)
+    position = np.zeros(n)
+    reason = np.full(n, "no_signal", dtype=object)
+    unmatched = np.ones(n, dtype=bool)
+    for rule in rules:
+        mask = unmatched.copy()
+        for cond in rule.when:
+            mask &= ~features[cond[1:]] if cond.startswith("!") else features[cond]
+        if mask.any():
+            signal[mask] = rule.signal
+            position[mask] = rule.position
+            reason[mask] = rule.reason
+            unmatched &= ~mask
+    return signal, position, reason
+
+
+def generate_signal_series(
+    df: pd.DataFrame,
+    market_env: Sequence[str],
+    trend: Sequence[str],
+    divergence: Optional[Sequence[Optional[str]]] = None,
+    use_divergence: bool = False,
+    rsi_short_col: str = "rsi_9",
+    rsi_long_col: str = "rsi_24",
+    volume_ratio_col: str = "volume_ratio",
+    ma5_col: str = "ma5",
+) -> pd.DataFrame:
+    """
+    generate_signal_dict 的整段版本：第 i 行等于对 df.iloc[:i+1] 调用 generate_signal_dict（无持仓信息）。
+    market_env / trend / divergence 为与 df 等长的逐 Bar 序列。返回含 signal/position/reason 列的 DataFrame。
+    """
+    n = len(df)
+    rsi_s = df[rsi_short_col].to_numpy(dtype=float)
+    rsi_l = df[rsi_long_col].to_numpy(dtype=float)
+    features = signal_features(
+        close=df["close"].to_numpy(dtype=float),
+        rsi_s=rsi_s,
+        rsi_l=rsi_l,
+        prev_rsi_s=np.concatenate(([np.nan], rsi_s[:-1])),
+        prev_rsi_l=np.concatenate(([np.nan], rsi_l[:-1])),
+        vol_ratio=df[volume_ratio_col].to_numpy(dtype=float),
+        ma5=df[ma5_col].to_numpy(dtype=float) if ma5_col in df.columns else None,
+        trend=trend,
+        market_env=market_env,
+        divergence=divergence,
+        use_divergence=use_divergence,
+        first_bar=np.arange(n) < 1,
+    )
+    signal, position, reason = evaluate_rules(features)
+    return pd.DataFrame({"signal": signal, "position": position, "reason": reason}, index=df.index)
@@ -1,11 +1,14 @@
 """
 趋势判定（50 日均线斜率 + 收盘价与 MA50）+ 量能分类（放量/缩量/巨量/地量）。
+trend_series：整段序列一次算出每根 K 线的趋势，与逐窗口 get_trend 一致。
 与 design.md 一致。
 """
 import numpy as np
 import pandas as pd
 from typing import Literal
 
+from ndx_rsi.indicators.regression import refine_near_thresholds, rolling_slope
+
 TREND_UP = "up"
 TREND_DOWN = "down"
 TREND_SIDE = "side"
@@ -13,6 +16,8 @@ VOLUME_UP = "up"      # 放量 ≥1.2
 VOLUME_DOWN = "down"  # 缩量 ≤0.8
 VOLUME_HUGE = "huge"  # 巨量 ≥1.5
 VOLUME_GROUND = "ground"  # 地量 ≤0.5
+# 趋势判定：MA50 斜率 / MA50 的上下阈值
+TREND_SLOPE_THRESHOLDS = (0.0005, -0.0005)
 
 
 def get_trend(prices: pd.Series, ma50: pd.Series, lookback: int = 5) -> str:
@@ -23,17 +28,41 @@ def get_trend(prices: pd.Series, ma50: pd.Series, lookback: int = 5) -> str:
         return TREND_SIDE
     ma = ma50.iloc[-lookback:].values
     slope = np.polyfit(np.arange(len(ma)), ma, 1)[0]
-    slope_pct = slope / (ma[-1] + 1e-10)
     # 最近 2 根
     close = prices.iloc[-2:].values
     ma2 = ma50.iloc[-2:].values
-    if slope_pct > 0.0005 and (close >= ma2 - 1e-8).all():
+    return classify_trend(slope, close[0], close[1], ma2[0], ma2[1])
+
+
+def classify_trend(slope: float, prev_close: float, last_close: float, prev_ma50: float, last_ma50: float) -> str:
+    """get_trend 的判定部分：slope 为近 lookback 日 MA50 斜率，其余为最近 2 日收盘价与 MA50。"""
+    slope_pct = slope / (last_ma50 + 1e-10)
+    if slope_pct > 0.0005 and prev_close >= prev_ma50 - 1e-8 and last_close >= last_ma50 - 1e-8:
         return TREND_UP
-    if slope_pct < -0.0005 and (close <= ma2 + 1e-8).all():
+    if slope_pct < -0.0005 and prev_close <= prev_ma50 + 1e-8 and last_close <= last_ma50 + 1e-8:
         return TREND_DOWN
     return TREND_SIDE
 
 
+def trend_series(prices: pd.Series, ma50: pd.Series, lookback: int = 5) -> pd.Series:
+    """逐 Bar 趋势（category 序列）：第 i 行等于 get_trend(prices.iloc[:i+1], ma50.iloc[:i+1], lookback)。"""
+    close = prices.to_numpy(dtype=float)
+    ma = ma50.to_numpy(dtype=float)
+    n = len(close)
+    trend = np.full(n, TREND_SIDE, dtype=object)
+    if n >= lookback + 2:
+        prev_ma = np.concatenate(([np.nan], ma[:-1]))
+        prev_close = np.concatenate(([np.nan], close[:-1]))
+        scale = ma + 1e-10
+        slope = refine_near_thresholds(rolling_slope(ma, lookback), ma, lookback, scale, TREND_SLOPE_THRESHOLDS)
+        slope_pct = slope / scale
+        up = (slope_pct > 0.0005) & (prev_close >= prev_ma - 1e-8) & (close >= ma - 1e-8)
+        down = (slope_pct < -0.0005) & (prev_close <= prev_ma + 1e-8) & (close <= ma + 1e-8)
+        trend = np.select([up, down], [TREND_UP, TREND_DOWN], default=TREND_SIDE).astype(object)
+        trend[: lookback + 1] = TREND_SIDE
+    return pd.Series(pd.Categorical(trend, categories=[TREND_UP, TREND_DOWN, TREND_SIDE]), index=prices.index)
+
+
 def get_volume_type(volume_ratio: float) -> str:
     """量能类型：≥1.5 巨量，≥1.2 放量，≤0.5 地量，≤0.8 缩量。"""
     if volume_ratio >= 1.5:
@@ -1,16 +1,35 @@
-"""策略抽象接口：generate_signal、calculate_risk。"""
+"""
+策略抽象接口：generate_signal、calculate_risk；generate_signals 整段序列批量生成信号。
+required_indicators / min_bars 声明所需预计算指标与最少 K 线数，由指标管线统一准备数据。
+"""
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from ndx_rsi.indicators.pipeline import IndicatorSpec
+
+# generate_signals 输出的基础列
+SIGNAL_COLUMNS = ["signal", "position", "reason"]
+
 
 class BaseTradingStrategy(ABC):
     def __init__(self, strategy_config: dict) -> None:
         self.config = strategy_config
 
+    @property
+    def min_bars(self) -> int:
+        """最少 K 线数：回测从第 min_bars 根起生成信号，实时信号不足时视为数据不足。"""
+        return 50
+
+    def required_indicators(self) -> List[IndicatorSpec]:
+        """策略所需的预计算指标列，由 IndicatorPipeline 解析依赖、去重后统一计算。"""
+        return []
+
     @abstractmethod
-    def generate_signal(self, data: pd.DataFrame) -> Dict[str, Any]:
+    def generate_signal(
+        self, data: pd.DataFrame, current_position_info: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """输入含 close/volume/rsi_short/rsi_long/ma50/volume_ratio 的 DataFrame；输出 signal dict。"""
         pass
 
@@ -18,3 +37,33 @@ class BaseTradingStrategy(ABC):
     def calculate_risk(self, signal: Dict[str, Any], data: pd.DataFrame) -> Dict[str, Any]:
         """返回 stop_loss、take_profit 等。"""
         pass
+
+    def generate_signals(self, df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """
+        对 df 第 start 根起的每根 K 线生成信号，返回以 df.index[start:] 为索引、含 signal/position/reason 列的 DataFrame。
+        第 i 行等价于 generate_signal(df.iloc[:i+1])，持仓信息取上一行 position（与次日执行回测一致，start 处视为空仓）。
+        默认逐 Bar 切片调用 generate_signal（整段 O(n²)，仅作参考实现）；子类可覆盖为向量化实现，结果须与默认实现一致。
+        """
+        rows = []
+        prev_pos = 0.0
+        for i in range(start, len(df)):
+            current_position_info = None
+            if prev_pos != 0:
+                direction = "long" if prev_pos > 0 else "short"
+                current_position_info = {"direction": direction, "entry_reason": ""}
+            sig = self.generate_signal(df.iloc[: i + 1], current_position_info=current_position_info)
+            prev_pos = float(sig.get("position", 0.0) or 0.0)
+            rows.append(dict(sig, position=prev_pos))
+        out = pd.DataFrame(rows, index=df.index[start:])
+        for col in SIGNAL_COLUMNS:
+            if col not in out.columns:
+                out[col] = pd.Series(dtype=float if col == "position" else object)
+        out["position"] = out["position"].astype(float)
+        return out
+
+
+def signal_frame(index: pd.Index, signal: Any, position: Any, reason: Any, **extra: Any) -> pd.DataFrame:
+    """按列组装 generate_signals 的输出（向量化实现共用）。"""
+    out = pd.DataFrame({"signal": signal, "position": position, "reason": reason, **extra}, index=index)
+    out["position"] = out["position"].astype(float)
+    return out
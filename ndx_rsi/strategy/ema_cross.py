@@ -4,11 +4,13 @@ EMA 策略：与 nasdaq_v1 逻辑一致。
 - v2: 80/200 EMA 趋势 + 20 日波动率过滤，仅在上升趋势+低波动时持仓
 - v3: 纳指机构级，五条件全满足才做多（80>200EMA、close>80EMA、ADX>25、MACD>0、close>SMA200；可选 VIX、vol_20）
 """
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
-from ndx_rsi.strategy.base import BaseTradingStrategy
+from ndx_rsi.indicators.pipeline import IndicatorSpec, indicator
+from ndx_rsi.strategy.base import BaseTradingStrategy, signal_frame
 
 
 def _ensure_ema_columns(df: pd.DataFrame, short: int, long: int) -> None:
@@ -24,6 +26,16 @@ def _ensure_ema_columns(df: pd.DataFrame, short: int, long: int) -> None:
 class EMACrossoverV1Strategy(BaseTradingStrategy):
     """EMA 交叉策略 v1：黄金交叉买入、死亡交叉卖出，支持日线/月度调仓。"""
 
+    @property
+    def min_bars(self) -> int:
+        return max(50, self.config.get("long_ema", 200))
+
+    def required_indicators(self) -> List[IndicatorSpec]:
+        return [
+            indicator("ema", span=self.config.get("short_ema", 50)),
+            indicator("ema", span=self.config.get("long_ema", 200)),
+        ]
+
     def generate_signal(
         self, data: pd.DataFrame, current_position_info: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
@@ -69,6 +81,48 @@ class EMACrossoverV1Strategy(BaseTradingStrategy):
             return {"signal": "hold", "position": 1.0, "reason": "hold"}
         return {"signal": "hold", "position": 0.0, "reason": "hold"}
 
+    def generate_signals(self, df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """向量化：交叉事件定仓位，其余 Bar 沿用上一 Bar 仓位（start 处为空仓）。"""
+        if "close" not in df.columns:
+            return super().generate_signals(df, start)
+        short_ema = self.config.get("short_ema", 50)
+        long_ema = self.config.get("long_ema", 200)
+        rebalance_freq = self.config.get("rebalance_freq", "daily")
+        data = df
+        if f"ema_{short_ema}" not in df.columns or f"ema_{long_ema}" not in df.columns:
+            data = df[["close"]].copy()
+            _ensure_ema_columns(data, short_ema, long_ema)
+        cur_short = data[f"ema_{short_ema}"].to_numpy(dtype=float)
+        cur_long = data[f"ema_{long_ema}"].to_numpy(dtype=float)
+        prev_short = np.r_[np.nan, cur_short[:-1]]
+        prev_long = np.r_[np.nan, cur_long[:-1]]
+        first = np.arange(len(df)) == 0  # 窗口长度 < 2
+
+        if rebalance_freq == "monthly":
+            # 逐 Bar 调用时窗口末根恒为当月最后一个交易日，故每根 K 线均按 EMA 调仓
+            bull = cur_short > cur_long
+            position = np.where(first, 0.0, np.where(bull, 1.0, 0.0))
+            signal = np.where(first, "hold", np.where(bull, "buy", "sell"))
+            reason = np.where(
+                first, "insufficient_data", np.where(bull, "monthly_rebalance_bull", "monthly_rebalance_bear")
+            )
+            return signal_frame(df.index, signal, position, reason).iloc[start:]
+
+        golden = (cur_short > cur_long) & (prev_short <= prev_long)
+        death = (cur_short < cur_long) & (prev_short >= prev_long)
+        event = np.full(len(df), np.nan)
+        event[golden] = 1.0
+        event[death & ~golden] = 0.0
+        event[first] = 0.0
+        event = event[start:]
+        if len(event):
+            event[0] = 0.0 if np.isnan(event[0]) else event[0]
+        position = pd.Series(event).ffill().to_numpy()
+        golden, death, first = golden[start:], death[start:], first[start:]
+        signal = np.select([first, golden, death], ["hold", "buy", "sell"], "hold")
+        reason = np.select([first, golden, death], ["insufficient_data", "golden_cross", "death_cross"], "hold")
+        return signal_frame(df.index[start:], signal, position, reason)
+
     def calculate_risk(self, signal: Dict[str, Any], data: pd.DataFrame) -> Dict[str, Any]:
         if data.empty:
             return {"stop_loss": 0.0, "take_profit": 0.0}
@@ -85,6 +139,20 @@ class EMACrossoverV1Strategy(BaseTradingStrategy):
 class EMATrendV3Strategy(BaseTradingStrategy):
     """纳指机构级 v3：仅条件 1（80EMA>200EMA）为做多依据；条件 2～5 为辅助参考；五条件全满足时强烈买入。"""
 
+    @property
+    def min_bars(self) -> int:
+        return 200
+
+    def required_indicators(self) -> List[IndicatorSpec]:
+        return [
+            indicator("ema", span=self.config.get("ema_fast", 80)),
+            indicator("ema", span=self.config.get("ema_slow", 200)),
+            indicator("vol", window=self.config.get("vol_window", 20)),
+            indicator("sma", window=200),
+            indicator("adx", period=self.config.get("adx_period", 14)),
+            indicator("macd_line", fast=self.config.get("macd_fast", 12), slow=self.config.get("macd_slow", 26)),
+        ]
+
     def generate_signal(
         self,
         data: pd.DataFrame,
@@ -141,6 +209,47 @@ class EMATrendV3Strategy(BaseTradingStrategy):
         reason = "all_conditions_met" if all_five else "uptrend"
         return {"signal": "buy", "position": 1.0, "reason": reason}
 
+    def generate_signals(self, df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """向量化：逐列比较后按 generate_signal 的判断顺序取首个命中分支（不含 VIX）。"""
+        fast = self.config.get("ema_fast", 80)
+        slow = self.config.get("ema_slow", 200)
+        adx_period = self.config.get("adx_period", 14)
+        adx_threshold = self.config.get("adx_threshold", 25)
+        vol_window = self.config.get("vol_window", 20)
+        vol_threshold = self.config.get("vol_threshold", 0.02)
+        use_vol_filter = self.config.get("use_vol_filter", False)
+        required = [f"ema_{fast}", f"ema_{slow}", "sma_200", f"adx_{adx_period}", "macd_line"]
+        if use_vol_filter:
+            required.append(f"vol_{vol_window}")
+        index = df.index[start:]
+        if "close" not in df.columns or any(col not in df.columns for col in required):
+            reason = np.where(np.arange(start, len(df)) == 0, "insufficient_data", "missing_indicators")
+            return signal_frame(index, "hold", 0.0, reason)
+
+        def col(name: str) -> np.ndarray:
+            return df[name].to_numpy(dtype=float)[start:]
+
+        close = col("close")
+        ema_fast = col(f"ema_{fast}")
+        first = np.arange(start, len(df)) == 0
+        not_up = ~(ema_fast > col(f"ema_{slow}"))
+        high_vol = (col(f"vol_{vol_window}") >= vol_threshold) if use_vol_filter else np.zeros(len(close), dtype=bool)
+        all_five = (
+            (close > ema_fast)
+            & (col(f"adx_{adx_period}") > adx_threshold)
+            & (col("macd_line") > 0)
+            & (close > col("sma_200"))
+        )
+        conds = [first, not_up, high_vol]
+        signal = np.select(conds, ["hold", "sell", "sell"], "buy")
+        position = np.select(conds, [0.0, 0.0, 0.0], 1.0)
+        reason = np.select(
+            conds,
+            ["insufficient_data", "ema_not_uptrend", "vol_above_threshold"],
+            np.where(all_five, "all_conditions_met", "uptrend"),
+        )
+        return signal_frame(index, signal, position, reason)
+
     def calculate_risk(self, signal: Dict[str, Any], data: pd.DataFrame) -> Dict[str, Any]:
         if data.empty:
             return {"stop_loss": 0.0, "take_profit": 0.0}
@@ -157,6 +266,17 @@ class EMATrendV3Strategy(BaseTradingStrategy):
 class EMATrendV2Strategy(BaseTradingStrategy):
     """趋势增强 v2：80/200 EMA 定趋势 + 20 日波动率过滤，仅上升+低波动时持仓。"""
 
+    @property
+    def min_bars(self) -> int:
+        return max(50, self.config.get("ema_slow", 200))
+
+    def required_indicators(self) -> List[IndicatorSpec]:
+        return [
+            indicator("ema", span=self.config.get("ema_fast", 80)),
+            indicator("ema", span=self.config.get("ema_slow", 200)),
+            indicator("vol", window=self.config.get("vol_window", 20)),
+        ]
+
     def generate_signal(
         self, data: pd.DataFrame, current_position_info: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
@@ -178,6 +298,23 @@ class EMATrendV2Strategy(BaseTradingStrategy):
         reason = "uptrend_low_vol" if position else "no_uptrend_or_high_vol"
         return {"signal": "buy" if position else "sell", "position": position, "reason": reason}
 
+    def generate_signals(self, df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """向量化：上升趋势且低波动的 Bar 满仓，其余空仓。"""
+        fast = self.config.get("ema_fast", 80)
+        slow = self.config.get("ema_slow", 200)
+        vol_window = self.config.get("vol_window", 20)
+        vol_threshold = self.config.get("vol_threshold", 0.02)
+        cols = [f"ema_{fast}", f"ema_{slow}", f"vol_{vol_window}"]
+        index = df.index[start:]
+        first = np.arange(start, len(df)) == 0
+        if any(col not in df.columns for col in cols):
+            return signal_frame(index, "hold", 0.0, np.where(first, "insufficient_data", "missing_indicators"))
+        ema_fast, ema_slow, vol = (df[col].to_numpy(dtype=float)[start:] for col in cols)
+        on = (ema_fast > ema_slow) & (vol < vol_threshold) & ~first
+        signal = np.where(first, "hold", np.where(on, "buy", "sell"))
+        reason = np.where(first, "insufficient_data", np.where(on, "uptrend_low_vol", "no_uptrend_or_high_vol"))
+        return signal_frame(index, signal, np.where(on, 1.0, 0.0), reason)
+
     def calculate_risk(self, signal: Dict[str, Any], data: pd.DataFrame) -> Dict[str, Any]:
         if data.empty:
             return {"stop_loss": 0.0, "take_profit": 0.0}
@@ -1,4 +1,6 @@
 """策略工厂：从 config/strategy.yaml 按名称创建策略实例。"""
+from typing import Any, Dict, Optional
+
 from ndx_rsi.config_loader import get_strategy_config
 from ndx_rsi.strategy.base import BaseTradingStrategy
 from ndx_rsi.strategy.ema_cross import (
@@ -10,9 +12,10 @@ from ndx_rsi.strategy.ndx_short import NDXShortTermRSIStrategy
 from ndx_rsi.strategy.ndx_ma50_volume_rsi import NDXMA50VolumeRSIStrategy
 
 
-def create_strategy(strategy_name: str) -> BaseTradingStrategy:
-    """根据策略名加载配置并返回策略实例。"""
-    config = get_strategy_config(strategy_name)
+def create_strategy(strategy_name: str, config: Optional[Dict[str, Any]] = None) -> BaseTradingStrategy:
+    """根据策略名加载配置并返回策略实例；传入 config 时直接使用（参数扫描等场景）。"""
+    if config is None:
+        config = get_strategy_config(strategy_name)
     if not config:
         raise ValueError(f"Unknown strategy: {strategy_name}")
     if strategy_name == "EMA_cross_v1":
@@ -35,5 +38,5 @@ class StrategyFactory:
     """策略工厂类，与 TDD 接口一致。"""
 
     @staticmethod
-    def create_strategy(strategy_name: str) -> BaseTradingStrategy:
-        return create_strategy(strategy_name)
+    def create_strategy(strategy_name: str, config: Optional[Dict[str, Any]] = None) -> BaseTradingStrategy:
+        return create_strategy(strategy_name, config)
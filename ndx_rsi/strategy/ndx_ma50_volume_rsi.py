@@ -1,12 +1,15 @@
 """
 NDX 50日均线+成交量+RSI 三合一策略：趋势与信号规则完全按 BRD（docs/v8/brd.md）执行。
 BRD 第三步：趋势判定（上升/下降/震荡/趋势过渡）；第四步：RSI(14)+volume_ratio 信号。
+trend_type_series 为 _get_trend_type 的整段版本，generate_signals 据此一次算出全部历史。
 """
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
+import numpy as np
 import pandas as pd
 
-from ndx_rsi.strategy.base import BaseTradingStrategy
+from ndx_rsi.indicators.pipeline import IndicatorSpec, indicator
+from ndx_rsi.strategy.base import BaseTradingStrategy, signal_frame
 
 
 # 趋势类型与 BRD 伪代码一致
@@ -88,9 +91,60 @@ def _get_trend_type(df: pd.DataFrame, i: int, config: dict) -> str:
     return TREND_TRANSITION
 
 
+def trend_type_series(close: pd.Series, ma50: pd.Series, config: Optional[dict] = None) -> np.ndarray:
+    """
+    整段趋势判定：第 i 个元素等于 _get_trend_type(df, i, config)。
+    各条件为错位比较的布尔数组；连续 5 日斜率平坦用长度 5 的滑动窗口 all 判断。
+    """
+    config = config or {}
+    slope_th = config.get("slope_flat_threshold", 0.1)
+    osc_range = config.get("oscillate_range", 0.03)
+    c = np.asarray(close, dtype=float)
+    m = np.asarray(ma50, dtype=float)
+    n = len(c)
+    out = np.full(n, TREND_TRANSITION, dtype=object)
+    if n < 4:
+        return out
+
+    def lag(x: np.ndarray, k: int) -> np.ndarray:
+        return np.concatenate((np.full(k, np.nan), x[:-k]))
+
+    c1, m1, m2, m3 = lag(c, 1), lag(m, 1), lag(m, 2), lag(m, 3)
+    valid = ~(np.isnan(c) | np.isnan(m) | np.isnan(m1) | np.isnan(m2) | np.isnan(m3))
+    valid[:3] = False
+    up = valid & (c > m) & (m > m1) & (m1 > m2) & (m2 > m3) & ~((c < m) & (c1 < m1))
+    down = valid & ~up & (c < m) & (m < m1) & (m1 < m2) & (m2 < m3) & ~((c > m) & (c1 > m1))
+
+    # _sma50_slope_pct：前值为 0/NaN 或当前值为 NaN 时无斜率（视为不平坦）
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (m - m1) / m1 * 100.0
+    flat = ~np.isnan(m) & ~np.isnan(m1) & (m1 != 0) & (np.abs(slope) < slope_th)
+    flat_5 = np.zeros(n, dtype=bool)
+    flat_5[4:] = np.lib.stride_tricks.sliding_window_view(flat, 5).all(axis=1)
+    band = (m * (1 - osc_range) <= c) & (c <= m * (1 + osc_range))
+    osc = valid & ~up & ~down & flat_5 & (m > 0) & band
+
+    out[up] = TREND_UP
+    out[down] = TREND_DOWN
+    out[osc] = TREND_OSCILLATE
+    return out
+
+
 class NDXMA50VolumeRSIStrategy(BaseTradingStrategy):
     """纳指 50日均线+成交量+RSI 三合一策略；趋势与信号完全按 BRD 执行。"""
 
+    @property
+    def min_bars(self) -> int:
+        return MIN_BARS
+
+    def required_indicators(self) -> List[IndicatorSpec]:
+        return [
+            indicator("sma", column="ma50", window=50),
+            indicator("sma", column="ma20", window=20),
+            indicator("rsi", period=14),
+            indicator("volume_ratio", window=20),
+        ]
+
     def generate_signal(
         self, data: pd.DataFrame, current_position_info: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
@@ -177,6 +231,52 @@ class NDXMA50VolumeRSIStrategy(BaseTradingStrategy):
             "operation": operation,
         }
 
+    def generate_signals(self, df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """整段序列：trend_type_series 一次判定趋势，RSI/量能分支按 generate_signal 的顺序以布尔掩码一次选出。"""
+        index = df.index[start:]
+        bars = np.arange(start, len(df)) + 1  # 逐 Bar 调用时的窗口长度
+        insufficient = bars < MIN_BARS
+        if any(col not in df.columns for col in ("ma50", "rsi_14", "volume_ratio")):
+            reason = np.where(insufficient, "insufficient_data", "missing_indicators")
+            return signal_frame(index, "hold", 0.0, reason, trend_type=TREND_TRANSITION, operation="观望")
+
+        trend = trend_type_series(df["close"], df["ma50"], self.config)[start:]
+        trend[insufficient] = TREND_TRANSITION
+        rsi14 = df["rsi_14"].to_numpy(dtype=float)[start:]
+        vol_ratio = df["volume_ratio"].to_numpy(dtype=float)[start:]
+        vol_heavy = self.config.get("vol_ratio_heavy", 1.2)
+        vol_light = self.config.get("vol_ratio_light", 0.8)
+        light = vol_ratio <= vol_light
+        heavy = vol_ratio >= vol_heavy
+        up = (trend == TREND_UP) & ~insufficient
+        down = (trend == TREND_DOWN) & ~insufficient
+        osc = (trend == TREND_OSCILLATE) & ~insufficient
+
+        # (条件, signal, position, reason, operation)，先到先得；与 generate_signal 分支一一对应
+        rules = [
+            (insufficient, "hold", 0.0, "insufficient_data", "观望"),
+            (up & (rsi14 >= 40) & (rsi14 <= 50) & light, "buy", 0.35, "bull_pullback_volume_ok", "加仓30-40%，止损MA50下方2%"),
+            (up & (rsi14 >= 70) & (rsi14 <= 80) & light, "sell", 0.25, "bull_overbought_volume_weak", "轻仓减仓20-30%，不做空"),
+            (up & (rsi14 > 80) & heavy, "hold", 1.0, "bull_overbought_volume_ok", "继续持仓，忽略超买"),
+            (up, "hold", 1.0, "bull_hold", "观望/维持"),
+            (down & (rsi14 >= 50) & (rsi14 <= 60) & heavy, "sell", 0.5, "bear_rally_volume_heavy", "减仓40-50%，不做多"),
+            (down & (rsi14 >= 20) & (rsi14 <= 30) & light, "buy", 0.3, "bear_oversold_volume_light", "轻仓试多30%，止损MA20下方3%"),
+            (down & (rsi14 < 20) & heavy, "hold", 0.0, "bear_oversold_no_bottom", "观望，不抄底"),
+            (down, "hold", 0.0, "bear_hold", "观望"),
+            (osc & (rsi14 >= 65) & (rsi14 <= 70) & heavy, "sell", 0.6, "osc_sell", "减仓30-40%，止盈RSI回50附近"),
+            (osc & (rsi14 >= 30) & (rsi14 <= 35) & light, "buy", 0.35, "osc_buy", "加仓30-40%，止盈RSI回50附近"),
+            (osc, "hold", 0.0, "osc_hold", "观望"),
+        ]
+        conds = [r[0] for r in rules]
+        return signal_frame(
+            index,
+            np.select(conds, [r[1] for r in rules], "hold"),
+            np.select(conds, [r[2] for r in rules], 0.0),
+            np.select(conds, [r[3] for r in rules], "transition"),
+            trend_type=trend,
+            operation=np.select(conds, [r[4] for r in rules], "观望"),
+        )
+
     def calculate_risk(self, signal: Dict[str, Any], data: pd.DataFrame) -> Dict[str, Any]:
         if data.empty:
             return {"stop_loss": 0.0, "take_profit": 0.0}
@@ -1,60 +1,97 @@
 """
 NDX 短线策略：从配置读取 RSI 周期与阈值，调用计算层+信号层+风控层。
+on_bar：逐根 K 线流式推进，指标状态常数时间更新，与 generate_signal 逐窗口结果一致。
+generate_signals：整段序列经信号规则表（signal/rules.py）一次求值，与逐 Bar generate_signal 一致。
 """
+from collections import deque
+from itertools import islice
+
+import numpy as np
 import pandas as pd
-from typing import Any, Dict, Optional
-
-from ndx_rsi.strategy.base import BaseTradingStrategy
-from ndx_rsi.indicators import (
-    calculate_rsi_handwrite,
-    calculate_ma,
-    calculate_ma5,
-    calculate_ma20,
-    calculate_volume_ratio,
-    judge_market_env,
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from ndx_rsi.strategy.base import BaseTradingStrategy, signal_frame
+from ndx_rsi.indicators import judge_market_env
+from ndx_rsi.indicators.pipeline import IndicatorSpec, compute_indicators, indicator
+from ndx_rsi.indicators.market_env import (
+    SLOPE_DOWN,
+    SLOPE_FLAT_HIGH,
+    SLOPE_FLAT_LOW,
+    SLOPE_LOOKBACK,
+    SLOPE_UP,
+    classify_market_env,
+    market_env_series,
+)
+from ndx_rsi.indicators.regression import refine_slope
+from ndx_rsi.indicators.streaming import (
+    RollingSMA,
+    RollingSlope,
+    StreamingRSI,
+    StreamingVolumeRatio,
 )
-from ndx_rsi.signal.combine import generate_signal_dict
+from ndx_rsi.signal.combine import generate_signal_dict, signal_values
+from ndx_rsi.signal.rsi_signals import divergence_series
+from ndx_rsi.signal.rules import generate_signal_series
+from ndx_rsi.signal.trend_volume import TREND_SLOPE_THRESHOLDS, classify_trend, trend_series
 from ndx_rsi.risk.control import (
+    RSI_EXTREME_HIGH,
+    RSI_EXTREME_LOW,
     check_extreme_market,
     apply_position_cap,
+    apply_position_cap_array,
     get_stop_loss_take_profit,
 )
 
 
+# 与 generate_signal 的最少 K 线数、get_trend 的斜率回看一致
+MIN_BARS = 50
+TREND_LOOKBACK = 5
+
+
 class NDXShortTermRSIStrategy(BaseTradingStrategy):
     """纳斯达克100 短线（3–10 天）RSI 策略。"""
 
+    def __init__(self, strategy_config: dict) -> None:
+        super().__init__(strategy_config)
+        self.reset()
+
+    @property
+    def min_bars(self) -> int:
+        return MIN_BARS
+
+    def rsi_periods(self) -> Tuple[int, int]:
+        """(短周期, 长周期)，取自 rsi_params，缺省 9 / 24。"""
+        rsi_params = self.config.get("rsi_params", {})
+        return rsi_params.get("short_period", 9), rsi_params.get("long_period", 24)
+
+    def rsi_columns(self) -> Tuple[str, str]:
+        """RSI 列名按实际周期命名（缺省即 rsi_9 / rsi_24）。"""
+        short_p, long_p = self.rsi_periods()
+        return f"rsi_{short_p}", f"rsi_{long_p}"
+
+    def required_indicators(self) -> List[IndicatorSpec]:
+        (short_p, long_p), (short_col, long_col) = self.rsi_periods(), self.rsi_columns()
+        return [
+            indicator("rsi", column=short_col, period=short_p),
+            indicator("rsi", column=long_col, period=long_p),
+            indicator("sma", column="ma50", window=50),
+            indicator("sma", column="ma5", window=5),
+            indicator("sma", column="ma20", window=20),
+            indicator("volume_ratio", window=20),
+        ]
+
     def generate_signal(
         self, data: pd.DataFrame, current_position_info: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        if data.empty or len(data) < 50:
+        if data.empty or len(data) < MIN_BARS:
             return {"signal": "hold", "position": 0.0, "reason": "insufficient_data"}
 
-        rsi_params = self.config.get("rsi_params", {})
-        short_p = rsi_params.get("short_period", 9)
-        long_p = rsi_params.get("long_period", 24)
-        # 若未预计算则现场算
-        if "rsi_9" not in data.columns:
-            data = data.copy()
-            data["rsi_9"] = calculate_rsi_handwrite(data["close"], short_p)
-            data["rsi_24"] = calculate_rsi_handwrite(data["close"], long_p)
-        if "ma50" not in data.columns:
-            data = data.copy()
-            data["ma50"] = calculate_ma(data["close"], 50)
-        if "ma5" not in data.columns:
-            data = data.copy()
-            data["ma5"] = calculate_ma5(data["close"])
-        if "ma20" not in data.columns:
-            data = data.copy()
-            data["ma20"] = calculate_ma20(data["close"])
-        if "volume_ratio" not in data.columns:
-            data = data.copy()
-            data["volume_ratio"] = calculate_volume_ratio(data["volume"], 20)
-
+        data = self._with_indicators(data)
         prices = data["close"]
         ma50 = data["ma50"]
         market_env = judge_market_env(prices, ma50)
-        rsi_cur = data["rsi_9"].iloc[-1]
+        short_col, long_col = self.rsi_columns()
+        rsi_cur = data[short_col].iloc[-1]
         if check_extreme_market(rsi=rsi_cur):
             return {"signal": "hold", "position": 0.0, "reason": "extreme_market"}
 
@@ -62,11 +99,72 @@ class NDXShortTermRSIStrategy(BaseTradingStrategy):
         divergence_lookback = self.config.get("divergence_lookback", 20)
         sig = generate_signal_dict(
             data, market_env,
+            rsi_short_col=short_col,
+            rsi_long_col=long_col,
             use_divergence=use_divergence,
             divergence_lookback=divergence_lookback,
             current_position_info=current_position_info,
         )
-        pos = sig.get("position", 0.0)
+        return self._apply_position_rules(sig, market_env, rsi_cur)
+
+    def _with_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+        """补齐 required_indicators 中缺失的列（有缺列时返回新 DataFrame，不修改入参）。"""
+        missing = [spec for spec in self.required_indicators() if spec.column not in data.columns]
+        return compute_indicators(data, missing) if missing else data
+
+    def generate_signals(self, df: pd.DataFrame, start: int = 0) -> pd.DataFrame:
+        """
+        整段生成信号：市场环境、趋势、背离按序列计算，规则表一次求值，再整段限仓。
+        与逐 Bar generate_signal 一致（批量模式下持仓信息不含 entry_reason，平仓规则不触发）。
+        """
+        data = self._with_indicators(df)
+        n = len(data)
+        close, ma50 = data["close"], data["ma50"]
+        short_col, long_col = self.rsi_columns()
+        market_env = market_env_series(close, ma50)
+        use_divergence = self.config.get("use_divergence", False)
+        frame = generate_signal_series(
+            data,
+            market_env,
+            trend_series(close, ma50, TREND_LOOKBACK),
+            divergence=(
+                divergence_series(close, data[short_col], self.config.get("divergence_lookback", 20))
+                if use_divergence
+                else None
+            ),
+            use_divergence=use_divergence,
+            rsi_short_col=short_col,
+            rsi_long_col=long_col,
+        )
+        rsi_cur = data[short_col].to_numpy(dtype=float)
+        env = market_env.to_numpy(dtype=object)
+        signal = frame["signal"].to_numpy(dtype=object)
+        reason = frame["reason"].to_numpy(dtype=object)
+        position = self._apply_position_rules_array(frame["position"].to_numpy(dtype=float), env, rsi_cur)
+        # 优先级：数据不足 > 极端行情 > 规则表
+        extreme = (rsi_cur < RSI_EXTREME_LOW) | (rsi_cur > RSI_EXTREME_HIGH)
+        insufficient = np.arange(1, n + 1) < MIN_BARS
+        for mask, why in ((extreme, "extreme_market"), (insufficient, "insufficient_data")):
+            signal[mask] = "hold"
+            position[mask] = 0.0
+            reason[mask] = why
+        return signal_frame(data.index[start:], signal[start:], position[start:], reason[start:])
+
+    def _apply_position_rules_array(self, position: np.ndarray, market_env: np.ndarray, rsi_cur: np.ndarray) -> np.ndarray:
+        """_apply_position_rules 的整段版本。"""
+        pos = apply_position_cap_array(position, market_env, rsi_cur, self.config.get("dynamic_cap") or {})
+        if self.config.get("long_only", False):
+            pos[pos < 0] = 0.0
+        elif self.config.get("no_short_in_bull", False):
+            pos[(pos < 0) & (market_env == "bull")] = 0.0
+        return pos
+
+    def _apply_position_rules(self, sig: Dict[str, Any], market_env: str, rsi_cur: float) -> Dict[str, Any]:
+        """按市场环境限仓，并按 long_only / no_short_in_bull 处理负仓位。"""
+        sig["position"] = self._capped_position(sig.get("position", 0.0), market_env, rsi_cur)
+        return sig
+
+    def _capped_position(self, pos: float, market_env: str, rsi_cur: float) -> float:
         dynamic_cap = self.config.get("dynamic_cap") or {}
         pos = apply_position_cap(
             pos, market_env,
@@ -81,8 +179,107 @@ class NDXShortTermRSIStrategy(BaseTradingStrategy):
                 pos = 0.0
             elif no_short_in_bull and market_env == "bull":
                 pos = 0.0
-        sig["position"] = pos
-        return sig
+        return pos
+
+    def reset(self) -> None:
+        """清空 on_bar 的流式状态（重新从第一根 K 线开始推进时调用）。"""
+        short_p, long_p = self.rsi_periods()
+        lookback = self.config.get("divergence_lookback", 20)
+        n = min(5, lookback // 3)
+        self._bars = 0
+        self._rsi_short = StreamingRSI(short_p)
+        self._rsi_long = StreamingRSI(long_p)
+        self._ma50 = RollingSMA(50)
+        self._ma5 = RollingSMA(5)
+        self._volume_ratio = StreamingVolumeRatio(20)
+        self._env_slope = RollingSlope(SLOPE_LOOKBACK)
+        self._trend_slope = RollingSlope(TREND_LOOKBACK)
+        # 上一根 K 线的值（常数时间更新，不逐 Bar 分配）
+        self._prev_close = self._prev_ma50 = self._prev_rsi_s = self._prev_rsi_l = np.nan
+        # 背离：最近 2n 根收盘价与短周期 RSI
+        self._div_n = n
+        self._div_close: deque = deque(maxlen=max(2 * n, 1))
+        self._div_rsi: deque = deque(maxlen=max(2 * n, 1))
+        # on_bar 的返回值：每根原地改写同一个 dict
+        self._result: Dict[str, Any] = {"signal": "hold", "position": 0.0, "reason": "insufficient_data", "ts": ""}
+
+    def on_bar(
+        self, bar: Mapping[str, Any], current_position_info: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        流式推进一根 K 线并返回该 Bar 的信号（与对截至该 Bar 的窗口调用 generate_signal 一致）。
+        bar 至少含 close、volume；时间戳取 bar.name（pd.Series 行）或 bar["ts"]。
+        返回的 dict 为策略内部复用对象，下一次 on_bar 会原地改写；需保留时请 dict(...) 复制。
+        """
+        close = float(bar["close"])
+        self._bars += 1
+        rsi_s = self._rsi_short.update(close)
+        rsi_l = self._rsi_long.update(close)
+        ma50 = self._ma50.update(close)
+        ma5 = self._ma5.update(close)
+        vol_ratio = self._volume_ratio.update(float(bar["volume"]))
+        env_slope = self._env_slope.update(ma50)
+        trend_slope = self._trend_slope.update(ma50)
+        self._div_close.append(close)
+        self._div_rsi.append(rsi_s)
+        prev_close, prev_ma50, prev_rsi_s, prev_rsi_l = self._prev_close, self._prev_ma50, self._prev_rsi_s, self._prev_rsi_l
+        self._prev_close, self._prev_ma50, self._prev_rsi_s, self._prev_rsi_l = close, ma50, rsi_s, rsi_l
+
+        out = self._result
+        out["ts"] = str(bar.name if isinstance(bar, pd.Series) else bar.get("ts", ""))
+        if self._bars < MIN_BARS:
+            return self._set_result("hold", 0.0, "insufficient_data")
+        market_env = "transition"
+        scale = ma50 + 1e-10
+        if self._bars >= SLOPE_LOOKBACK:
+            # 阈值附近按 polyfit 重算，与 generate_signal / market_env_series 的判定逐位一致
+            env_slope = refine_slope(
+                env_slope, self._env_slope.samples, scale, (SLOPE_UP, SLOPE_DOWN, SLOPE_FLAT_LOW, SLOPE_FLAT_HIGH)
+            )
+            market_env = classify_market_env(env_slope, prev_close, close, prev_ma50, ma50)
+        if check_extreme_market(rsi=rsi_s):
+            return self._set_result("hold", 0.0, "extreme_market")
+
+        use_divergence = self.config.get("use_divergence", False)
+        divergence = None
+        if use_divergence and self._bars >= self.config.get("divergence_lookback", 20):
+            divergence = self._divergence()
+        trend_slope = refine_slope(trend_slope, self._trend_slope.samples, scale, TREND_SLOPE_THRESHOLDS)
+        signal, position, reason = signal_values(
+            close=close,
+            rsi_s=rsi_s,
+            rsi_l=rsi_l,
+            prev_rsi_s=prev_rsi_s,
+            prev_rsi_l=prev_rsi_l,
+            vol_ratio=vol_ratio,
+            ma5=ma5,
+            trend=classify_trend(trend_slope, prev_close, close, prev_ma50, ma50),
+            market_env=market_env,
+            divergence=divergence,
+            use_divergence=use_divergence,
+            current_position_info=current_position_info,
+        )
+        return self._set_result(signal, self._capped_position(position, market_env, rsi_s), reason)
+
+    def _set_result(self, signal: str, position: float, reason: str) -> Dict[str, Any]:
+        out = self._result
+        out["signal"], out["position"], out["reason"] = signal, position, reason
+        return out
+
+    def _divergence(self) -> Optional[str]:
+        """
+        与 check_divergence 一致：最近 n 根 vs 前 n 根的价格/RSI 高低点比较。
+        窗口已满 2n 根（调用方保证 Bar 数 ≥ divergence_lookback），前半/后半用 islice 直接遍历 deque，不复制。
+        """
+        n = self._div_n
+        if n < 2:
+            return None
+        closes, rsis = self._div_close, self._div_rsi
+        if max(islice(closes, n, None)) > max(islice(closes, n)) and max(islice(rsis, n, None)) < max(islice(rsis, n)):
+            return "bearish_divergence"
+        if min(islice(closes, n, None)) < min(islice(closes, n)) and min(islice(rsis, n, None)) > min(islice(rsis, n)):
+            return "bullish_divergence"
+        return None
 
     def calculate_risk(self, signal: Dict[str, Any], data: pd.DataFrame) -> Dict[str, Any]:
         if data.empty:
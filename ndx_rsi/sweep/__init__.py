@@ -0,0 +1,4 @@
+"""参数扫描：一次拉取数据放入共享内存，多进程并行回测参数网格，结果汇总为一张表（支持断点续跑）。"""
+from ndx_rsi.sweep.runner import expand_grid, parse_grid_values, run_sweep
+
+__all__ = ["expand_grid", "parse_grid_values", "run_sweep"]
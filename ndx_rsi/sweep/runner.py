@@ -0,0 +1,284 @@
+"""
+参数扫描：网格展开 → 拉取一次 OHLCV → 写入共享内存 → 进程池并行 run_backtest → 汇总指标表。
+- 共享内存：索引（int64 纳秒）与 open/high/low/close/volume（float64）放在同一块 SharedMemory，
+  worker 启动时按描述符挂载一次，每个任务只传参数 dict，不再序列化/下载行情。
+- 断点续跑：每完成一组参数即追加写入 results_path（CSV，含 params_key 列）；重跑时跳过已完成的组合。
+- 指标缓存：每个 worker 内的指标缓存跨任务复用，结果行记录本组参数的缓存命中/未命中次数。
+- 批量 EMA：各组合声明的 EMA 周期去重后用 ema_matrix 一次算成矩阵（与 ewm 逐位一致），放入共享内存；
+  worker 启动时预置进指标缓存，各组合不再逐个周期重算。
+"""
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+# 结果表中保留的策略指标（result["strategy"]）
+METRIC_COLUMNS = ["total_return", "max_drawdown", "sharpe_ratio", "win_rate", "total_trades", "profit_factor"]
+# 每组参数的指标缓存命中/未命中次数
+CACHE_COLUMNS = ["indicator_cache_hits", "indicator_cache_misses"]
+
+# worker 进程内挂载的共享行情
+_WORKER: Dict[str, Any] = {}
+
+
+def parse_grid_values(text: str) -> List[Any]:
+    """解析 CLI 的逗号分隔取值："60,80" → [60, 80]；依次尝试 int、float、bool，否则保留字符串。"""
+    values: List[Any] = []
+    for item in (t.strip() for t in text.split(",")):
+        if not item:
+            continue
+        for cast in (int, float):
+            try:
+                values.append(cast(item))
+                break
+            except ValueError:
+                continue
+        else:
+            lowered = item.lower()
+            values.append(lowered == "true" if lowered in ("true", "false") else item)
+    return values
+
+
+def expand_grid(grid: Dict[str, Iterable[Any]]) -> List[Dict[str, Any]]:
+    """{"ema_fast": [60, 80], "vol_threshold": [0.02]} → 参数组合列表（笛卡尔积，按 key 顺序）。"""
+    keys = list(grid)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(list(grid[k]) for k in keys))]
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    """参数组合的稳定键，用于断点续跑去重。"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def _share_ohlcv(raw: pd.DataFrame) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+    """将 OHLCV 写入一块共享内存，返回 (shm, 描述符)；描述符可跨进程传递。"""
+    n = len(raw)
+    index = pd.DatetimeIndex(raw.index)
+    tz = index.tz
+    # 带时区的索引按 UTC 存储，挂载时再转回原时区
+    stamps = (index.tz_convert("UTC").tz_localize(None) if tz is not None else index).to_numpy()
+    shm = shared_memory.SharedMemory(create=True, size=max(n * 8 * (1 + len(OHLCV_COLUMNS)), 1))
+    idx_view = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    val_view = np.ndarray((n, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    idx_view[:] = stamps.view(np.int64)
+    val_view[:] = raw[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+    desc = {
+        "name": shm.name,
+        "rows": n,
+        "tz": str(tz) if tz is not None else None,
+        "unit": np.datetime_data(stamps.dtype)[0],
+    }
+    return shm, desc
+
+
+def _attach_ohlcv(desc: Dict[str, Any]) -> Tuple[shared_memory.SharedMemory, pd.DataFrame]:
+    """按描述符挂载共享内存并构造 DataFrame（数值列为共享内存上的只读视图）。"""
+    shm = shared_memory.SharedMemory(name=desc["name"])
+    n = desc["rows"]
+    idx_view = np.ndarray((n,), dtype=np.int64, buffer=shm.buf)
+    val_view = np.ndarray((n, len(OHLCV_COLUMNS)), dtype=np.float64, buffer=shm.buf, offset=n * 8)
+    val_view.flags.writeable = False
+    index = pd.DatetimeIndex(idx_view.view(f"datetime64[{desc['unit']}]"))
+    if desc["tz"]:
+        index = index.tz_localize("UTC").tz_convert(desc["tz"])
+    return shm, pd.DataFrame(val_view, index=index, columns=OHLCV_COLUMNS, copy=False)
+
+
+def _sweep_ema_params(strategy_name: str, combos: List[Dict[str, Any]]) -> List[Any]:
+    """各组合声明的 EMA 指标参数（去重、按周期排序）；不足 2 个不同周期时不值得批量计算。"""
+    from ndx_rsi.config_loader import get_strategy_config, merge_config
+    from ndx_rsi.strategy.factory import create_strategy
+
+    base = get_strategy_config(strategy_name) or {}
+    params = {
+        spec.params
+        for combo in combos
+        for spec in create_strategy(strategy_name, merge_config(base, combo)).required_indicators()
+        if spec.kind == "ema"
+    }
+    return sorted(params, key=lambda p: dict(p)["span"]) if len(params) >= 2 else []
+
+
+def _share_ema_matrix(raw: pd.DataFrame, ema_params: List[Any]) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+    """在预处理后的收盘价上批量计算 EMA 矩阵，直接写入共享内存。"""
+    from ndx_rsi.data import preprocess_ohlcv
+    from ndx_rsi.indicators.batch import ema_matrix
+
+    df, _ = preprocess_ohlcv(raw)
+    n, k = len(df), len(ema_params)
+    shm = shared_memory.SharedMemory(create=True, size=max(n * k * 8, 1))
+    matrix = np.ndarray((n, k), dtype=np.float64, buffer=shm.buf)
+    ema_matrix(df["close"].to_numpy(dtype=np.float64), [dict(p)["span"] for p in ema_params], out=matrix)
+    return shm, {"name": shm.name, "rows": n, "params": ema_params}
+
+
+def _seed_ema_cache(desc: Dict[str, Any]) -> None:
+    """把共享内存中的 EMA 矩阵按 (行情哈希, "ema", 参数) 预置进本进程的指标缓存。"""
+    from ndx_rsi.data import preprocess_ohlcv
+    from ndx_rsi.indicators import get_indicator_cache, hash_ohlcv
+
+    cache = get_indicator_cache()
+    if cache is None:
+        return
+    shm = shared_memory.SharedMemory(name=desc["name"])
+    matrix = np.ndarray((desc["rows"], len(desc["params"])), dtype=np.float64, buffer=shm.buf)
+    matrix.flags.writeable = False
+    df, _ = preprocess_ohlcv(_WORKER["data"])
+    data_hash = hash_ohlcv(df)
+    for j, params in enumerate(desc["params"]):
+        cache.seed(cache.make_key(data_hash, "ema", params), pd.Series(matrix[:, j], index=df.index, copy=False))
+    _WORKER["ema_shm"] = shm
+
+
+def _init_worker(desc: Dict[str, Any], job: Dict[str, Any], ema_desc: Optional[Dict[str, Any]] = None) -> None:
+    shm, df = _attach_ohlcv(desc)
+    _WORKER.update(shm=shm, data=df, job=job)
+    if ema_desc is not None:
+        _seed_ema_cache(ema_desc)
+
+
+def _run_one(params: Dict[str, Any]) -> Dict[str, Any]:
+    """worker 内执行一组参数的回测，返回一行结果。"""
+    from ndx_rsi.backtest.runner import run_backtest
+    from ndx_rsi.indicators import get_indicator_cache
+
+    job = _WORKER["job"]
+    cache = get_indicator_cache()
+    hits0, misses0 = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    t0 = time.perf_counter()
+    result = run_backtest(
+        strategy_name=job["strategy_name"],
+        symbol=job["symbol"],
+        start_date=job["start_date"],
+        end_date=job["end_date"],
+        engine=job["engine"],
+        data=_WORKER["data"],
+        strategy_config=params,
+        backtest_config=job["backtest_config"],
+        use_store=False,
+    )
+    row: Dict[str, Any] = dict(params)
+    row["params_key"] = params_key(params)
+    if "error" in result:
+        row["error"] = result["error"]
+    else:
+        for col in METRIC_COLUMNS:
+            row[col] = result["strategy"][col]
+        row["benchmark_total_return"] = result["benchmark"]["total_return"]
+    if cache is not None:
+        row["indicator_cache_hits"] = cache.hits - hits0
+        row["indicator_cache_misses"] = cache.misses - misses0
+    row["elapsed_sec"] = round(time.perf_counter() - t0, 4)
+    return row
+
+
+def _load_done(results_path: Optional[Path]) -> pd.DataFrame:
+    if results_path is None or not results_path.exists() or results_path.stat().st_size == 0:
+        return pd.DataFrame()
+    return pd.read_csv(results_path)
+
+
+def _append_row(results_path: Path, row: Dict[str, Any], columns: List[str]) -> None:
+    """追加一行并立即落盘，进程崩溃后已完成的组合不会丢失。"""
+    is_new = not results_path.exists() or results_path.stat().st_size == 0
+    pd.DataFrame([row]).reindex(columns=columns).to_csv(results_path, mode="a", header=is_new, index=False)
+
+
+def _print_progress(done: int, total: int, row: Dict[str, Any], started: float) -> None:
+    elapsed = time.perf_counter() - started
+    eta = elapsed / done * (total - done) if done else 0.0
+    metric = row.get("total_return", row.get("error"))
+    print(f"[sweep {done}/{total}] {row['params_key']} -> {metric}  (elapsed {elapsed:.1f}s, eta {eta:.1f}s)", file=sys.stderr)
+
+
+def run_sweep(
+    strategy_name: str,
+    grid: Dict[str, Iterable[Any]],
+    symbol: str = "QQQ",
+    start_date: str = "2003-01-01",
+    end_date: Optional[str] = None,
+    workers: Optional[int] = None,
+    results_path: Optional[str] = None,
+    engine: str = "vectorized",
+    backtest_config: Optional[Dict[str, Any]] = None,
+    data: Optional[pd.DataFrame] = None,
+    progress: Optional[Callable[[int, int, Dict[str, Any], float], None]] = _print_progress,
+) -> pd.DataFrame:
+    """
+    对 grid 的全部参数组合并行回测，返回结果表（每组参数一行：参数列 + 策略指标 + benchmark_total_return）。
+    workers 默认等于 CPU 核数；results_path 存在时跳过其中已完成的组合（断点续跑）。
+    data 为空时按 symbol 拉取一次行情。
+    """
+    import datetime as dt
+
+    if end_date is None:
+        end_date = dt.date.today().isoformat()
+    combos = expand_grid(grid)
+    path = Path(results_path) if results_path else None
+    done_df = _load_done(path)
+    done_keys = set(done_df["params_key"]) if "params_key" in done_df.columns else set()
+    todo = [p for p in combos if params_key(p) not in done_keys]
+    columns = (
+        list(grid) + ["params_key"] + METRIC_COLUMNS + ["benchmark_total_return", "error"] + CACHE_COLUMNS + ["elapsed_sec"]
+    )
+    if path is not None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    rows: List[Dict[str, Any]] = []
+    if todo:
+        if data is None:
+            from ndx_rsi.config_loader import get_datasource_config
+            from ndx_rsi.data import create_data_source
+
+            config = get_datasource_config(symbol) or {"code": symbol}
+            data = create_data_source(symbol, config).get_historical_data(start_date, end_date, "1d")
+        job = {
+            "strategy_name": strategy_name,
+            "symbol": symbol,
+            "start_date": start_date,
+            "end_date": end_date,
+            "engine": engine,
+            "backtest_config": backtest_config,
+        }
+        from ndx_rsi.indicators import get_indicator_cache
+
+        shm, desc = _share_ohlcv(data)
+        ema_params = _sweep_ema_params(strategy_name, todo) if get_indicator_cache() is not None else []
+        ema_shm, ema_desc = _share_ema_matrix(data, ema_params) if ema_params else (None, None)
+        started = time.perf_counter()
+        try:
+            n_workers = min(workers or os.cpu_count() or 1, len(todo))
+            with ProcessPoolExecutor(
+                max_workers=n_workers, initializer=_init_worker, initargs=(desc, job, ema_desc)
+            ) as pool:
+                futures = [pool.submit(_run_one, p) for p in todo]
+                for fut in as_completed(futures):
+                    row = fut.result()
+                    rows.append(row)
+                    if path is not None:
+                        _append_row(path, row, columns)
+                    if progress is not None:
+                        progress(len(rows), len(todo), row, started)
+        finally:
+            for block in (shm, ema_shm):
+                if block is not None:
+                    block.close()
+                    block.unlink()
+
+    out = pd.concat([done_df, pd.DataFrame(rows)], ignore_index=True) if len(done_df) else pd.DataFrame(rows)
+    if out.empty:
+        return pd.DataFrame(columns=columns)
+    # 按网格原始顺序输出
+    order = {params_key(p): k for k, p in enumerate(combos)}
+    out = out[out["params_key"].isin(order)]
+    out = out.assign(_order=out["params_key"].map(order)).sort_values("_order").drop(columns="_order")
+    return out.reindex(columns=[c for c in columns if c in out.columns]).reset_index(drop=True)
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 v6: 生成静态页用 JSON：timeseries.json（5 年 QQQ 走势）、signal.json（最近一次信号）。
-从项目根运行: PYTHONPATH=. python scripts/generate_static_data.py [--out-dir web]
+从项目根运行: PYTHONPATH=. python scripts/generate_static_data.py [--out-dir web] [--profile PATH] [--metrics-textfile PATH]
 """
 import argparse
 import json
@@ -13,6 +13,8 @@ _ROOT = Path(__file__).resolve().parent.parent
 if str(_ROOT) not in sys.path:
     sys.path.insert(0, str(_ROOT))
 
+from ndx_rsi import profiling  # noqa: E402
+
 
 def _write_json(path: Path, data: dict) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
@@ -23,14 +25,16 @@ def _write_json(path: Path, data: dict) -> None:
 def generate_timeseries(symbol: str, years: int, out_dir: Path) -> None:
     """拉取近 years 年日线 close，写入 out_dir/timeseries.json。"""
     from ndx_rsi.config_loader import get_datasource_config
-    from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
+    from ndx_rsi.data import create_data_source, preprocess_ohlcv
 
     end = date.today()
     start = end - timedelta(days=years * 365)
     config = get_datasource_config(symbol) or {"code": symbol}
-    ds = YFinanceDataSource(symbol, config)
-    df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
-    df, _ = preprocess_ohlcv(df)
+    ds = create_data_source(symbol, config)
+    with profiling.timer("data.fetch"):
+        df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
+    with profiling.timer("data.preprocess"):
+        df, _ = preprocess_ohlcv(df)
     if df.empty:
         _write_json(out_dir / "timeseries.json", {"symbol": symbol, "from": start.isoformat(), "to": end.isoformat(), "series": []})
         return
@@ -49,61 +53,29 @@ def generate_timeseries(symbol: str, years: int, out_dir: Path) -> None:
 def generate_signal(symbol: str, strategy_name: str, out_dir: Path) -> None:
     """跑一次 signal，将结果写入 out_dir/signal.json。"""
     from ndx_rsi.config_loader import get_datasource_config, get_strategy_config
-    from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
+    from ndx_rsi.data import create_data_source, preprocess_ohlcv
     from ndx_rsi.report import signal_report_to_dict
     from ndx_rsi.strategy.factory import create_strategy
-    from ndx_rsi.indicators import calculate_ma, calculate_adx, calculate_macd
+    from ndx_rsi.indicators import IndicatorPipeline
 
     config = get_datasource_config(symbol) or {"code": symbol}
-    ds = YFinanceDataSource(symbol, config)
+    ds = create_data_source(symbol, config)
     end = date.today()
     start = end - timedelta(days=400)
-    df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
-    df, _ = preprocess_ohlcv(df)
+    with profiling.timer("data.fetch"):
+        df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
+    with profiling.timer("data.preprocess"):
+        df, _ = preprocess_ohlcv(df)
     sc = get_strategy_config(strategy_name) or {}
-    if strategy_name == "EMA_trend_v2":
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        min_bars = max(50, ema_slow)
-        if df.empty or len(df) < min_bars:
-            _write_json(out_dir / "signal.json", {"error": "insufficient_data"})
-            return
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-    elif strategy_name == "EMA_trend_v3":
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        adx_period = sc.get("adx_period", 14)
-        macd_fast = sc.get("macd_fast", 12)
-        macd_slow = sc.get("macd_slow", 26)
-        macd_signal = sc.get("macd_signal", 9)
-        min_bars = 200
-        if df.empty or len(df) < min_bars:
-            _write_json(out_dir / "signal.json", {"error": "insufficient_data"})
-            return
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-        df["sma_200"] = calculate_ma(df["close"], 200)
-        df["adx_" + str(adx_period)] = calculate_adx(
-            df["high"], df["low"], df["close"], period=adx_period
-        )
-        macd_line, _, _ = calculate_macd(
-            df["close"], fast=macd_fast, slow=macd_slow, signal=macd_signal
-        )
-        df["macd_line"] = macd_line
-    else:
-        if df.empty or len(df) < 50:
-            _write_json(out_dir / "signal.json", {"error": "insufficient_data"})
-            return
     strategy = create_strategy(strategy_name)
-    sig = strategy.generate_signal(df)
-    risk = strategy.calculate_risk(sig, df)
+    if df.empty or len(df) < strategy.min_bars:
+        _write_json(out_dir / "signal.json", {"error": "insufficient_data"})
+        return
+    with profiling.timer("indicators"):
+        df = IndicatorPipeline(strategy.required_indicators()).run(df)
+    with profiling.timer("signals"):
+        sig = strategy.generate_signal(df)
+        risk = strategy.calculate_risk(sig, df)
     payload = signal_report_to_dict(strategy_name, symbol, df, sig, risk, sc)
     if payload:
         _write_json(out_dir / "signal.json", payload)
@@ -117,10 +89,16 @@ def main() -> int:
     parser.add_argument("--strategy", default="EMA_trend_v2", help="Strategy name")
     parser.add_argument("--years", type=int, default=5, help="Years of history for timeseries")
     parser.add_argument("--out-dir", type=Path, default=_ROOT / "web", help="Output directory")
+    parser.add_argument("--profile", metavar="PATH", default=None, help="Write per-stage timing JSON")
+    parser.add_argument("--metrics-textfile", metavar="PATH", default=None, help="Write a node-exporter textfile")
     args = parser.parse_args()
     out_dir = args.out_dir.resolve()
-    generate_timeseries(args.symbol, args.years, out_dir)
-    generate_signal(args.symbol, args.strategy, out_dir)
+    labels = {"symbol": args.symbol, "strategy": args.strategy}
+    with profiling.profile_run("script.generate_static_data", args.profile, args.metrics_textfile, labels):
+        with profiling.timer("static.timeseries"):
+            generate_timeseries(args.symbol, args.years, out_dir)
+        with profiling.timer("static.signal"):
+            generate_signal(args.symbol, args.strategy, out_dir)
     print(f"Generated {out_dir / 'timeseries.json'} and {out_dir / 'signal.json'}", file=sys.stderr)
     return 0
 
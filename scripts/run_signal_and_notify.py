@@ -2,11 +2,14 @@
 """
 v6: 跑信号并将报告推送到邮件、钉钉（CUSTOM_WEBHOOK_URLS）。
 从项目根运行: PYTHONPATH=. python scripts/run_signal_and_notify.py
-环境变量: EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_RECEIVERS; CUSTOM_WEBHOOK_URLS（逗号分隔）; 可选 SYMBOL, STRATEGY.
+环境变量: EMAIL_SENDER, EMAIL_PASSWORD, EMAIL_RECEIVERS; CUSTOM_WEBHOOK_URLS（逗号分隔）; 可选 SYMBOL, STRATEGY,
+SIGNAL_STATE（增量指标状态文件路径，同 run_signal --state）; NDX_RSI_PROFILE / NDX_RSI_METRICS_TEXTFILE（运行埋点输出，
+同 cli_main --profile / --metrics-textfile）.
 """
 import os
 import sys
 from pathlib import Path
+from typing import Optional
 
 # 保证项目根在 path 中，便于 import ndx_rsi
 _ROOT = Path(__file__).resolve().parent.parent
@@ -14,104 +17,26 @@ if str(_ROOT) not in sys.path:
     sys.path.insert(0, str(_ROOT))
 
 
-def _get_report(symbol: str, strategy_name: str) -> str:
+def _get_report(symbol: str, strategy_name: str, state_path: Optional[str] = None) -> str:
     """执行 run_signal 逻辑并返回报告文本（不打印）。"""
-    from ndx_rsi.config_loader import get_datasource_config, get_strategy_config
-    from ndx_rsi.data import YFinanceDataSource, preprocess_ohlcv
+    from ndx_rsi import profiling
+    from ndx_rsi.cli_main import load_signal_frame
+    from ndx_rsi.config_loader import get_strategy_config
     from ndx_rsi.report import format_signal_report
-    from ndx_rsi.indicators import (
-        calculate_ma,
-        calculate_rsi_handwrite,
-        calculate_volume_ratio,
-        calculate_adx,
-        calculate_macd,
-    )
     from ndx_rsi.strategy.factory import create_strategy
 
-    config = get_datasource_config(symbol) or {"code": symbol}
-    ds = YFinanceDataSource(symbol, config)
-    if strategy_name in ("EMA_cross_v1", "EMA_trend_v2", "EMA_trend_v3"):
-        import datetime
-        end = datetime.date.today()
-        start = end - datetime.timedelta(days=400)
-        df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
-    elif strategy_name == "NDX_MA50_Volume_RSI":
-        import datetime
-        end = datetime.date.today()
-        start = end - datetime.timedelta(days=120)
-        df = ds.get_historical_data(start.isoformat(), end.isoformat(), "1d")
-    else:
-        df = ds.get_realtime_data()
-    df, _ = preprocess_ohlcv(df)
-
-    if strategy_name == "EMA_cross_v1":
-        sc = get_strategy_config(strategy_name) or {}
-        short_ema = sc.get("short_ema", 50)
-        long_ema = sc.get("long_ema", 200)
-        min_bars = max(50, long_ema)
-        if df.empty or len(df) < min_bars:
-            return f"【无数据】需要至少 {min_bars} 根 K 线。"
-        df["ema_" + str(short_ema)] = df["close"].ewm(span=short_ema, adjust=False).mean()
-        df["ema_" + str(long_ema)] = df["close"].ewm(span=long_ema, adjust=False).mean()
-    elif strategy_name == "EMA_trend_v2":
-        sc = get_strategy_config(strategy_name) or {}
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        min_bars = max(50, ema_slow)
-        if df.empty or len(df) < min_bars:
-            return f"【无数据】需要至少 {min_bars} 根 K 线。"
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-    elif strategy_name == "EMA_trend_v3":
-        sc = get_strategy_config(strategy_name) or {}
-        ema_fast = sc.get("ema_fast", 80)
-        ema_slow = sc.get("ema_slow", 200)
-        vol_window = sc.get("vol_window", 20)
-        adx_period = sc.get("adx_period", 14)
-        macd_fast = sc.get("macd_fast", 12)
-        macd_slow = sc.get("macd_slow", 26)
-        macd_signal = sc.get("macd_signal", 9)
-        min_bars = 200
-        if df.empty or len(df) < min_bars:
-            return f"【无数据】需要至少 {min_bars} 根 K 线。"
-        df["ema_" + str(ema_fast)] = df["close"].ewm(span=ema_fast, adjust=False).mean()
-        df["ema_" + str(ema_slow)] = df["close"].ewm(span=ema_slow, adjust=False).mean()
-        df["daily_return"] = df["close"].pct_change()
-        df["vol_" + str(vol_window)] = df["daily_return"].rolling(vol_window).std()
-        df["sma_200"] = calculate_ma(df["close"], 200)
-        df["adx_" + str(adx_period)] = calculate_adx(
-            df["high"], df["low"], df["close"], period=adx_period
-        )
-        macd_line, _, _ = calculate_macd(
-            df["close"], fast=macd_fast, slow=macd_slow, signal=macd_signal
-        )
-        df["macd_line"] = macd_line
-    elif strategy_name == "NDX_MA50_Volume_RSI":
-        min_bars = 60
-        if df.empty or len(df) < min_bars:
-            return f"【无数据】需要至少 {min_bars} 根 K 线。"
-        df["ma50"] = calculate_ma(df["close"], 50)
-        df["ma20"] = calculate_ma(df["close"], 20)
-        df["rsi_14"] = calculate_rsi_handwrite(df["close"], 14)
-        df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
-    else:
-        if df.empty or len(df) < 50:
-            return "【无数据】K 线不足。"
-        df["ma50"] = calculate_ma(df["close"], 50)
-        df["rsi_9"] = calculate_rsi_handwrite(df["close"], 9)
-        df["rsi_24"] = calculate_rsi_handwrite(df["close"], 24)
-        df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
-
     strategy = create_strategy(strategy_name)
-    sig = strategy.generate_signal(df)
-    risk = strategy.calculate_risk(sig, df)
-    return format_signal_report(
-        strategy_name, symbol, df, sig, risk,
-        get_strategy_config(strategy_name),
-    )
+    df = load_signal_frame(symbol, strategy_name, strategy, state_path)
+    if df.empty or len(df) < strategy.min_bars:
+        return f"【无数据】需要至少 {strategy.min_bars} 根 K 线。"
+    with profiling.timer("signals"):
+        sig = strategy.generate_signal(df)
+        risk = strategy.calculate_risk(sig, df)
+    with profiling.timer("report"):
+        return format_signal_report(
+            strategy_name, symbol, df, sig, risk,
+            get_strategy_config(strategy_name),
+        )
 
 
 def _send_email(report: str, symbol: str = "QQQ") -> bool:
@@ -184,14 +109,23 @@ def _send_webhooks(report: str) -> int:
 
 
 if __name__ == "__main__":
+    from ndx_rsi import profiling
+
     symbol = os.environ.get("SYMBOL", "QQQ").strip()
     strategy_name = os.environ.get("STRATEGY", "EMA_trend_v2").strip()
 
-    report = _get_report(symbol, strategy_name)
-    print(report)
+    state_path = os.environ.get("SIGNAL_STATE", "").strip() or None
+
+    with profiling.profile_run("script.run_signal_and_notify", labels={"symbol": symbol, "strategy": strategy_name}):
+        report = _get_report(symbol, strategy_name, state_path)
+        print(report)
 
-    sent_email = _send_email(report, symbol=symbol)
-    sent_webhooks = _send_webhooks(report)
+        with profiling.timer("notify.email"):
+            sent_email = _send_email(report, symbol=symbol)
+        with profiling.timer("notify.webhooks"):
+            sent_webhooks = _send_webhooks(report)
+        profiling.count("notify.email_sent", int(sent_email))
+        profiling.count("notify.webhooks_sent", sent_webhooks)
     if sent_email or sent_webhooks:
         print(f"Notify: email={sent_email}, webhooks={sent_webhooks}", file=sys.stderr)
     else:
@@ -0,0 +1,14 @@
+"""测试不读写本地回测结果库（data_cache/results.sqlite）。"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from ndx_rsi.backtest import store
+
+
+@pytest.fixture(autouse=True)
+def _no_result_store(monkeypatch):
+    monkeypatch.setitem(store._DEFAULT, "store", None)
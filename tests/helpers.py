@@ -0,0 +1,16 @@
+"""测试与基准共用的参考实现。"""
+import numpy as np
+import pandas as pd
+
+
+def wilder_smooth_loop(series: pd.Series, period: int) -> pd.Series:
+    """原逐元素循环实现（iloc 读写），作为向量化 wilder_smooth 的对照与基准基线。"""
+    out = pd.Series(index=series.index, dtype=float)
+    arr = series.values
+    if len(arr) < period:
+        return out
+    out.iloc[period - 1] = np.nanmean(arr[:period])
+    for i in range(period, len(arr)):
+        prev = out.iloc[i - 1]
+        out.iloc[i] = np.nan if pd.isna(prev) else (prev * (period - 1) + arr[i]) / period
+    return out
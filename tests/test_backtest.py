@@ -0,0 +1,261 @@
+"""回测引擎：vectorized 与 loop 在次日执行分支下结果一致。"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ndx_rsi.backtest.runner as runner
+from ndx_rsi.backtest import run_backtest
+
+
+def _synthetic_ohlcv(n: int = 900, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    open_ = np.r_[close[0], close[:-1]]
+    volume = rng.uniform(5e6, 2e7, n)
+    idx = pd.bdate_range("2015-01-01", periods=n)
+    return pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": volume}, index=idx
+    )
+
+
+@pytest.fixture
+def patched_runner(monkeypatch):
+    raw = _synthetic_ohlcv()
+
+    class _FakeSource:
+        def __init__(self, symbol, config):
+            pass
+
+        def get_historical_data(self, start_date, end_date, frequency="1d"):
+            return raw.copy()
+
+    def _bt_config():
+        return {
+            "use_stop_loss_take_profit": False,
+            "next_day_execution": True,
+            "use_ma50_exit": False,
+            "circuit_breaker": {"enabled": False},
+            "metrics": {"risk_free_rate": 0.02, "accrue_risk_free_when_flat": True},
+            "commission": 0.0005,
+        }
+
+    monkeypatch.setattr(runner, "create_data_source", _FakeSource)
+    monkeypatch.setattr(runner, "get_backtest_config", _bt_config)
+    return raw
+
+
+@pytest.mark.parametrize("strategy_name", ["EMA_trend_v2", "EMA_trend_v3", "NDX_MA50_Volume_RSI"])
+def test_vectorized_engine_matches_loop(patched_runner, strategy_name):
+    kwargs = dict(strategy_name=strategy_name, start_date="2015-01-01", end_date="2018-06-30", return_series=True)
+    res_loop, series_loop = run_backtest(engine="loop", **kwargs)
+    res_vec, series_vec = run_backtest(engine="vectorized", **kwargs)
+    assert res_vec == res_loop
+    pd.testing.assert_frame_equal(series_vec, series_loop)
+
+
+def test_unknown_engine_raises(patched_runner):
+    with pytest.raises(ValueError):
+        run_backtest(engine="numba")
+
+
+def test_portfolio_single_leg_matches_vectorized_engine(patched_runner):
+    from ndx_rsi.backtest import run_portfolio_backtest
+
+    _, series = run_backtest(
+        "EMA_trend_v2", start_date="2015-01-01", end_date="2018-06-30", engine="vectorized",
+        return_series=True, backtest_config={"next_day_execution": True, "commission": 0.0005},
+    )
+    res, pseries = run_portfolio_backtest(
+        [{"symbol": "QQQ", "strategy": "EMA_trend_v2", "weight": 1.0}],
+        start_date="2015-01-01", end_date="2018-06-30", rebalance="none", return_series=True,
+        data={"QQQ": patched_runner}, commission=0.0005,
+        backtest_config={"metrics": {"risk_free_rate": 0.02, "accrue_risk_free_when_flat": True}},
+    )
+    assert pseries.index[0] == series.index[0]
+    np.testing.assert_allclose(pseries["equity"], series["equity"], rtol=1e-12)
+    bt = run_backtest(
+        "EMA_trend_v2", start_date="2015-01-01", end_date="2018-06-30", engine="vectorized",
+        backtest_config={"next_day_execution": True, "commission": 0.0005},
+    )
+    portfolio = dict(res["portfolio"])
+    portfolio.pop("annual_return")
+    assert portfolio == bt["strategy"]
+    leg = dict(res["legs"]["QQQ:EMA_trend_v2"])
+    leg.pop("annual_return"), leg.pop("weight")
+    assert leg == bt["strategy"]
+
+
+def test_portfolio_rebalances_on_shared_calendar(patched_runner):
+    from ndx_rsi.backtest.portfolio import portfolio_equity, run_portfolio_backtest
+
+    other = _synthetic_ohlcv(seed=9).drop(index=patched_runner.index[300:305])  # 停牌几天
+    legs = [
+        {"symbol": "QQQ", "strategy": "EMA_trend_v2", "weight": 0.5},
+        {"symbol": "TQQQ", "strategy": "NDX_MA50_Volume_RSI", "weight": 0.4},
+    ]
+    data = {"QQQ": patched_runner, "TQQQ": other}
+    res, series = run_portfolio_backtest(legs, rebalance="monthly", data=data, return_series=True, commission=0.0)
+    assert res["bars"] == len(series)
+    union = run_portfolio_backtest(legs, rebalance="monthly", calendar="union", data=data)
+    assert union["bars"] == res["bars"] + 5
+    # 各腿市值 + 现金（期初 10%）= 组合权益；周期内权重随净值漂移
+    cash = series["equity"] - series["QQQ:EMA_trend_v2_value"] - series["TQQQ:NDX_MA50_Volume_RSI_value"]
+    np.testing.assert_allclose(cash.iloc[0], 0.1)
+    assert not np.allclose(series["QQQ:EMA_trend_v2_value"] / series["equity"], 0.5)
+    # 手算：两腿、每两日再平衡
+    leg_eq = np.array([[1.0, 1.0], [1.1, 0.9], [1.21, 0.9], [1.1, 1.0]])
+    equity, _ = portfolio_equity(leg_eq, np.array([0.5, 0.5]), np.array([0, 0, 2, 2]))
+    np.testing.assert_allclose(equity, [1.0, 1.0, 1.0 * (0.5 * 1.1 + 0.5 * 1.0), 1.0 * (0.5 * 1.0 + 0.5 * 1.0 / 0.9)])
+    with pytest.raises(ValueError):
+        run_portfolio_backtest([{"symbol": "QQQ", "strategy": "EMA_trend_v2", "weight": 1.2}], data=data)
+
+
+def test_walk_forward_stitches_out_of_sample_windows(patched_runner):
+    from ndx_rsi.backtest import run_walk_forward
+    from ndx_rsi.backtest.walk_forward import _combo_positions, _evaluate
+
+    raw = _synthetic_ohlcv(n=1500)
+    bt_cfg = {"next_day_execution": True, "commission": 0.0005, "metrics": {"risk_free_rate": 0.02, "accrue_risk_free_when_flat": True}}
+    kwargs = dict(grid={"ema_fast": [40, 80], "vol_threshold": [0.015, 0.02]}, train_years=2, test_years=1,
+                  data=raw, backtest_config=bt_cfg, return_series=True)
+    res, series = run_walk_forward("EMA_trend_v2", workers=1, **kwargs)
+    assert len(res["windows"]) == 3 and res["combos"] == 4
+    # 测试窗口首尾相接，权益在每个窗口内的涨幅 = 该窗口样本外收益
+    prev = 1.0
+    for w in res["windows"]:
+        assert w["train_end"] < w["test_start"]
+        end = series.loc[series["window"] == w["window"], "equity"].iloc[-1]
+        assert end / prev - 1 == pytest.approx(w["test"]["total_return"], abs=1e-4)
+        prev = end
+    assert res["oos"]["total_return"] == round(series["equity"].iloc[-1] - 1, 4)
+    # 并行结果与单进程一致
+    res_par, series_par = run_walk_forward("EMA_trend_v2", workers=2, **kwargs)
+    assert res_par == res
+    pd.testing.assert_frame_equal(series_par, series)
+
+    # 窗口切片记账与 run_backtest 的 vectorized 引擎一致（同样从 min_bars 处空仓起步）
+    pos, start = _combo_positions("EMA_trend_v2", {"ema_fast": 40}, raw)
+    close, index = raw["close"].to_numpy(), raw.index
+    metrics, vec = _evaluate(close, pos, index, start + 1, len(raw), 0.0005, (1.02) ** (1 / 252) - 1, True, 0.02)
+    bt, bt_series = run_backtest(
+        "EMA_trend_v2", engine="vectorized", data=raw, strategy_config={"ema_fast": 40},
+        backtest_config=bt_cfg, return_series=True,
+    )
+    np.testing.assert_array_equal(vec["equity"], bt_series["equity"].to_numpy())
+    assert metrics["total_trades"] == bt["total_trades"]
+    # 只有一组参数时，样本外拼接 = 从首个测试窗口前一根起连续记账：跨窗口持仓不平仓、不重复计手续费
+    one, one_series = run_walk_forward("EMA_trend_v2", grid={"ema_fast": [40]}, train_years=2, test_years=1,
+                                       data=raw, backtest_config=bt_cfg, return_series=True)
+    oos_lo = raw.index.get_loc(one_series.index[0])
+    cont, cont_vec = _evaluate(close, pos, index, oos_lo, oos_lo + len(one_series), 0.0005, (1.02) ** (1 / 252) - 1, True, 0.02)
+    assert one["oos"] == cont
+    np.testing.assert_array_equal(one_series["equity"].to_numpy(), cont_vec["equity"][1:])
+    assert sum(w["test"]["total_trades"] for w in one["windows"]) == cont["total_trades"]
+    with pytest.raises(ValueError):
+        run_walk_forward("EMA_trend_v2", grid={"no_such_param": [1]}, data=raw, backtest_config=bt_cfg)
+
+
+def test_monte_carlo_bootstrap_of_backtest_series(patched_runner):
+    from ndx_rsi.backtest import bootstrap_metrics, run_monte_carlo
+    from ndx_rsi.backtest.montecarlo import stationary_bootstrap_indices
+
+    # 块均长极大时每行只有一个块：循环平移的连续下标
+    idx = stationary_bootstrap_indices(50, 8, 1e12, np.random.default_rng(0))
+    assert ((np.diff(idx, axis=1) % 50) == 1).all()
+
+    bt_cfg = {"next_day_execution": True, "commission": 0.0005, "metrics": {"risk_free_rate": 0.02}}
+    mc = run_monte_carlo(
+        "EMA_trend_v2", start_date="2015-01-01", end_date="2018-06-30", n_samples=400, seed=1,
+        data=patched_runner, backtest_config=bt_cfg,
+    )
+    bt, m = mc["backtest"], mc["metrics"]
+    # 点估计与回测口径一致；trade_pnl 非空行即逐笔平仓
+    for key in ("total_return", "sharpe_ratio", "win_rate", "profit_factor"):
+        assert m[key]["point"] == bt[key]
+    assert mc["trades"] == bt["total_trades"]
+    for stats in m.values():
+        assert stats["ci_low"] <= stats["median"] <= stats["ci_high"]
+    # 小内存预算下分块计算，样本数不变
+    _, samples = bootstrap_metrics(np.full(300, 0.001), n_samples=50, max_bytes=1, return_samples=True, seed=2)
+    assert len(samples) == 50
+    np.testing.assert_allclose(samples["total_return"], 1.001 ** 300 - 1)
+
+
+def test_result_store_returns_identical_rerun(patched_runner, tmp_path, monkeypatch):
+    from ndx_rsi.backtest import store
+
+    db = store.ResultStore(str(tmp_path / "results.sqlite"))
+    monkeypatch.setitem(store._DEFAULT, "store", db)
+    kwargs = dict(start_date="2015-01-01", end_date="2018-06-30", engine="vectorized", return_series=True)
+    res, series = run_backtest("EMA_trend_v2", **kwargs)
+    changed = patched_runner.copy()
+    changed.iloc[-1, 3] *= 1.01  # 行情或参数变化 → 新键
+    run_backtest("EMA_trend_v2", data=changed, strategy_config={"ema_fast": 60}, **kwargs)
+    # 命中时不再预处理/计算指标
+    monkeypatch.setattr(runner, "preprocess_ohlcv", lambda raw: pytest.fail("recomputed"))
+    res2, series2 = run_backtest("EMA_trend_v2", **kwargs)
+    assert res2 == res
+    pd.testing.assert_frame_equal(series2, series)
+    assert run_backtest("EMA_trend_v2", **{**kwargs, "return_series": False}) == res
+
+    runs = db.list_runs()
+    assert len(runs) == 2
+    table = db.compare_runs(runs["key"].tolist())
+    assert "strategy.ema_fast" in table.index and "total_return" in table.index
+    assert db.get_run(runs["key"].iloc[-1][:8])["result"] == res
+
+
+def test_result_store_key_includes_schema_version(monkeypatch):
+    from ndx_rsi.backtest import store
+    from ndx_rsi.config_loader import get_result_store_config
+
+    args = ("EMA_trend_v2", "QQQ", "2015-01-01", "2018-06-30", "vectorized", {}, {}, "abc")
+    key = store.result_key(*args)
+    monkeypatch.setattr(store, "RESULT_SCHEMA_VERSION", store.RESULT_SCHEMA_VERSION + 1)
+    assert store.result_key(*args) != key
+    # 默认关闭，需 result_store.enabled 或 run_backtest(use_store=True) 显式开启
+    assert get_result_store_config()["enabled"] is False
+
+
+def test_loop_engine_series_is_columnar(patched_runner):
+    bt_cfg = {"next_day_execution": False, "use_stop_loss_take_profit": True, "commission": 0.0005}
+    res, series = run_backtest(
+        "EMA_trend_v2", start_date="2015-01-01", end_date="2018-06-30", return_series=True, backtest_config=bt_cfg
+    )
+    # 序列列直接引用引擎的预分配数组；trade_pnl 由交易台账回填
+    assert np.shares_memory(series["equity"].to_numpy(), series["strategy_cum_return"].to_numpy())
+    assert series["trade_pnl"].notna().sum() == res["total_trades"] > 0
+    assert series["equity"].iloc[-1] - 1 == pytest.approx(res["total_return"], abs=1e-4)
+
+
+def test_online_metrics_streaming_matches_batch_and_series(patched_runner):
+    from ndx_rsi.backtest.metrics import OnlineMetrics
+
+    rng = np.random.default_rng(3)
+    returns = rng.normal(0.0005, 0.01, 500)
+    positions = (rng.random(500) < 0.6).astype(float)
+    streamed, batched = OnlineMetrics(), OnlineMetrics()
+    for r, p in zip(returns, positions):
+        streamed.update_bar(r, p)
+    batched.update_bars(returns[:200], positions[:200])
+    batched.update_bars(returns[200:], positions[200:])
+    for acc in (streamed, batched):
+        assert acc.mean == pytest.approx(returns.mean())
+        assert acc.m2 / (acc.n - 1) == pytest.approx(returns.var(ddof=1))
+        assert acc.turnover == batched.turnover == np.abs(np.diff(positions, prepend=0.0)).sum()
+
+    # 不返回序列的逐 Bar 回测只用累加器，绩效与序列口径一致
+    bt_cfg = {"next_day_execution": False, "use_stop_loss_take_profit": True}
+    kwargs = dict(start_date="2015-01-01", end_date="2018-06-30", backtest_config=bt_cfg)
+    res = run_backtest("EMA_trend_v2", **kwargs)
+    res_series, series = run_backtest("EMA_trend_v2", return_series=True, **kwargs)
+    assert res == res_series
+    assert res["exposure"] == round((series["position"] != 0).mean(), 4)
+    assert res["max_drawdown"] >= round(float((1 - series["equity"] / series["equity"].cummax()).max()), 4)
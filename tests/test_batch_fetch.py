@@ -0,0 +1,152 @@
+"""批量并发拉取：用本地 HTTP 服务模拟 chart 接口（限流、服务端错误、超时、未知标的），不访问 Yahoo。"""
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+import pytest
+
+from ndx_rsi.data import FetchError, TokenBucket, fetch_ohlcv_batch
+from ndx_rsi.data.batch_fetch import backoff_delay
+from ndx_rsi.data.cache import OHLCVCache
+
+FAST = {"timeout": 0.5, "max_retries": 3, "backoff_base": 0.01, "backoff_cap": 0.05}
+
+
+def _chart_payload(symbol: str, period1: int, period2: int, interval: str) -> dict:
+    step = 86400 if interval == "1d" else 3600
+    # 美东 9:30 对应 UTC 14:30；日线时间戳取开盘时刻
+    ts = list(range(period1 + 14 * 3600 + 1800, period2, step))
+    close = [100.0 + i for i in range(len(ts))]
+    return {"chart": {"result": [{
+        "meta": {"symbol": symbol, "exchangeTimezoneName": "America/New_York"},
+        "timestamp": ts,
+        "indicators": {
+            "quote": [{"open": close, "high": [c + 1 for c in close], "low": [c - 1 for c in close],
+                       "close": close, "volume": [1000] * len(ts)}],
+            "adjclose": [{"adjclose": [c / 2 for c in close]}],
+        },
+    }], "error": None}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code: int, payload: dict, headers: dict = None) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        symbol = unquote(url.path.rsplit("/", 1)[-1])
+        q = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with server.lock:
+            server.calls[symbol] += 1
+            n = server.calls[symbol]
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            time.sleep(0.02)
+            if symbol == "LIMITED" and n == 1:
+                return self._send(429, {}, {"Retry-After": "0"})
+            if symbol == "FLAKY" and n <= 2:
+                return self._send(503, {})
+            if symbol == "SLOW" and n == 1:
+                time.sleep(1.0)
+            if symbol == "TRUNCATED" and n == 1:
+                # 声明的 Content-Length 大于实际发送的字节数 → 客户端读到 IncompleteRead
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "1000")
+                self.end_headers()
+                self.wfile.write(b'{"chart": ')
+                self.close_connection = True
+                return None
+            if symbol == "DOWN":
+                return self._send(500, {})
+            if symbol == "NOPE":
+                return self._send(404, {"chart": {"result": None, "error": {"code": "Not Found", "description": "No data found, symbol may be delisted"}}})
+            self._send(200, _chart_payload(symbol, int(q["period1"]), int(q["period2"]), q["interval"]))
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture
+def chart_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.calls = Counter()
+    server.active = server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_batch_returns_frames_and_retries_transient_errors(chart_server):
+    symbols = ["QQQ", "^NDX", "LIMITED", "FLAKY", "SLOW", "TRUNCATED"]
+    frames = fetch_ohlcv_batch(
+        symbols, "2024-01-01", "2024-01-11", frequencies=("1d", "1h"),
+        max_workers=3, rate_per_second=1000, burst=10, base_url=chart_server.base_url, **FAST,
+    )
+    assert set(frames) == {(s, f) for s in symbols for f in ("1d", "1h")}
+    daily = frames[("QQQ", "1d")]
+    assert list(daily.columns) == ["open", "high", "low", "close", "volume"]
+    assert len(daily) == 10 and str(daily.index.tz) == "America/New_York"
+    # 日线归一到当日零点；OHLC 按复权收盘价整体调整
+    assert daily.index[0] == pd.Timestamp("2024-01-01", tz="America/New_York")
+    assert daily["close"].iloc[0] == 50.0 and daily["high"].iloc[0] == 50.5
+    assert frames[("QQQ", "1h")].index[0].hour == 9
+    assert chart_server.calls["LIMITED"] == 3 and chart_server.calls["FLAKY"] == 4
+    assert chart_server.calls["SLOW"] == 3 and chart_server.calls["TRUNCATED"] == 3
+    assert chart_server.max_active <= 3
+
+
+def test_fetch_batch_errors(chart_server):
+    kwargs = dict(max_workers=4, rate_per_second=1000, burst=10, base_url=chart_server.base_url, **FAST)
+    with pytest.raises(FetchError, match="2/3 fetches failed"):
+        fetch_ohlcv_batch(["QQQ", "DOWN", "NOPE"], "2024-01-01", "2024-01-05", **kwargs)
+    # 4xx 不重试，5xx 重试到上限
+    assert chart_server.calls["NOPE"] == 1 and chart_server.calls["DOWN"] == FAST["max_retries"] + 1
+    frames = fetch_ohlcv_batch(["QQQ", "NOPE"], "2024-01-01", "2024-01-05", on_error="skip", **kwargs)
+    assert list(frames) == [("QQQ", "1d")]
+    with pytest.raises(ValueError, match="Unknown on_error"):
+        fetch_ohlcv_batch(["QQQ"], "2024-01-01", "2024-01-05", on_error="ignore")
+
+
+def test_fetch_batch_uses_cache(chart_server, tmp_path):
+    cache = OHLCVCache(str(tmp_path))
+    kwargs = dict(rate_per_second=1000, burst=10, base_url=chart_server.base_url, cache=cache, **FAST)
+    first = fetch_ohlcv_batch(["QQQ"], "2024-01-01", "2024-01-11", **kwargs)
+    second = fetch_ohlcv_batch(["QQQ"], "2024-01-01", "2024-01-11", **kwargs)
+    assert chart_server.calls["QQQ"] == 1
+    pd.testing.assert_frame_equal(first[("QQQ", "1d")], second[("QQQ", "1d")], check_index_type=False, check_freq=False)
+
+
+def test_token_bucket_limits_rate_and_backoff_is_bounded():
+    bucket = TokenBucket(rate=50, capacity=2)
+    t0 = time.monotonic()
+    for _ in range(12):
+        bucket.acquire()
+    # 前 2 个为突发，其余 10 个按 50/s 补充
+    assert time.monotonic() - t0 >= 0.18
+    assert all(0 <= backoff_delay(a, 0.5, 4.0) <= min(4.0, 0.5 * 2 ** a) for a in range(8) for _ in range(20))
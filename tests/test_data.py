@@ -32,3 +32,263 @@ def test_preprocess_adds_volume_ratio():
     df, ok = preprocess_ohlcv(raw)
     assert "volume_ratio" in df.columns
     assert ok is True
+
+
+def _fake_daily(start: str, end: str) -> pd.DataFrame:
+    idx = pd.bdate_range(start, end, inclusive="left", tz="America/New_York")
+    close = pd.Series(range(len(idx)), index=idx, dtype=float) + 100.0
+    return pd.DataFrame({"open": close, "high": close, "low": close, "close": close, "volume": 1e6})
+
+
+def test_ohlcv_cache_incremental_top_up(tmp_path):
+    from ndx_rsi.data.cache import OHLCVCache
+
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return _fake_daily(start, end)
+
+    cache = OHLCVCache(str(tmp_path), ttl_hours=0)
+    first = cache.get("QQQ", "1d", "2024-01-01", "2024-03-01", fetch)
+    assert calls == [("2024-01-01", "2024-03-01")]
+    # 区间内请求：直接读缓存
+    inner = cache.get("QQQ", "1d", "2024-01-15", "2024-02-01", fetch)
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(inner, first.loc["2024-01-15":"2024-01-31"], check_freq=False)
+    # 结束日延后：只补尾部（从最后一根 K 线所在日起）
+    extended = cache.get("QQQ", "1d", "2024-01-01", "2024-04-01", fetch)
+    assert calls[-1] == ("2024-02-29", "2024-04-01")
+    assert extended.index.is_unique and extended.index[-1] == pd.Timestamp("2024-03-29", tz="America/New_York")
+
+
+def test_ohlcv_cache_ttl_skips_network(tmp_path):
+    from ndx_rsi.data.cache import OHLCVCache
+
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return _fake_daily(start, end)
+
+    cache = OHLCVCache(str(tmp_path), ttl_hours=12)
+    cache.get("QQQ", "1d", "2024-01-01", "2024-03-01", fetch)
+    cache.get("QQQ", "1d", "2024-01-01", "2024-03-01", fetch)
+    assert len(calls) == 1
+    # TTL 内不重拉最后一根，但未覆盖的尾部照常拉取
+    cache.get("QQQ", "1d", "2024-01-01", "2024-03-05", fetch)
+    assert calls[-1] == ("2024-03-01", "2024-03-05")
+
+
+def test_ohlcv_cache_fetches_uncovered_tail_within_ttl(tmp_path):
+    """缓存 2020 年后在 TTL 内请求到 2021 年底：未覆盖的 2021 年必须拉取。"""
+    from ndx_rsi.data.cache import OHLCVCache
+
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return _fake_daily(start, end)
+
+    cache = OHLCVCache(str(tmp_path), ttl_hours=12)
+    cache.get("QQQ", "1d", "2020-01-01", "2021-01-01", fetch)
+    df = cache.get("QQQ", "1d", "2020-01-01", "2021-12-31", fetch)
+    assert calls[-1] == ("2021-01-01", "2021-12-31")
+    assert df.index[-1] == pd.Timestamp("2021-12-30", tz="America/New_York")
+
+
+def test_ohlcv_cache_does_not_cover_empty_fetch(tmp_path):
+    """某段拉取返回空（如被限流）时不记为已覆盖，下次请求重拉该段。"""
+    from ndx_rsi.data.cache import OHLCVCache
+
+    calls = []
+    empty = {("2021-01-01", "2022-01-01")}
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return _fake_daily(start, end).iloc[:0] if (start, end) in empty else _fake_daily(start, end)
+
+    cache = OHLCVCache(str(tmp_path), ttl_hours=12)
+    cache.get("QQQ", "1d", "2020-01-01", "2021-01-01", fetch)
+    cache.get("QQQ", "1d", "2020-01-01", "2022-01-01", fetch)
+    assert cache.load_meta("QQQ", "1d")["ranges"] == [["2020-01-01", "2021-01-01"]]
+    empty.clear()
+    df = cache.get("QQQ", "1d", "2020-01-01", "2022-01-01", fetch)
+    assert calls == [("2020-01-01", "2021-01-01"), ("2021-01-01", "2022-01-01"), ("2021-01-01", "2022-01-01")]
+    assert df.index[-1] == pd.Timestamp("2021-12-31", tz="America/New_York")
+
+
+def test_ohlcv_cache_fills_gaps_after_backfill(tmp_path):
+    """先缓存 2020–2024，再回补 2010–2011：其后 2010–2024 应补齐中间空洞，回补不刷新尾部的 TTL。"""
+    from ndx_rsi.data.cache import OHLCVCache
+
+    calls = []
+
+    def fetch(start, end):
+        calls.append((start, end))
+        return _fake_daily(start, end)
+
+    cache = OHLCVCache(str(tmp_path), ttl_hours=12)
+    cache.get("QQQ", "1d", "2020-01-01", "2024-01-01", fetch)
+    fetched_at = cache.load_meta("QQQ", "1d")["fetched_at"]
+    cache.get("QQQ", "1d", "2010-01-01", "2011-01-01", fetch)
+    meta = cache.load_meta("QQQ", "1d")
+    assert meta["fetched_at"] == fetched_at
+    assert meta["ranges"] == [["2010-01-01", "2011-01-01"], ["2020-01-01", "2024-01-01"]]
+    full = cache.get("QQQ", "1d", "2010-01-01", "2024-01-01", fetch)
+    assert calls[-1] == ("2011-01-01", "2020-01-01")
+    assert full.index.equals(_fake_daily("2010-01-01", "2024-01-01").index)
+    cache.get("QQQ", "1d", "2010-01-01", "2024-01-01", fetch)
+    assert len(calls) == 3
+
+
+def test_yfinance_source_uses_cache(tmp_path, monkeypatch):
+    from ndx_rsi.data.cache import OHLCVCache
+
+    source = YFinanceDataSource("QQQ", {"code": "QQQ"}, cache=OHLCVCache(str(tmp_path), ttl_hours=12))
+    calls = []
+    monkeypatch.setattr(source, "_download", lambda code, s, e, interval: calls.append(code) or _fake_daily(s, e))
+    a = source.get_historical_data("2024-01-01", "2024-02-01")
+    b = source.get_historical_data("2024-01-01", "2024-02-01")
+    assert calls == ["QQQ"]
+    pd.testing.assert_frame_equal(a, b, check_freq=False)
+
+
+def test_csv_source_parses_mixed_utc_offsets():
+    """data.csv 含 -05:00/-04:00 两种偏移，应统一为纽约时区并按 [start, end) 切片。"""
+    from ndx_rsi.data import CSVDataSource, create_data_source
+
+    source = create_data_source("QQQ", {"code": "QQQ", "data_source": "file", "path": "data.csv"})
+    assert isinstance(source, CSVDataSource)
+    df = source.get_historical_data("2024-03-01", "2024-04-01")
+    assert str(df.index.tz) == "America/New_York"
+    assert list(df.columns) == ["open", "high", "low", "close", "volume"]
+    assert df.index.min() >= pd.Timestamp("2024-03-01", tz="America/New_York")
+    assert df.index.max() < pd.Timestamp("2024-04-01", tz="America/New_York")
+    # 夏令时切换（3 月 10 日）前后都是当地零点
+    assert (df.index.hour == 0).all()
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_columnar_source_matches_csv(tmp_path, suffix):
+    pytest.importorskip("pyarrow")
+    from ndx_rsi.data import ColumnarFileDataSource, create_data_source
+
+    csv_df = create_data_source("QQQ", {"code": "QQQ", "data_source": "file", "path": "data.csv"}).load()
+    path = tmp_path / f"qqq{suffix}"
+    if suffix == ".parquet":
+        csv_df.to_parquet(path)
+    else:
+        csv_df.reset_index().to_feather(path)
+    source = create_data_source("QQQ", {"code": "QQQ", "data_source": "file", "path": str(path)})
+    assert isinstance(source, ColumnarFileDataSource)
+    pd.testing.assert_frame_equal(source.load(), csv_df, check_freq=False)
+
+
+def test_unknown_data_source_raises():
+    from ndx_rsi.data import create_data_source
+
+    with pytest.raises(ValueError):
+        create_data_source("QQQ", {"code": "QQQ", "data_source": "bloomberg"})
+
+
+def test_synthetic_ohlcv_is_reproducible_and_consistent():
+    from ndx_rsi.data import generate_ohlcv
+
+    df = generate_ohlcv(5_000, seed=3, with_regime=True, mean_regime_bars=100)
+    assert df.equals(generate_ohlcv(5_000, seed=3, with_regime=True, mean_regime_bars=100))
+    assert list(df.columns) == ["open", "high", "low", "close", "volume", "regime"]
+    assert isinstance(df.index, pd.DatetimeIndex) and df.index.is_monotonic_increasing
+    assert (df["high"] >= df[["open", "close"]].max(axis=1)).all()
+    assert (df["low"] <= df[["open", "close"]].min(axis=1)).all()
+    assert (df["volume"] > 0).all()
+    assert set(df["regime"]) == {"bull", "bear", "sideways"}
+    # 熊市状态波动率高于震荡
+    ret = df["close"].pct_change()
+    assert ret[df["regime"] == "bear"].std() > ret[df["regime"] == "sideways"].std()
+
+
+def _fake_intraday(start: str, end: str, freq: str = "30min") -> pd.DataFrame:
+    """含盘前盘后的 30 分钟线（纽约时区），跨 2024-03-10 夏令时切换。"""
+    idx = pd.date_range(f"{start} 04:00", f"{end} 20:00", freq=freq, tz="America/New_York", name="Date")
+    idx = idx[idx.dayofweek < 5]
+    n = len(idx)
+    close = pd.Series(range(n), dtype=float).to_numpy() + 100.0
+    return pd.DataFrame(
+        {"open": close - 0.5, "high": close + 1.0, "low": close - 1.0, "close": close, "volume": 10.0},
+        index=idx,
+    )
+
+
+def test_resample_ohlcv_sessions_and_aggregation():
+    from ndx_rsi.data import resample_ohlcv
+
+    raw = _fake_intraday("2024-03-07", "2024-03-12")
+    session = raw[(raw.index.strftime("%H:%M") >= "09:30") & (raw.index.strftime("%H:%M") < "16:00")]
+    hourly = resample_ohlcv(raw, "1h")
+    # 每日 9:30 … 15:30 共 7 根，夏令时切换后仍从当地 9:30 起
+    assert list(hourly.loc["2024-03-11"].index.strftime("%H:%M")) == ["09:30", "10:30", "11:30", "12:30", "13:30", "14:30", "15:30"]
+    assert hourly["volume"].sum() == session["volume"].sum()
+    daily = resample_ohlcv(raw, "1d")
+    assert list(daily.index) == list(pd.DatetimeIndex(["2024-03-07", "2024-03-08", "2024-03-11", "2024-03-12"], tz="America/New_York"))
+    day = session.loc["2024-03-11"]
+    row = daily.loc[pd.Timestamp("2024-03-11", tz="America/New_York")]
+    assert (row["open"], row["high"], row["low"], row["close"], row["volume"]) == (
+        day["open"].iloc[0], day["high"].max(), day["low"].min(), day["close"].iloc[-1], day["volume"].sum(),
+    )
+    # 周线标为周一，可由日线或 30 分钟线得到同样结果
+    weekly = resample_ohlcv(raw, "1w")
+    assert list(weekly.index.strftime("%Y-%m-%d")) == ["2024-03-04", "2024-03-11"]
+    pd.testing.assert_frame_equal(resample_ohlcv(daily, "1w"), weekly)
+    with pytest.raises(ValueError, match="Unknown frequency"):
+        resample_ohlcv(raw, "2d")
+
+
+def test_sources_resample_from_finest_series(tmp_path, monkeypatch):
+    from ndx_rsi.data import create_data_source, resample_ohlcv
+    from ndx_rsi.data.cache import OHLCVCache
+
+    raw = _fake_intraday("2024-03-04", "2024-03-15")
+    config = {"code": "QQQ", "resample_from": "30m"}
+    source = YFinanceDataSource("QQQ", config, cache=OHLCVCache(str(tmp_path / "cache"), ttl_hours=12))
+    calls = []
+
+    def download(code, s, e, interval):
+        calls.append(interval)
+        return raw[(raw.index >= pd.Timestamp(s, tz=raw.index.tz)) & (raw.index < pd.Timestamp(e, tz=raw.index.tz))]
+
+    monkeypatch.setattr(source, "_download", download)
+    daily = source.get_historical_data("2024-03-04", "2024-03-16", "1d")
+    weekly = source.get_historical_data("2024-03-04", "2024-03-16", "1w")
+    hourly = source.get_historical_data("2024-03-04", "2024-03-16", "1h")
+    # 只拉取并缓存 30 分钟线一份
+    assert calls == ["30m"]
+    assert len(daily) == 10 and len(weekly) == 2 and len(hourly) == 70
+
+    path = tmp_path / "qqq_30m.csv"
+    raw.to_csv(path)
+    file_source = create_data_source("QQQ", {"code": "QQQ", "data_source": "file", "path": {"30m": str(path)}, "resample_from": "30m"})
+    pd.testing.assert_frame_equal(
+        file_source.get_historical_data("2024-03-04", "2024-03-16", "1d"), resample_ohlcv(raw, "1d"),
+        check_index_type=False, check_freq=False,
+    )
+
+
+def test_file_source_keeps_one_parsed_frame_per_file(tmp_path):
+    import os
+
+    from ndx_rsi.data import create_data_source
+    from ndx_rsi.data import file_source
+
+    path = tmp_path / "qqq.csv"
+    _fake_daily("2024-01-01", "2024-03-01").to_csv(path)
+    source = create_data_source("QQQ", {"code": "QQQ", "data_source": "file", "path": str(path)})
+    first = source.load()
+    assert str(first.index.dtype) == "datetime64[ns, America/New_York]"
+    for bump in range(1, 4):
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+        source.load()
+    assert [k for k in file_source._LOADED if k[0] == str(path)] == [(str(path), "")]
+    with pytest.raises(TypeError):
+        file_source._FileDataSource("QQQ", {})
@@ -17,6 +17,7 @@ from ndx_rsi.indicators import (
     judge_market_env,
     get_rsi_thresholds,
 )
+from tests.helpers import wilder_smooth_loop
 
 
 @pytest.fixture
@@ -76,3 +77,304 @@ def test_get_rsi_thresholds():
     assert th["overbuy"] == 80 and th["oversell"] == 40
     th = get_rsi_thresholds("oscillate")
     assert th["overbuy"] == 65 and th["oversell"] == 35
+
+
+@pytest.mark.filterwarnings("ignore:Mean of empty slice")
+@pytest.mark.parametrize("period", [1, 5, 14])
+def test_wilder_smooth_matches_loop(period):
+    from ndx_rsi.indicators import wilder_smooth
+
+    rng = np.random.default_rng(0)
+    x = pd.Series(rng.normal(size=300)).abs()
+    x.iloc[0] = np.nan  # 首值 NaN：seed 取 nanmean
+    with_gap = x.copy()
+    with_gap.iloc[200] = np.nan  # 中途 NaN：其后全为 NaN
+    for s in (x, with_gap, x.iloc[: period - 1]):
+        pd.testing.assert_series_equal(wilder_smooth(s, period), wilder_smooth_loop(s, period), rtol=0, atol=1e-9)
+
+
+def test_adx_atr_match_loop_kernel(monkeypatch):
+    from ndx_rsi.indicators import adx as adx_mod
+    from ndx_rsi.indicators import calculate_adx, calculate_atr
+
+    rng = np.random.default_rng(1)
+    close = pd.Series(100 + np.cumsum(rng.normal(size=500)))
+    high = close + rng.uniform(0, 2, size=500)
+    low = close - rng.uniform(0, 2, size=500)
+    fast_adx = calculate_adx(high, low, close, 14)
+    fast_atr = calculate_atr(high, low, close, 14)
+    monkeypatch.setattr(adx_mod, "wilder_smooth", wilder_smooth_loop)
+    pd.testing.assert_series_equal(fast_adx, calculate_adx(high, low, close, 14), rtol=0, atol=1e-9)
+    pd.testing.assert_series_equal(fast_atr, calculate_atr(high, low, close, 14), rtol=0, atol=1e-9)
+
+
+def test_rsi_wilder_matches_recursive_definition(sample_prices):
+    from ndx_rsi.indicators import calculate_rsi_wilder
+
+    period = 14
+    rsi = calculate_rsi_wilder(sample_prices, period)
+    delta = sample_prices.diff().to_numpy()
+    gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+    avg_g, avg_l = gain[1:period + 1].mean(), loss[1:period + 1].mean()
+    expected = [50.0] * period + [100 - 100 / (1 + avg_g / avg_l)]
+    for i in range(period + 1, len(delta)):
+        avg_g = (avg_g * (period - 1) + gain[i]) / period
+        avg_l = (avg_l * (period - 1) + loss[i]) / period
+        expected.append(100 - 100 / (1 + avg_g / avg_l))
+    np.testing.assert_allclose(rsi.to_numpy(), expected, rtol=0, atol=1e-9)
+
+
+def test_indicator_pipeline_dedupes_and_resolves_dependencies():
+    from ndx_rsi.indicators import IndicatorPipeline, indicator
+    from ndx_rsi.strategy.factory import create_strategy
+
+    v2 = create_strategy("EMA_trend_v2", {"ema_fast": 80, "ema_slow": 200, "vol_window": 20})
+    v3 = create_strategy("EMA_trend_v3", {"ema_fast": 12, "ema_slow": 26, "macd_fast": 12, "macd_slow": 26})
+    pipeline = IndicatorPipeline(v2.required_indicators()).add(v3.required_indicators())
+    plan = pipeline.plan()
+    keys = [(kind, tuple(sorted(params.items()))) for kind, params, _ in plan]
+    assert len(keys) == len(set(keys))
+    kinds = [kind for kind, _, _ in plan]
+    # daily_return 先于 vol，且 vol_20 只算一次
+    assert kinds.index("daily_return") < kinds.index("vol") and kinds.count("vol") == 1
+    # macd_line 与趋势判断共用 ema_12 / ema_26
+    assert [cols for kind, params, cols in plan if kind == "ema"] == [["ema_80"], ["ema_200"], ["ema_12"], ["ema_26"]]
+    with pytest.raises(ValueError):
+        IndicatorPipeline([indicator("rsi", column="rsi_9", period=9), indicator("rsi", column="rsi_9", period=7)])
+
+
+def test_indicator_pipeline_matches_direct_calculation():
+    from ndx_rsi.indicators import calculate_adx, calculate_macd, compute_indicators
+    from ndx_rsi.strategy.factory import create_strategy
+
+    rng = np.random.default_rng(3)
+    close = 100 + np.cumsum(rng.normal(size=300))
+    df = pd.DataFrame(
+        {"open": close, "high": close + 1, "low": close - 1, "close": close, "volume": rng.integers(1e5, 1e6, 300)},
+        index=pd.date_range("2020-01-01", periods=300, freq="B"),
+    )
+    out = compute_indicators(df, create_strategy("EMA_trend_v3", {"ema_fast": 80}).required_indicators())
+    pd.testing.assert_series_equal(out["ema_80"], df["close"].ewm(span=80, adjust=False).mean(), check_names=False)
+    pd.testing.assert_series_equal(out["vol_20"], df["close"].pct_change().rolling(20).std(), check_names=False)
+    pd.testing.assert_series_equal(out["sma_200"], calculate_ma(df["close"], 200), check_names=False)
+    pd.testing.assert_series_equal(out["adx_14"], calculate_adx(df["high"], df["low"], df["close"], 14), check_names=False)
+    pd.testing.assert_series_equal(out["macd_line"], calculate_macd(df["close"])[0], check_names=False)
+    assert "ema_80" not in df.columns
+
+
+def _ohlcv_frame(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=n))
+    return pd.DataFrame(
+        {"open": close, "high": close + 1, "low": close - 1, "close": close, "volume": rng.integers(1e5, 1e6, n)},
+        index=pd.date_range("2020-01-01", periods=n, freq="B"),
+    )
+
+
+def test_indicator_cache_hits_skip_computation(tmp_path):
+    from ndx_rsi.indicators import IndicatorCache, IndicatorPipeline, indicator
+
+    df = _ohlcv_frame()
+    pipeline = IndicatorPipeline([indicator("ema", span=20), indicator("vol", window=20)])
+    cache = IndicatorCache(max_entries=8, cache_dir=str(tmp_path))
+    first = pipeline.run(df, cache)
+    assert (cache.hits, cache.misses) == (0, 3)  # ema_20、daily_return、vol_20
+    second = pipeline.run(df.copy(), cache)
+    assert (cache.hits, cache.misses) == (3, 3)
+    pd.testing.assert_frame_equal(first, second)
+    # 数据变化 → 键变化，重新计算
+    changed = df.copy()
+    changed.iloc[-1, changed.columns.get_loc("close")] += 1.0
+    pipeline.run(changed, cache)
+    assert cache.misses == 6
+    # 新进程（新实例）从磁盘命中
+    fresh = IndicatorCache(max_entries=8, cache_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(pipeline.run(df, fresh), first)
+    assert fresh.stats()["hits"] == 3 and fresh.stats()["misses"] == 0
+
+
+def test_indicator_cache_version_bump_misses_disk(tmp_path, monkeypatch):
+    from ndx_rsi.indicators import IndicatorCache, IndicatorPipeline, indicator
+    from ndx_rsi.indicators import cache as cache_mod
+
+    df = _ohlcv_frame()
+    pipeline = IndicatorPipeline([indicator("ema", span=20)])
+    pipeline.run(df, IndicatorCache(cache_dir=str(tmp_path)))
+    # 指标实现变更后加版本号：磁盘上旧版本的条目不再命中
+    monkeypatch.setattr(cache_mod, "INDICATOR_CACHE_VERSION", cache_mod.INDICATOR_CACHE_VERSION + 1)
+    fresh = IndicatorCache(cache_dir=str(tmp_path))
+    pipeline.run(df, fresh)
+    assert fresh.stats()["hits"] == 0 and fresh.stats()["misses"] == 1
+
+
+def test_indicator_cache_lru_eviction():
+    from ndx_rsi.indicators import IndicatorCache
+
+    cache = IndicatorCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.put(key, pd.Series([1.0]))
+    cache.get("a")  # a 变为最近使用
+    cache.put("c", pd.Series([2.0]))
+    assert cache.get("b") is None and cache.get("a") is not None and cache.get("c") is not None
+    # 预置条目（如参数扫描的 EMA 矩阵）多于 max_entries 也不被淘汰
+    for i in range(5):
+        cache.seed(f"ema{i}", pd.Series([float(i)]))
+    for key in ("d", "e", "f"):
+        cache.put(key, pd.Series([3.0]))
+    assert all(cache.get(f"ema{i}") is not None for i in range(5))
+    assert cache.stats()["seeded"] == 5 and cache.stats()["entries"] == 2
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_market_env_and_trend_series_match_per_bar(seed):
+    from ndx_rsi.indicators import market_env_series
+    from ndx_rsi.signal import get_trend, trend_series
+
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 + np.cumsum(rng.normal(scale=0.8, size=400)), index=pd.date_range("2020-01-01", periods=400))
+    close.iloc[150:200] = close.iloc[150]  # 平台段：斜率为 0
+    ma50 = calculate_ma(close, 50)
+    env = market_env_series(close, ma50)
+    trend = trend_series(close, ma50)
+    assert env.dtype == "category" and env.index.equals(close.index)
+    assert env.astype(str).tolist() == [judge_market_env(close.iloc[: i + 1], ma50.iloc[: i + 1]) for i in range(400)]
+    assert trend.astype(str).tolist() == [get_trend(close.iloc[: i + 1], ma50.iloc[: i + 1]) for i in range(400)]
+
+
+def test_refine_near_thresholds_uses_polyfit():
+    from ndx_rsi.indicators.regression import refine_near_thresholds, rolling_slope
+
+    y = 100 + np.cumsum(np.random.default_rng(2).normal(size=60))
+    slope = rolling_slope(y, 20)
+    np.testing.assert_allclose(slope[19:], [np.polyfit(np.arange(20), y[i - 19:i + 1], 1)[0] for i in range(19, 60)], atol=1e-12)
+    scale = y + 1e-10
+    refined = refine_near_thresholds(slope, y, 20, scale, [slope[30] / scale[30]])
+    assert refined[30] == np.polyfit(np.arange(20), y[11:31], 1)[0]
+
+
+def _specs_all():
+    from ndx_rsi.indicators import indicator
+
+    return [
+        indicator("ema", span=200),
+        indicator("sma", column="ma50", window=50),
+        indicator("vol", window=20),
+        indicator("rsi", period=14),
+        indicator("volume_ratio", window=20),
+        indicator("adx", period=14),
+        indicator("macd_line", fast=12, slow=26),
+    ]
+
+
+def _noisy_ohlcv(n=400, seed=8):
+    df = _ohlcv_frame(n, seed)
+    rng = np.random.default_rng(seed)
+    df["high"] = df["close"] + rng.uniform(0, 2, n)
+    df["low"] = df["close"] - rng.uniform(0, 2, n)
+    return df
+
+
+def test_streaming_pipeline_matches_batch_with_snapshot_restore():
+    import json
+
+    from ndx_rsi.indicators import IndicatorPipeline, StreamingPipeline, calculate_atr, calculate_macd, StreamingATR, StreamingMACD
+
+    df = _noisy_ohlcv()
+    batch = IndicatorPipeline(_specs_all()).run(df)
+    stream = StreamingPipeline(_specs_all())
+    rows = []
+    for i, bar in enumerate(df.to_dict("records")):
+        if i == 150:  # 中途序列化再恢复，结果应与不间断一致
+            stream = StreamingPipeline(_specs_all()).restore(json.loads(json.dumps(stream.snapshot())))
+        rows.append(stream.update(bar))
+    out = pd.DataFrame(rows, index=df.index)
+    # 流式值按“截至当根的前缀”口径：macd_line 不足 slow 根时为 NaN（整段计算时前缀已有值）
+    assert out["macd_line"].iloc[:25].isna().all()
+    for col in stream.columns:
+        np.testing.assert_allclose(out[col].iloc[25:], batch[col].iloc[25:], rtol=1e-9, atol=1e-12, err_msg=col)
+
+    atr, macd = StreamingATR(14), StreamingMACD()
+    values = [(atr.update(h, l, c), macd.update(c), macd.signal_line) for h, l, c in zip(df["high"], df["low"], df["close"])]
+    atr_s, line, signal_line = (np.array(v) for v in zip(*values))
+    np.testing.assert_allclose(atr_s, calculate_atr(df["high"], df["low"], df["close"], 14), rtol=1e-9)
+    macd_line, macd_signal, _ = calculate_macd(df["close"])
+    np.testing.assert_allclose(line[25:], macd_line[25:], rtol=1e-9)
+    np.testing.assert_allclose(signal_line[25:], macd_signal[25:], rtol=1e-9)
+
+
+def test_streaming_sma_ema_skip_nan_like_batch():
+    from ndx_rsi.indicators import IndicatorPipeline, RollingSMA, StreamingEMA, StreamingPipeline, indicator
+
+    df = _noisy_ohlcv(500)
+    df.iloc[200, df.columns.get_loc("close")] = np.nan
+    df.iloc[100, df.columns.get_loc("volume")] = np.nan
+    specs = [indicator("ema", span=200), indicator("ema", span=12), indicator("sma", column="ma50", window=50),
+             indicator("volume_ratio", window=20)]
+    batch = IndicatorPipeline(specs).run(df)
+    stream = StreamingPipeline(specs)
+    out = pd.DataFrame([stream.update(bar) for bar in df.to_dict("records")], index=df.index)
+    for col in stream.columns:
+        np.testing.assert_allclose(out[col], batch[col], rtol=1e-9, atol=1e-12, err_msg=col)
+    # NaN 只影响当根（量能比）或在窗口内被跳过，之后恢复
+    assert out["volume_ratio"].iloc[101:].notna().all()
+
+    x = pd.Series([np.nan, 1.0, 2.0, np.nan, np.nan, 4.0, 5.0, np.nan, 3.0])
+    ema, sma = StreamingEMA(4), RollingSMA(3, min_periods=2)
+    np.testing.assert_allclose([ema.update(v) for v in x], x.ewm(span=4, adjust=False).mean())
+    np.testing.assert_allclose([sma.update(v) for v in x], x.rolling(3, min_periods=2).mean())
+
+
+def test_load_signal_frame_feeds_only_new_bars(tmp_path, monkeypatch):
+    import ndx_rsi.data as data_mod
+    from ndx_rsi.cli_main import load_signal_frame
+    from ndx_rsi.indicators import IndicatorPipeline
+    from ndx_rsi.strategy.factory import create_strategy
+
+    full = _noisy_ohlcv(420)
+    full.index = pd.date_range(end=pd.Timestamp.today().normalize(), periods=420, freq="D")
+    fetched = []
+
+    class FakeSource:
+        visible = 400
+
+        def get_historical_data(self, start, end, frequency="1d"):
+            df = full.iloc[: self.visible]
+            df = df[df.index >= pd.Timestamp(start)]
+            fetched.append(len(df))
+            return df
+
+    source = FakeSource()
+    monkeypatch.setattr(data_mod, "create_data_source", lambda symbol, config: source)
+    strategy = create_strategy("EMA_trend_v3", {"ema_fast": 80})
+    state_path = str(tmp_path / "state.json")
+
+    first = load_signal_frame("QQQ", "EMA_trend_v3", strategy, state_path)
+    source.visible = 410
+    second = load_signal_frame("QQQ", "EMA_trend_v3", strategy, state_path)
+    assert fetched[1] == 12  # 只拉上次已写入状态的最后一根起的增量
+    # 与对同一段历史（初始化时拉取的起点至今）整段计算一致
+    start = 400 - fetched[0]
+    batch = IndicatorPipeline(strategy.required_indicators()).run(full.iloc[start:410])
+    assert second.index[-1] == full.index[409] and len(second) == max(strategy.min_bars, 120)
+    for col in ("ema_80", "ema_200", "vol_20", "adx_14", "macd_line", "sma_200"):
+        np.testing.assert_allclose(second[col], batch[col].iloc[-len(second):], rtol=1e-9, err_msg=col)
+
+
+def test_batch_matrices_match_pandas():
+    from ndx_rsi.indicators.batch import ema_matrix, rolling_std_matrix, sma_matrix
+
+    close = _ohlcv_frame(500)["close"].copy()
+    close.iloc[[0, 7]] = np.nan
+    close.iloc[100:110] = close.iloc[99]  # 常数段
+    spans = [20, 35, 80, 150, 200, 300]
+    out = np.empty((len(close), len(spans)))
+    ema = ema_matrix(close, spans, out=out)
+    assert ema is out
+    expected = np.column_stack([close.ewm(span=s, adjust=False).mean() for s in spans])
+    np.testing.assert_array_equal(ema, expected)
+
+    windows = [5, 20, 200]
+    sma = sma_matrix(close, windows)
+    np.testing.assert_allclose(sma, np.column_stack([calculate_ma(close, w) for w in windows]), rtol=1e-10)
+    std = rolling_std_matrix(close, [10, 20])
+    np.testing.assert_array_equal(std, np.column_stack([close.rolling(w).std() for w in (10, 20)]))
@@ -0,0 +1,48 @@
+"""运行埋点：未启用时为空操作；启用时汇总回测各阶段耗时与计数，写出 JSON 与 node-exporter textfile。"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+from ndx_rsi import profiling
+from ndx_rsi.backtest import run_backtest
+from tests.test_backtest import _synthetic_ohlcv
+
+
+def test_disabled_profiling_is_noop():
+    assert not profiling.enabled()
+    with profiling.timer("x"):
+        profiling.count("y")
+    assert profiling.finish_profile() is None
+
+
+def test_profile_run_writes_json_and_textfile(tmp_path):
+    json_path, prom_path = tmp_path / "profile.json", tmp_path / "prom" / "ndx_rsi.prom"
+    with profiling.profile_run("test.backtest", str(json_path), str(prom_path), {"strategy": "EMA_trend_v2"}):
+        for engine in ("loop", "vectorized"):
+            run_backtest("EMA_trend_v2", data=_synthetic_ohlcv(), engine=engine, use_store=False,
+                         backtest_config={"next_day_execution": True})
+    assert not profiling.enabled()
+
+    profile = json.loads(json_path.read_text())
+    assert profile["status"] == "ok" and profile["labels"] == {"strategy": "EMA_trend_v2"}
+    assert profile["counters"]["backtest.runs"] == 2
+    for stage in ("data.preprocess", "indicators", "signals", "backtest.engine.loop", "backtest.engine.vectorized"):
+        assert profile["stages"][stage]["total_seconds"] >= 0
+    assert profile["stages"]["indicators"]["calls"] == 2
+
+    text = prom_path.read_text()
+    assert '# TYPE ndx_rsi_stage_seconds gauge' in text
+    assert 'ndx_rsi_stage_calls{run="test.backtest",stage="indicators"} 2' in text
+    assert 'ndx_rsi_run_success{run="test.backtest"} 1' in text
+
+
+def test_profile_run_records_error(tmp_path):
+    json_path = tmp_path / "profile.json"
+    with pytest.raises(RuntimeError):
+        with profiling.profile_run("test.error", str(json_path)):
+            raise RuntimeError("boom")
+    assert json.loads(json_path.read_text())["status"] == "error"
@@ -0,0 +1,206 @@
+"""策略层：generate_signals 向量化实现与逐 Bar generate_signal 一致。"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ndx_rsi.indicators import calculate_adx, calculate_ma, calculate_macd, calculate_rsi_handwrite, calculate_volume_ratio
+from ndx_rsi.strategy.base import BaseTradingStrategy
+from ndx_rsi.strategy.ema_cross import EMACrossoverV1Strategy, EMATrendV2Strategy, EMATrendV3Strategy
+from ndx_rsi.strategy.ndx_ma50_volume_rsi import NDXMA50VolumeRSIStrategy
+from ndx_rsi.strategy.ndx_short import NDXShortTermRSIStrategy
+
+
+@pytest.fixture(scope="module")
+def ohlcv():
+    rng = np.random.default_rng(11)
+    n = 700
+    # 分段漂移制造趋势/震荡切换
+    drift = np.repeat(rng.choice([-0.002, 0.0, 0.002], size=n // 50 + 1), 50)[:n]
+    close = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.012, n)))
+    df = pd.DataFrame(
+        {
+            "open": close,
+            "high": close * (1 + rng.uniform(0, 0.01, n)),
+            "low": close * (1 - rng.uniform(0, 0.01, n)),
+            "close": close,
+            "volume": rng.uniform(5e6, 2e7, n),
+        },
+        index=pd.bdate_range("2018-01-01", periods=n),
+    )
+    for span in (50, 80, 200):
+        df[f"ema_{span}"] = df["close"].ewm(span=span, adjust=False).mean()
+    df["daily_return"] = df["close"].pct_change()
+    df["vol_20"] = df["daily_return"].rolling(20).std()
+    df["sma_200"] = calculate_ma(df["close"], 200)
+    df["adx_14"] = calculate_adx(df["high"], df["low"], df["close"], 14)
+    df["macd_line"] = calculate_macd(df["close"])[0]
+    df["ma50"] = calculate_ma(df["close"], 50)
+    df["ma20"] = calculate_ma(df["close"], 20)
+    df["rsi_14"] = calculate_rsi_handwrite(df["close"], 14)
+    df["volume_ratio"] = calculate_volume_ratio(df["volume"], 20)
+    return df
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [
+        EMACrossoverV1Strategy({}),
+        EMACrossoverV1Strategy({"rebalance_freq": "monthly"}),
+        EMATrendV2Strategy({"vol_threshold": 0.012}),
+        EMATrendV3Strategy({}),
+        EMATrendV3Strategy({"use_vol_filter": True, "vol_threshold": 0.012}),
+        NDXMA50VolumeRSIStrategy({"slope_flat_threshold": 0.1}),
+        NDXShortTermRSIStrategy({}),
+        NDXShortTermRSIStrategy({"use_divergence": True, "long_only": True}),
+        NDXShortTermRSIStrategy({"no_short_in_bull": True, "dynamic_cap": {"bull_overbought": 0.5}}),
+        NDXShortTermRSIStrategy({"rsi_params": {"short_period": 7, "long_period": 21}}),
+    ],
+)
+@pytest.mark.parametrize("start", [0, 210])
+def test_generate_signals_matches_per_bar(ohlcv, strategy, start):
+    native = strategy.generate_signals(ohlcv, start=start)
+    reference = BaseTradingStrategy.generate_signals(strategy, ohlcv, start=start)
+    assert native.index.equals(reference.index)
+    for col in native.columns:
+        assert native[col].tolist() == reference[col].tolist(), col
+
+
+def test_generate_signals_missing_indicators(ohlcv):
+    out = EMATrendV2Strategy({"ema_fast": 33}).generate_signals(ohlcv[["close"]])
+    assert (out["position"] == 0.0).all()
+    assert out["reason"].iloc[-1] == "missing_indicators"
+
+
+@pytest.mark.parametrize(
+    "config",
+    [{}, {"use_divergence": True}, {"use_divergence": True, "rsi_params": {"short_period": 7, "long_period": 21}}],
+)
+def test_on_bar_matches_generate_signal(ohlcv, config):
+    from ndx_rsi.strategy.ndx_short import NDXShortTermRSIStrategy
+
+    raw = ohlcv[["open", "high", "low", "close", "volume"]].iloc[:320]
+    strategy = NDXShortTermRSIStrategy(config)
+    mismatches = 0
+    reasons = set()
+    for i in range(len(raw)):
+        streamed = strategy.on_bar(raw.iloc[i])
+        expected = strategy.generate_signal(raw.iloc[: i + 1])
+        reasons.add(expected["reason"])
+        if (streamed["reason"], streamed["position"]) != (expected["reason"], expected["position"]):
+            mismatches += 1
+    assert mismatches == 0
+    assert len(reasons) > 2
+
+
+def test_ndx_short_rsi_columns_follow_rsi_params(ohlcv):
+    """rsi_params 决定 RSI 周期，列名随实际周期（rsi_7 不会存成 rsi_9）；缺省仍为 rsi_9 / rsi_24。"""
+    from ndx_rsi.indicators import IndicatorPipeline
+
+    raw = ohlcv[["open", "high", "low", "close", "volume"]]
+    assert NDXShortTermRSIStrategy({}).rsi_columns() == ("rsi_9", "rsi_24")
+    strategy = NDXShortTermRSIStrategy({"rsi_params": {"short_period": 7, "long_period": 21}})
+    df = IndicatorPipeline(strategy.required_indicators()).run(raw)
+    assert "rsi_9" not in df.columns and "rsi_24" not in df.columns
+    pd.testing.assert_series_equal(df["rsi_7"], calculate_rsi_handwrite(raw["close"], 7), check_names=False)
+    pd.testing.assert_series_equal(df["rsi_21"], calculate_rsi_handwrite(raw["close"], 21), check_names=False)
+    custom = strategy.generate_signals(df, start=210)
+    default = NDXShortTermRSIStrategy({}).generate_signals(raw, start=210)
+    assert custom["position"].tolist() != default["position"].tolist()
+
+
+def test_streaming_indicators_match_batch(ohlcv):
+    from ndx_rsi.indicators.streaming import RollingSMA, RollingSlope, StreamingEMA, StreamingRSI
+
+    close = ohlcv["close"].iloc[:300]
+    sma, ema, rsi, slope = RollingSMA(50), StreamingEMA(20), StreamingRSI(9), RollingSlope(20)
+    out = np.array([[sma.update(x), ema.update(x), rsi.update(x), slope.update(x)] for x in close])
+    np.testing.assert_allclose(out[:, 0], calculate_ma(close, 50), rtol=1e-10)
+    np.testing.assert_allclose(out[:, 1], close.ewm(span=20, adjust=False).mean(), rtol=1e-10)
+    np.testing.assert_allclose(out[:, 2], calculate_rsi_handwrite(close, 9), rtol=1e-8)
+    expected_slope = [np.polyfit(np.arange(20), close.iloc[i - 19 : i + 1], 1)[0] for i in range(19, len(close))]
+    np.testing.assert_allclose(out[19:, 3], expected_slope, rtol=1e-7, atol=1e-9)
+
+
+def test_rolling_slope_recovers_after_nan():
+    from ndx_rsi.indicators.regression import rolling_slope
+    from ndx_rsi.indicators.streaming import RollingSlope
+
+    y = np.array([1.0, 2.0, np.nan, 4.0, 5.0, 7.0, 6.0, 9.0, 1e6 + 1.5, 1e6 + 3.0])
+    slope = RollingSlope(5)
+    out = np.array([slope.update(v) for v in y])
+    assert np.isnan(out[2:7]).all()  # NaN 在窗口内
+    np.testing.assert_allclose(out[7:], rolling_slope(y, 5)[7:], rtol=1e-12)
+    np.testing.assert_allclose(out[-1], np.polyfit(np.arange(5), y[-5:], 1)[0], rtol=1e-9)
+
+
+def test_on_bar_reuses_result_dict(ohlcv):
+    from ndx_rsi.strategy.ndx_short import NDXShortTermRSIStrategy
+
+    raw = ohlcv[["open", "high", "low", "close", "volume"]].iloc[:80]
+    strategy = NDXShortTermRSIStrategy({})
+    results = [strategy.on_bar(raw.iloc[i]) for i in range(len(raw))]
+    assert all(r is results[0] for r in results)
+    assert results[0]["ts"] == str(raw.index[-1])
+
+
+def test_rule_table_matches_scalar_rules():
+    from ndx_rsi.signal import evaluate_rules, generate_signal_from_values, signal_features
+
+    rng = np.random.default_rng(5)
+    n = 4000
+    rsi_s, rsi_l = rng.uniform(5, 95, n), rng.uniform(5, 95, n)
+    # 前一根 RSI 在当根附近抖动，制造足量金叉/死叉
+    prev_s, prev_l = rsi_s + rng.normal(0, 6, n), rsi_l + rng.normal(0, 6, n)
+    close = rng.uniform(90, 110, n)
+    ma5 = np.where(rng.random(n) < 0.1, np.nan, close + rng.normal(0, 2, n))
+    vol_ratio = rng.choice([0.4, 0.6, 0.8, 1.0, 1.2, 1.5], n)
+    trend = rng.choice(["up", "down", "side"], n)
+    env = rng.choice(["bull", "bear", "transition"], n)
+    divergence = rng.choice([None, "bullish_divergence", "bearish_divergence"], n)
+    direction = rng.choice(["", "long", "short"], n)
+    entry_reason = rng.choice(["", "overbought", "strong_oversell", "golden_cross"], n)
+    features = signal_features(
+        close, rsi_s, rsi_l, prev_s, prev_l, vol_ratio, ma5, trend, env,
+        divergence=divergence, use_divergence=True, direction=direction, entry_reason=entry_reason,
+    )
+    signal, position, reason = evaluate_rules(features)
+    for i in range(n):
+        expected = generate_signal_from_values(
+            close[i], rsi_s[i], rsi_l[i], prev_s[i], prev_l[i], vol_ratio[i], ma5[i], trend[i], env[i],
+            divergence=divergence[i], use_divergence=True,
+            current_position_info={"direction": direction[i], "entry_reason": entry_reason[i]},
+        )
+        assert (signal[i], position[i], reason[i]) == (expected["signal"], expected["position"], expected["reason"]), i
+    assert len(set(reason)) > 8
+
+
+@pytest.mark.parametrize("lookback", [5, 6, 20, 31])
+def test_divergence_series_matches_check_divergence(ohlcv, lookback):
+    from ndx_rsi.signal import check_divergence, divergence_at, divergence_flags, divergence_series
+
+    close = ohlcv["close"].iloc[:400]
+    rsi = calculate_rsi_handwrite(close, 9)  # 前若干根为 NaN
+    flags = divergence_flags(close, rsi, lookback)
+    series = divergence_series(close, rsi, lookback)
+    expected = [check_divergence(close.iloc[: i + 1], rsi.iloc[: i + 1], lookback) for i in range(len(close))]
+    assert series.tolist() == expected
+    assert [divergence_at(flags, i) for i in range(len(close))] == expected
+    if lookback >= 6:
+        assert {"bearish_divergence", "bullish_divergence"} <= set(expected)
+
+
+@pytest.mark.parametrize("config", [{}, {"slope_flat_threshold": 0.05, "oscillate_range": 0.01}])
+def test_trend_type_series_matches_per_bar(ohlcv, config):
+    from ndx_rsi.strategy.ndx_ma50_volume_rsi import _get_trend_type, trend_type_series
+
+    df = ohlcv[["close", "ma50"]].copy()
+    df.iloc[120, 1] = np.nan  # 中间缺值：前后若干根只能判为过渡
+    out = trend_type_series(df["close"], df["ma50"], config)
+    expected = [_get_trend_type(df, i, config) for i in range(len(df))]
+    assert out.tolist() == expected
+    assert len(set(expected)) == 4
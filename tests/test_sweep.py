@@ -0,0 +1,86 @@
+"""参数扫描：网格展开、共享内存并行回测与断点续跑。"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ndx_rsi.backtest import run_backtest
+from ndx_rsi.sweep import expand_grid, parse_grid_values, run_sweep
+from ndx_rsi.sweep.runner import _attach_ohlcv, _share_ohlcv
+
+
+@pytest.fixture(scope="module")
+def raw():
+    rng = np.random.default_rng(3)
+    n = 800
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.013, n)))
+    idx = pd.bdate_range("2016-01-01", periods=n, tz="America/New_York")
+    return pd.DataFrame(
+        {"open": close, "high": close * 1.005, "low": close * 0.995, "close": close, "volume": rng.uniform(1e6, 5e6, n)},
+        index=idx,
+    )
+
+
+def test_parse_and_expand_grid():
+    assert parse_grid_values("60, 80,0.02,true,x") == [60, 80, 0.02, True, "x"]
+    combos = expand_grid({"ema_fast": [60, 80], "vol_threshold": [0.02, 0.03]})
+    assert len(combos) == 4
+    assert combos[0] == {"ema_fast": 60, "vol_threshold": 0.02}
+
+
+def test_shared_memory_roundtrip(raw):
+    shm, desc = _share_ohlcv(raw)
+    try:
+        peer, df = _attach_ohlcv(desc)
+        pd.testing.assert_frame_equal(df, raw, check_freq=False)
+        peer.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_run_sweep_matches_single_runs_and_resumes(raw, tmp_path):
+    grid = {"ema_fast": [50, 80], "vol_threshold": [0.015, 0.02]}
+    out_path = tmp_path / "sweep.csv"
+    kwargs = dict(start_date="2016-01-01", end_date="2019-01-31", workers=2, data=raw, progress=None)
+    # 先跑一部分模拟中断，再全量续跑
+    partial = run_sweep("EMA_trend_v2", {"ema_fast": [50], "vol_threshold": [0.015]}, results_path=str(out_path), **kwargs)
+    assert len(partial) == 1
+    table = run_sweep("EMA_trend_v2", grid, results_path=str(out_path), **kwargs)
+    assert len(table) == 4
+    assert len(pd.read_csv(out_path)) == 4
+    row = table.iloc[3]
+    single = run_backtest(
+        "EMA_trend_v2", start_date="2016-01-01", end_date="2019-01-31", data=raw,
+        strategy_config={"ema_fast": int(row["ema_fast"]), "vol_threshold": float(row["vol_threshold"])},
+    )
+    assert row["total_return"] == single["total_return"]
+    assert row["sharpe_ratio"] == single["sharpe_ratio"]
+
+
+def test_run_sweep_reports_indicator_cache_hits(raw):
+    # 只改过滤阈值：同一 worker 内第二组起指标全部命中缓存
+    table = run_sweep(
+        "EMA_trend_v2", {"vol_threshold": [0.015, 0.02, 0.025]},
+        start_date="2016-01-01", end_date="2019-01-31", workers=1, data=raw, progress=None,
+    )
+    assert table["indicator_cache_misses"].sum() <= 4  # ema_80、ema_200、daily_return、vol_20 各算一次
+    assert table["indicator_cache_hits"].sum() >= 8
+
+
+def test_run_sweep_reuses_batched_ema_matrix(raw):
+    table = run_sweep(
+        "EMA_trend_v2", {"ema_fast": [50, 80, 120]},
+        start_date="2016-01-01", end_date="2019-01-31", workers=1, data=raw, progress=None,
+    )
+    # ema_50/80/120/200 由批量矩阵预置，最多只剩 daily_return、vol_20 需要计算（fork 的 worker 可能继承父进程缓存）
+    assert table["indicator_cache_misses"].sum() <= 2
+    assert (table["indicator_cache_hits"] + table["indicator_cache_misses"]).sum() == 12
+    single = run_backtest(
+        "EMA_trend_v2", start_date="2016-01-01", end_date="2019-01-31", data=raw, strategy_config={"ema_fast": 120},
+    )
+    assert table.iloc[2]["total_return"] == single["total_return"]